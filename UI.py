@@ -9,13 +9,110 @@ Auto-run to only show the information at the last round of the simulation or
 Step-by-step to show the information of each round of the simulation.
 The simulation can be paused with the key "p" and could be resumed also with
 the key "p"
+Long runs can be saved every few days with --checkpoint FILE
+[--checkpoint-every DAYS] and continued later with
+python UI.py --resume FILE --rounds N
+Headless runs with --skip-steady jump over the days after the last
+animal died, see Ecosystem.skip_steady
+--weather FILE replays a trace written by weather.py
 """
 
 __author__ = "8407548, Winata, 8655943, Quan"
+import argparse
 import time
 import threading
 from blatt8 import Ecosystem, Eucalyptus, MangoTree
 from blatt8 import Elderberry, Grass, Rabbit, Koala, Fox, Leopard
+from checkpoint import save_checkpoint, load_checkpoint
+from recorder import CensusRecorder
+from weather import check_length, load_trace
+
+ORGANISM_CLASSES = {
+    "Eucalyptus": Eucalyptus,
+    "Mango Tree": MangoTree,
+    "Elderberry": Elderberry,
+    "Grass": Grass,
+    "Rabbit": Rabbit,
+    "Koala": Koala,
+    "Fox": Fox,
+    "Leopard": Leopard
+}
+
+
+def build_island(size, rounds, organism_counts, engine="object", seed=None,
+                 grid=None, cohorts=False):
+    """
+    Docstring for build_island
+    Create an ecosystem and populate it with the requested organisms.
+
+    Args:
+    size (int): Size of the island ecosystem
+    rounds (int): Number of simulation days that will be run
+    organism_counts (dict): Dictionary mapping organism names
+    (keys of ORGANISM_CLASSES) to counts
+    engine (str): 'object' for blatt8.Ecosystem or 'numpy' for
+    array_engine.ArrayEcosystem
+    seed (int or None): Seed for the random numbers of the run
+    grid (int or None): Cells per row of the spatial mode (object
+    engine only), None for a well-mixed island
+    cohorts (bool): Store the grass as cohorts (object engine only),
+    see Ecosystem.enable_cohorts
+
+    Returns:
+    Ecosystem or ArrayEcosystem: The populated island
+    """
+    if engine == "numpy":
+        from array_engine import ArrayEcosystem
+        island = ArrayEcosystem(size, temperature=25, seed=seed)
+    else:
+        island = Ecosystem(size, days=int(rounds), temperature=25,
+                           seed=seed)
+        if cohorts:
+            island.enable_cohorts()
+
+    # Add organisms based on counts
+    for name, count in organism_counts.items():
+        if engine == "numpy":
+            island.add_species(ORGANISM_CLASSES[name], count)
+            continue
+        if cohorts and ORGANISM_CLASSES[name] is Grass:
+            island.add_cohort(count)
+            continue
+        for _ in range(count):
+            island.add_organism(ORGANISM_CLASSES[name]())
+    if grid:
+        island.enable_grid(grid)
+    return island
+
+
+class SimulationResult:
+    """
+    Docstring for SimulationResult
+    Outcome of one SimulationRunner.simulate call.
+
+    Attributes:
+    island (Ecosystem or ArrayEcosystem): The island after the last day
+    days (int): Number of simulated days
+    census (dict): Final population per species class name
+    plants (int): Final number of plants
+    animals (int): Final number of animals
+    elapsed (float): Wall-clock seconds of the simulation loop
+    steady (dict): Steady states of the island with the day they were
+    entered, see Ecosystem.steady (empty for the numpy engine)
+    """
+
+    def __init__(self, island, days, elapsed):
+        self.island = island
+        self.days = days
+        self.census = island.census()
+        self.plants, self.animals = island.totals()
+        self.elapsed = elapsed
+        self.steady = dict(getattr(island, "steady", {}))
+
+    @property
+    def days_per_second(self):
+        """Simulated days per wall-clock second"""
+        return self.days / self.elapsed if self.elapsed else float("inf")
 
 
 class SimulationRunner:
@@ -61,7 +158,56 @@ class SimulationRunner:
             if key.lower() == "p":
                 self.toggle_pause()
 
-    def simulate(self, rounds, speed, runmode, organism_counts, size):
+    def advance(self, island, checkpoint=None, checkpoint_every=0):
+        """
+        Docstring for advance
+        Simulate one day and write a checkpoint every
+        checkpoint_every days.
+
+        :param island: The simulated island
+        :type island: Ecosystem or ArrayEcosystem
+        :param checkpoint: Checkpoint file, None for no checkpoints
+        :type checkpoint: str or None
+        :param checkpoint_every: Days between two checkpoints
+        :type checkpoint_every: int
+        :return: None
+        """
+        island.simulate_step()
+        if (checkpoint and checkpoint_every
+                and island.day % checkpoint_every == 0):
+            save_checkpoint(island, checkpoint)
+
+    def skip(self, island, days, checkpoint=None, checkpoint_every=0):
+        """
+        Docstring for skip
+        Skip up to days days of an island without animals with
+        Ecosystem.skip_steady, stopping at the next checkpoint.
+
+        :param island: The simulated island
+        :type island: Ecosystem
+        :param days: Days left to simulate
+        :type days: int
+        :param checkpoint: Checkpoint file, None for no checkpoints
+        :type checkpoint: str or None
+        :param checkpoint_every: Days between two checkpoints
+        :type checkpoint_every: int
+        :return: Number of days skipped
+        :rtype: int
+        """
+        if checkpoint and checkpoint_every:
+            days = min(days, checkpoint_every
+                       - island.day % checkpoint_every)
+        island.skip_steady(days)
+        if (checkpoint and checkpoint_every
+                and island.day % checkpoint_every == 0):
+            save_checkpoint(island, checkpoint)
+        return days
+
+    def simulate(self, rounds, speed, runmode, organism_counts, size,
+                 engine="object", seed=None, checkpoint=None,
+                 checkpoint_every=0, resume=None, record=None,
+                 record_format="csv", profile=False, grid=None,
+                 cohorts=False, skip_steady=False, weather=None):
         """
         Docstring for simulate
         Run the ecosystem simulation with specified parameters.
@@ -73,6 +219,32 @@ class SimulationRunner:
         organism_counts (dict): Dictionary mapping organism names to counts
         Example: {'Rabbit': 5, 'Grass': 10, 'Fox': 2}
         size (int): Size of the island ecosystem
+        engine (str): Simulation engine - 'object' (default) or 'numpy'
+        seed (int or None): Seed for the random numbers of the run
+        checkpoint (str or None): File the island is saved to every
+        checkpoint_every days (object engine only)
+        checkpoint_every (int): Days between two checkpoints
+        resume (str or None): Checkpoint file to continue from instead
+        of building a new island; organism_counts, size, engine and
+        seed are ignored then
+        record (str or None): File the daily census is streamed to
+        (object engine only)
+        record_format (str): 'csv' or 'binary', see recorder
+        profile (bool): Time the phases of every day (object engine
+        only); step mode then prints a timing line per day
+        grid (int or None): Cells per row of the spatial mode, see
+        Ecosystem.enable_grid
+        cohorts (bool): Store the grass as cohorts, see
+        Ecosystem.enable_cohorts
+        skip_steady (bool): In headless mode, skip the days after the
+        last animal died (object engine without grid only), see
+        Ecosystem.skip_steady
+        weather (WeatherTrace or None): Weather replayed by the island
+        instead of drawing it, see Ecosystem.weather_trace. It must
+        cover all rounds, else a ValueError is raised before the run
+
+        Returns:
+        SimulationResult: Final census, counts and timing of the run
 
         The simulation:
         - Creates an ecosystem with specified size
@@ -89,43 +261,117 @@ class SimulationRunner:
         Run modes:
         - 'step': Shows day-by-day progress messages
         - 'auto': Runs without detailed progress output
+        - 'headless': Runs at maximum speed, ignores speed, prints
+          nothing and does not listen for the pause key
+
+        Engines:
+        - 'object': One Python object per organism (blatt8.Ecosystem)
+        - 'numpy': Column arrays per population
+          (array_engine.ArrayEcosystem), for very large islands
+
+        A weather trace shorter than the run is rejected up front:
+        >>> from weather import generate_trace
+        >>> SimulationRunner().simulate(
+        ...     10, None, "headless", {"Grass": 10}, 1000, "object", 1,
+        ...     weather=generate_trace(5, seed=1))
+        Traceback (most recent call last):
+        ...
+        ValueError: the weather trace ends on day 5, the run on day 10
+
+        So are checkpoints and recordings of the numpy engine:
+        >>> SimulationRunner().simulate(
+        ...     10, None, "headless", {"Grass": 10}, 1000, "numpy", 1,
+        ...     checkpoint="island.ckpt")
+        Traceback (most recent call last):
+        ...
+        ValueError: checkpoints need the object engine
+        >>> SimulationRunner().simulate(
+        ...     10, None, "headless", {"Grass": 10}, 1000, "numpy", 1,
+        ...     record="census.csv")
+        Traceback (most recent call last):
+        ...
+        ValueError: recording needs the object engine
         """
 
+        headless = runmode == "headless"
+        if weather is not None and not resume:
+            # A new island starts on day 0
+            check_length(weather, 0, int(rounds))
+        # A resumed island is always an Ecosystem
+        if engine == "numpy" and not resume:
+            if checkpoint:
+                raise ValueError("checkpoints need the object engine")
+            if profile:
+                raise ValueError("profiling needs the object engine")
+            if record:
+                raise ValueError("recording needs the object engine")
+
         # Start pause listener thread
-        threading.Thread(target=self.pause_reciever, daemon=True).start()
-
-        island = Ecosystem(size, days=int(rounds), temperature=25)
-
-        organism_classes = {
-            "Eucalyptus": Eucalyptus,
-            "Mango Tree": MangoTree,
-            "Elderberry": Elderberry,
-            "Grass": Grass,
-            "Rabbit": Rabbit,
-            "Koala": Koala,
-            "Fox": Fox,
-            "Leopard": Leopard
-        }
-
-        # Add organisms based on counts
-        for name, count in organism_counts.items():
-            for _ in range(count):
-                island.add_organism(organism_classes[name]())
+        if not headless:
+            threading.Thread(target=self.pause_reciever, daemon=True).start()
+
+        if resume:
+            island = load_checkpoint(resume)
+            if weather is not None:
+                check_length(weather, island.day, int(rounds))
+        else:
+            island = build_island(size, rounds, organism_counts, engine,
+                                  seed, grid, cohorts)
+        if weather is not None:
+            island.weather_trace = weather
+
+        if profile:
+            island.profile = True
+
+        recorder = None
+        if record:
+            recorder = CensusRecorder(record, record_format)
+            island.observers.append(recorder)
+        try:
+            return self._run(island, rounds, speed, runmode, checkpoint,
+                             checkpoint_every, profile, skip_steady)
+        finally:
+            if recorder is not None:
+                island.observers.remove(recorder)
+                recorder.close()
+
+    def _run(self, island, rounds, speed, runmode, checkpoint,
+             checkpoint_every, profile, skip_steady=False):
+        headless = runmode == "headless"
 
         # Speed delays
         delays = {"slow": 1.0, "normal": 0.5, "fast": 0.1}
         delay = delays.get(speed, 0.5)
 
+        if headless:
+            start = time.perf_counter()
+            day = 0
+            while day < int(rounds):
+                if (skip_steady and isinstance(island, Ecosystem)
+                        and island.grid is None
+                        and "fauna_extinct" in island.steady):
+                    day += self.skip(island, int(rounds) - day, checkpoint,
+                                     checkpoint_every)
+                else:
+                    self.advance(island, checkpoint, checkpoint_every)
+                    day += 1
+            return SimulationResult(island, int(rounds),
+                                    time.perf_counter() - start)
+
         print("\nSimulation in progress...\n"
               "Press 'p' at any time to pause/resume.\n")
 
         # Simulation loop
+        start = time.perf_counter()
         for day in range(int(rounds)):
-            island.simulate_step()
+            self.advance(island, checkpoint, checkpoint_every)
 
             if runmode == "step":
 
-                island.message()
+                if profile:
+                    island.message(timing=True)
+                else:
+                    island.message()
 
                 # Pause handling
                 while self.pause_flag:
@@ -142,10 +388,13 @@ class SimulationRunner:
                 # Auto delay
                 time.sleep(delay)
 
+        result = SimulationResult(island, int(rounds),
+                                  time.perf_counter() - start)
         island.message()
         print(f"\nSimulation complete after {rounds} days.")
-        print(f"Final result: {len(island.flora)} plants,"
-              f" {len(island.fauna)} animals")
+        print(f"Final result: {result.plants} plants,"
+              f" {result.animals} animals")
+        return result
 
 
 def ask_user_input():
@@ -157,11 +406,14 @@ def ask_user_input():
     Speed mode allows the user to choose between 3 option:
     slow, normal, or fast, which effects the processing speed of the
     simulation.
-    Run mode is a choice between 2 options: Auto-run and Step-by-step
+    Run mode is a choice between 3 options: Auto-run, Step-by-step
+    and Headless
     Auto-run skips all the information inbetween the simulation and only
     shows the result when the number of rounds is reached.
     Step-by-step shows the information of each round until
     the number of rounds is reached
+    Headless runs without any delay and only shows the final result
+    and the measured speed
     """
     print("=== Ecosystem Simulation Configuration ===")
 
@@ -218,23 +470,88 @@ def ask_user_input():
         print("Invalid choice.")
 
     # Run mode
-    run_options = {"1": "auto", "2": "step"}
+    run_options = {"1": "auto", "2": "step", "3": "headless"}
     print("\nChoose run mode:")
     print("1. Auto-run")
     print("2. Step-by-step")
+    print("3. Headless (maximum speed, final result only)")
 
     while True:
-        choice = input("Select run mode (1–2): ")
+        choice = input("Select run mode (1–3): ")
         if choice in run_options:
             runmode = run_options[choice]
             break
-        print("Invalid choice. Please enter 1 or 2.")
+        print("Invalid choice. Please enter 1, 2 or 3.")
 
     print("\nConfiguration complete!")
     return rounds, speed, runmode, organism_counts, int(size)
 
 
+def parse_arguments(argv=None):
+    """
+    Docstring for parse_arguments
+    Command line options for checkpointing and resuming a run.
+    Without --resume the run is configured interactively.
+
+    >>> args = parse_arguments(["--resume", "a.ckpt", "--rounds", "5"])
+    >>> args.resume, args.rounds, args.runmode
+    ('a.ckpt', 5, 'headless')
+    """
+    parser = argparse.ArgumentParser(description="Island ecosystem"
+                                                 " simulation")
+    parser.add_argument("--resume", metavar="FILE",
+                        help="continue the run saved in this checkpoint")
+    parser.add_argument("--rounds", type=int,
+                        help="days to simulate after resuming")
+    parser.add_argument("--runmode", choices=("auto", "step", "headless"),
+                        default="headless",
+                        help="run mode of a resumed run")
+    parser.add_argument("--speed", choices=("slow", "normal", "fast"),
+                        default="fast", help="speed of a resumed run")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="save the island to this file while running")
+    parser.add_argument("--checkpoint-every", type=int, default=1000,
+                        metavar="DAYS", help="days between checkpoints")
+    parser.add_argument("--record", metavar="FILE",
+                        help="stream the daily census to this file")
+    parser.add_argument("--record-format", choices=("csv", "binary"),
+                        default="csv")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the phases of every day")
+    parser.add_argument("--grid", type=int, metavar="CELLS",
+                        help="spatial mode with CELLS x CELLS cells")
+    parser.add_argument("--cohorts", action="store_true",
+                        help="store the grass as cohorts")
+    parser.add_argument("--skip-steady", action="store_true",
+                        help="skip the days after the last animal died")
+    parser.add_argument("--weather", type=load_trace, metavar="FILE",
+                        help="replay the weather trace in this file")
+    args = parser.parse_args(argv)
+    if args.resume and args.rounds is None:
+        parser.error("--resume needs --rounds")
+    return args
+
+
 if __name__ == "__main__":
-    rounds, speed, runmode, organism_counts, size = ask_user_input()
+    args = parse_arguments()
+    if args.resume:
+        rounds, speed, runmode = args.rounds, args.speed, args.runmode
+        organism_counts, size = {}, 0
+    else:
+        rounds, speed, runmode, organism_counts, size = ask_user_input()
     sim_run = SimulationRunner()
-    sim_run.simulate(rounds, speed, runmode, organism_counts, size)
+    result = sim_run.simulate(rounds, speed, runmode, organism_counts, size,
+                              checkpoint=args.checkpoint,
+                              checkpoint_every=args.checkpoint_every,
+                              resume=args.resume, record=args.record,
+                              record_format=args.record_format,
+                              profile=args.profile, grid=args.grid,
+                              cohorts=args.cohorts,
+                              skip_steady=args.skip_steady,
+                              weather=args.weather)
+    if runmode == "headless":
+        result.island.message()
+        print(f"Simulated {result.days} days in {result.elapsed:.2f} s"
+              f" ({result.days_per_second:.0f} days/s)")
+        for state, day in result.steady.items():
+            print(f"{state} since day {day}")
@@ -0,0 +1,902 @@
+"""
+Docstring for array_engine
+This module is made for storing the ArrayEcosystem, an alternative
+simulation engine for very large islands.
+
+Instead of one Python object per organism (Lifeforms -> Flora/Fauna
+-> species), the ArrayEcosystem keeps flora and fauna as NumPy column
+arrays (struct-of-arrays): species code, age, currentsize, health,
+hunger, fruitYield, berryYield and the daily modifiers. Every phase of
+a simulation day is run as vectorized array operations, only the
+feeding phase walks the animals one by one because each bite can kill
+a plant or a prey that a later animal would have picked.
+
+The species parameters are read from the species classes of blatt8
+(Grass, MangoTree, Leopard, ...), so both engines always simulate the
+same species.
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import numpy as np
+from blatt8 import Eucalyptus, MangoTree, Elderberry, Grass
+from blatt8 import Rabbit, Koala, Fox, Leopard
+from blatt8 import Herbivore, Carnivore, Omnivore
+
+FLORA_SPECIES = (Eucalyptus, MangoTree, Elderberry, Grass)
+FAUNA_SPECIES = (Rabbit, Koala, Fox, Leopard)
+
+# Feeding behaviour of the fauna species
+HERBIVORE, CARNIVORE, OMNIVORE = 0, 1, 2
+
+# What a bite takes from a plant (see Flora.beEaten)
+BIOMASS, FRUIT, BERRY = 0, 1, 2
+
+FLORA_COLUMNS = {
+    "species": np.int8,
+    "age": np.int32,
+    "currentsize": np.float64,
+    "fruitYield": np.int32,
+    "berryYield": np.int32,
+    "expand_modifier": np.float64,
+    "alive": np.bool_,
+}
+
+FAUNA_COLUMNS = {
+    "species": np.int8,
+    "age": np.int32,
+    "currentsize": np.float64,
+    "health": np.float64,
+    "hunger": np.int32,
+    "hunt_modifier": np.float64,
+    "alive": np.bool_,
+}
+
+
+class Columns():
+    """
+    Docstring for Columns
+    Growable table of equally long NumPy columns.
+
+    Reading a column attribute returns a view on the used part of the
+    column, assigning to it writes into that part, so
+    ``table.age += 1`` works like on a plain array.
+
+    :var n: Number of used rows
+    :vartype n: int
+
+    Test 1: Columns read and update like arrays
+    >>> table = Columns({"age": np.int32, "alive": np.bool_})
+    >>> table.append(3, age=[1, 2, 3], alive=True)
+    >>> table.age += 1
+    >>> len(table), table.age.tolist(), table.alive.tolist()
+    (3, [2, 3, 4], [True, True, True])
+
+    Test 2: Unknown columns are no attributes
+    >>> table.health
+    Traceback (most recent call last):
+    ...
+    AttributeError: health
+    """
+
+    def __init__(self, dtypes):
+        object.__setattr__(self, "n", 0)
+        object.__setattr__(self, "columns", {
+            name: np.empty(0, dtype) for name, dtype in dtypes.items()})
+
+    def __len__(self):
+        return self.n
+
+    def __getattr__(self, name):
+        try:
+            column = self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return column[:self.n]
+
+    def __setattr__(self, name, value):
+        if name in self.columns:
+            full = self.columns[name]
+            # "table.age += 1" assigns the updated view back to itself
+            if (isinstance(value, np.ndarray) and value.base is full
+                    and value.shape == (self.n,)
+                    and value.ctypes.data == full.ctypes.data):
+                return
+            full[:self.n] = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def append(self, count, **values):
+        """
+        Docstring for append
+        Add count rows. Columns not given in values are left
+        uninitialised, so callers pass every column.
+
+        :param count: Number of rows to add
+        :type count: int
+        :param values: Scalar or array value per column
+        :return: None
+
+        Test 1: Rows are added behind the used ones
+        >>> table = Columns({"age": np.int32})
+        >>> table.append(2, age=5)
+        >>> table.append(1, age=[7])
+        >>> table.age.tolist()
+        [5, 5, 7]
+
+        Test 2: The columns grow and keep their rows
+        >>> table.append(100, age=1)
+        >>> len(table), table.age[:3].tolist()
+        (103, [5, 5, 7])
+
+        Test 3: Nothing to add
+        >>> table.append(0)
+        >>> len(table)
+        103
+        """
+        if count <= 0:
+            return
+        new_n = self.n + count
+        capacity = len(next(iter(self.columns.values())))
+        if new_n > capacity:
+            capacity = max(new_n, 2 * capacity, 64)
+            for name, column in self.columns.items():
+                grown = np.empty(capacity, column.dtype)
+                grown[:self.n] = column[:self.n]
+                self.columns[name] = grown
+        for name, value in values.items():
+            self.columns[name][self.n:new_n] = value
+        object.__setattr__(self, "n", new_n)
+
+    def compact(self, keep):
+        """
+        Docstring for compact
+        Drop every row where keep is False, preserving row order.
+
+        :param keep: Boolean mask over the used rows
+        :type keep: numpy.ndarray
+        :return: None
+
+        Test 1: Kept rows stay in order
+        >>> table = Columns({"age": np.int32, "hunger": np.int32})
+        >>> table.append(4, age=[1, 2, 3, 4], hunger=[5, 6, 7, 8])
+        >>> table.compact(table.age % 2 == 0)
+        >>> table.age.tolist(), table.hunger.tolist()
+        ([2, 4], [6, 8])
+
+        Test 2: Keeping everything changes nothing
+        >>> table.compact(np.ones(2, bool))
+        >>> len(table)
+        2
+        """
+        kept = int(np.count_nonzero(keep))
+        if kept == self.n:
+            return
+        for column in self.columns.values():
+            column[:kept] = column[:self.n][keep]
+        object.__setattr__(self, "n", kept)
+
+
+def _species_param(prototypes, name, default=0):
+    # One parameter of every species as an array indexed by species code
+    return np.array([getattr(proto, name, default) for proto in prototypes],
+                    dtype=np.float64)
+
+
+class ArrayEcosystem():
+    """
+    Docstring for ArrayEcosystem
+    Struct-of-arrays version of blatt8.Ecosystem.
+
+    Follows the same daily order as Ecosystem.simulate_step and reads
+    the species parameters from the blatt8 species classes. Two
+    details differ from the object engine: starvation is applied to
+    all animals at once after the feeding loop, and random numbers are
+    drawn in bulk from a NumPy generator, so runs are not identical to
+    the object engine for the same seed, only equal in distribution.
+
+    :var size: Total available area of the ecosystem
+    :vartype size: int
+    :var day: Current simulation day
+    :vartype day: int
+    :var temperature: Current temperature
+    :vartype temperature: int
+    :var weathercon: Current weather condition
+    :vartype weathercon: str
+    :var flora: Column table of all plants
+    :vartype flora: Columns
+    :var fauna: Column table of all animals
+    :vartype fauna: Columns
+    :var weather_trace: Weather replayed instead of drawn, see
+        Ecosystem.weather_trace
+    :vartype weather_trace: weather.WeatherTrace or None
+
+    Test 1: Built through UI.build_island
+    >>> from UI import build_island
+    >>> eco = build_island(1000, 10, {"Grass": 50, "Rabbit": 5},
+    ...                    engine="numpy", seed=1)
+    >>> isinstance(eco, ArrayEcosystem), eco.census()["Grass"]
+    (True, 50)
+    >>> for _ in range(5):
+    ...     eco.simulate_step()
+    >>> eco.day, sum(eco.census().values()) == sum(eco.totals())
+    (5, True)
+
+    Test 2: Selected in SimulationRunner
+    >>> from UI import SimulationRunner
+    >>> result = SimulationRunner().simulate(
+    ...     5, None, "headless", {"Grass": 50, "Fox": 2}, 1000, "numpy", 1)
+    >>> isinstance(result.island, ArrayEcosystem), result.days
+    (True, 5)
+    >>> result.plants == result.census["Grass"]
+    True
+    """
+
+    def __init__(self, size: int, temperature: int = 25, seed=None):
+        self.size = size
+        self.day = 0
+        self.weathercon = None
+        self.temperature = temperature
+        self.weather_trace = None
+        self.rng = np.random.default_rng(seed)
+        self.flora = Columns(FLORA_COLUMNS)
+        self.fauna = Columns(FAUNA_COLUMNS)
+
+        plants = [species() for species in FLORA_SPECIES]
+        animals = [species() for species in FAUNA_SPECIES]
+
+        # Flora parameters, indexed by flora species code
+        self.p_minsize = _species_param(plants, "minsize")
+        self.p_maxsize = _species_param(plants, "maxsize")
+        self.p_growrate = _species_param(plants, "growrate")
+        self.p_expandRate = _species_param(plants, "expandRate")
+        self.p_area = _species_param(plants, "maxIndividualArea")
+        self.p_fruitRate = (_species_param(plants, "fruitRate")
+                            * _species_param(plants, "isFruiting"))
+        self.p_maxFruit = _species_param(plants, "maxFruit")
+        self.p_berryRate = (_species_param(plants, "berryRate")
+                            * _species_param(plants, "isBerrying"))
+        self.p_maxBerry = _species_param(plants, "maxBerry")
+        self.p_yield_rule = np.array(
+            [FRUIT if isinstance(p, MangoTree) else
+             BERRY if isinstance(p, Elderberry) else BIOMASS
+             for p in plants], dtype=np.int8)
+
+        # Fauna parameters, indexed by fauna species code
+        self.a_minsize = _species_param(animals, "minsize")
+        self.a_maxsize = _species_param(animals, "maxsize")
+        self.a_reproducerate = _species_param(animals, "reproducerate")
+        self.a_starveRate = _species_param(animals, "starveRate")
+        self.a_health = _species_param(animals, "health")
+        self.a_selfHarmEffect = _species_param(animals, "selfHarmEffect")
+        self.a_healEffect = _species_param(animals, "healEffect")
+        self.a_huntSuccessRate = _species_param(animals, "huntSuccessRate")
+        self.a_selfHarmRate = _species_param(animals, "selfHarmRate")
+        self.a_hunts = np.array([hasattr(a, "huntSuccessRate")
+                                 for a in animals])
+        self.a_diet = np.array(
+            [HERBIVORE if isinstance(a, Herbivore) else
+             CARNIVORE if isinstance(a, Carnivore) else
+             OMNIVORE if isinstance(a, Omnivore) else -1
+             for a in animals], dtype=np.int8)
+
+        # edible[eater, plant] as decided by Flora.edible_by
+        self.edible = np.array([[p.edible_by(a) for p in plants]
+                                for a in animals])
+
+    # --- Population management ---
+
+    def add_species(self, species, count):
+        """
+        Docstring for add_species
+        Add count fresh individuals of a species, starting in the same
+        state as a newly constructed object of that class.
+
+        :param species: A class from FLORA_SPECIES or FAUNA_SPECIES
+        :type species: type
+        :param count: Number of individuals to add
+        :type count: int
+        :return: None
+
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(MangoTree, 2)
+        >>> eco.add_species(Fox, 1)
+        >>> eco.flora.currentsize.tolist(), eco.flora.age.tolist()
+        ([5.0, 5.0], [0, 0])
+        >>> eco.fauna.health.tolist() == [Fox().health]
+        True
+        """
+        if species in FLORA_SPECIES:
+            self._add_plants(np.full(count, FLORA_SPECIES.index(species),
+                                     np.int8))
+        else:
+            code = FAUNA_SPECIES.index(species)
+            self.fauna.append(count, species=code, age=0,
+                              currentsize=self.a_minsize[code],
+                              health=self.a_health[code], hunger=0,
+                              hunt_modifier=1.0, alive=True)
+
+    def add_organism(self, organism):
+        """
+        Docstring for add_organism
+        Copy the state of a blatt8 organism into the column tables.
+
+        :param organism: Organism to be added to the ecosystem
+        :type organism: Lifeforms
+        :return: None
+
+        Test 1: A plant keeps its state
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> m = MangoTree()
+        >>> m.age, m.currentsize, m.fruitYield = 3, 8, 4
+        >>> eco.add_organism(m)
+        >>> eco.flora.age.tolist(), eco.flora.currentsize.tolist()
+        ([3], [8.0])
+        >>> eco.flora.fruitYield.tolist()
+        [4]
+
+        Test 2: So does an animal
+        >>> r = Rabbit()
+        >>> r.hunger = 2
+        >>> eco.add_organism(r)
+        >>> eco.fauna.hunger.tolist(), eco.census()["Rabbit"]
+        ([2], 1)
+        """
+        species = organism._species
+        if species in FLORA_SPECIES:
+            self.flora.append(1, species=FLORA_SPECIES.index(species),
+                              age=organism.age,
+                              currentsize=organism.currentsize,
+                              fruitYield=organism.fruitYield,
+                              berryYield=organism.berryYield,
+                              expand_modifier=1.0,
+                              alive=organism.is_alive())
+        else:
+            self.fauna.append(1, species=FAUNA_SPECIES.index(species),
+                              age=organism.age,
+                              currentsize=organism.currentsize,
+                              health=organism.health,
+                              hunger=organism.hunger,
+                              hunt_modifier=1.0,
+                              alive=organism.is_alive())
+
+    def _add_plants(self, species):
+        self.flora.append(len(species), species=species, age=0,
+                          currentsize=self.p_minsize[species],
+                          fruitYield=0, berryYield=0,
+                          expand_modifier=1.0, alive=True)
+
+    def _living_flora(self):
+        fl = self.flora
+        return fl.alive & (fl.currentsize >= self.p_minsize[fl.species])
+
+    def _living_fauna(self):
+        fa = self.fauna
+        return fa.alive & (fa.health > 0) & (fa.currentsize > 0)
+
+    def available_area(self) -> int:
+        """
+        Docstring for available_area
+        Total unoccupied area, see Ecosystem.available_area.
+
+        :return: Total unoccupied area
+        :rtype: int
+
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(MangoTree, 3)
+        >>> eco.available_area()
+        85
+        >>> eco.flora.alive[0] = False
+        >>> eco.available_area()
+        90
+        """
+        fl = self.flora
+        used_area = self.p_area[fl.species][self._living_flora()].sum()
+        return max(0, int(self.size - used_area))
+
+    def census(self):
+        """
+        Docstring for census
+        Count the living organisms of every species.
+
+        :return: Mapping of species class name to population
+        :rtype: dict[str, int]
+
+        Test 1: Every species is counted
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Grass, 3)
+        >>> eco.add_species(Rabbit, 2)
+        >>> c = eco.census()
+        >>> len(c), c["Grass"], c["Rabbit"], c["Fox"]
+        (8, 3, 2, 0)
+
+        Test 2: Dead organisms are not counted before compaction
+        >>> eco.fauna.health[0] = 0
+        >>> eco.flora.currentsize[0] = 0.01
+        >>> eco.census()["Rabbit"], eco.census()["Grass"]
+        (1, 2)
+        """
+        plants = np.bincount(self.flora.species[self._living_flora()],
+                             minlength=len(FLORA_SPECIES))
+        animals = np.bincount(self.fauna.species[self._living_fauna()],
+                              minlength=len(FAUNA_SPECIES))
+        counts = {species.__name__: int(n)
+                  for species, n in zip(FLORA_SPECIES, plants)}
+        counts.update({species.__name__: int(n)
+                       for species, n in zip(FAUNA_SPECIES, animals)})
+        return counts
+
+    def totals(self):
+        """
+        Docstring for totals
+        Number of plants and animals, see Ecosystem.totals. The
+        columns are compacted every day, so these are their lengths.
+
+        :return: Plants and animals
+        :rtype: tuple[int, int]
+
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Grass, 3)
+        >>> eco.totals()
+        (3, 0)
+        """
+        return len(self.flora), len(self.fauna)
+
+    # --- Daily phases ---
+
+    def environment(self):
+        """
+        Docstring for environment
+        Randomize weather and temperature, see Ecosystem.environment.
+
+        :return: None
+
+        Test 1: Random weather
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.environment()
+        >>> eco.weathercon in ("windy", "storm", "normal")
+        True
+        >>> 22 <= eco.temperature < 40
+        True
+
+        Test 2: Replayed weather
+        >>> from weather import WeatherTrace
+        >>> eco.weather_trace = WeatherTrace.from_days(
+        ...     [(30, "storm"), (24, "windy")])
+        >>> eco.day = 2
+        >>> eco.environment()
+        >>> eco.temperature, eco.weathercon
+        (24, 'windy')
+        """
+        if self.weather_trace is not None:
+            self.temperature, self.weathercon = self.weather_trace[
+                self.day - 1]
+            return
+        self.temperature = int(self.rng.integers(22, 40))
+        r = self.rng.random()
+        if r < 0.3:
+            self.weathercon = "windy"
+        elif r < 0.4:
+            self.weathercon = "storm"
+        else:
+            self.weathercon = "normal"
+
+    def apply_environment_effects(self):
+        """
+        Docstring for apply_environment_effects
+        Windy days boost expansion, storms kill one random plant and
+        one random animal, hot days halve the hunting success.
+
+        :return: None
+
+        Test 1: Wind helps the plants expand
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Grass, 2)
+        >>> eco.add_species(Rabbit, 1)
+        >>> eco.add_species(Fox, 1)
+        >>> eco.weathercon, eco.temperature = "windy", 25
+        >>> eco.apply_environment_effects()
+        >>> eco.flora.expand_modifier.tolist()
+        [1.5, 1.5]
+
+        Test 2: A storm kills one plant and one animal
+        >>> eco.weathercon = "storm"
+        >>> eco.apply_environment_effects()
+        >>> int((~eco.flora.alive).sum()), int((~eco.fauna.alive).sum())
+        (1, 1)
+
+        Test 3: Heat only slows down the hunters
+        >>> eco.weathercon, eco.temperature = "normal", 36
+        >>> eco.apply_environment_effects()
+        >>> eco.fauna.hunt_modifier.tolist()
+        [1.0, 0.5]
+        """
+        fl, fa = self.flora, self.fauna
+        if self.weathercon == "windy":
+            fl.expand_modifier = 1.5
+        if self.weathercon == "storm":
+            if len(fl):
+                fl.alive[self.rng.integers(len(fl))] = False
+            if len(fa):
+                fa.alive[self.rng.integers(len(fa))] = False
+        if self.temperature >= 36:
+            fa.hunt_modifier[self.a_hunts[fa.species]] = 0.5
+
+    def _expand(self):
+        """
+        Docstring for _expand
+        Vectorized Flora.expansion_request of all plants, then the
+        requests are granted in random order until the free area is
+        used up, like Ecosystem._grant_expansion.
+
+        :return: None
+
+        Test 1: Young plants do not expand
+        >>> eco = ArrayEcosystem(10 ** 6, seed=1)
+        >>> eco.add_species(Grass, 1000)
+        >>> eco._expand()
+        >>> len(eco.flora)
+        1000
+
+        Test 2: Mature grass asks for half a seedling on average
+        >>> eco.flora.currentsize = 1.0
+        >>> eco._expand()
+        >>> 400 < len(eco.flora) - 1000 < 600
+        True
+        >>> eco.flora.age[1000:].tolist() == [0] * (len(eco.flora) - 1000)
+        True
+        >>> set(eco.flora.currentsize[1000:].tolist())
+        {0.1}
+
+        Test 3: Seedlings never take more than the free area
+        >>> eco = ArrayEcosystem(1100, seed=1)
+        >>> eco.add_species(Grass, 1000)
+        >>> eco.flora.currentsize = 1.0
+        >>> eco._expand()
+        >>> len(eco.flora), eco.available_area()
+        (1100, 0)
+        """
+        fl = self.flora
+        if not len(fl):
+            return
+        species = fl.species
+        exact = self.p_expandRate[species] * fl.expand_modifier
+        guaranteed = exact.astype(np.int64)
+        bonus = self.rng.random(len(fl)) < exact - guaranteed
+        mature = fl.currentsize >= self.p_maxsize[species] * 0.5
+        requested = np.where(mature, guaranteed + bonus, 0)
+
+        parents = self.rng.permutation(np.flatnonzero(requested))  # fairness
+        if not len(parents):
+            return
+        requested = requested[parents]
+        area = self.p_area[species[parents]]
+        free = float(self.available_area())
+
+        # Every parent whose whole request still fits is granted in full
+        cost = np.cumsum(requested * area)
+        full = int(np.searchsorted(cost, free, side="right"))
+        granted = np.zeros(len(parents), np.int64)
+        granted[:full] = requested[:full]
+        if full:
+            free -= cost[full - 1]
+
+        # The rest gets what is left, in the same shuffled order
+        smallest = self.p_area.min()
+        for i in range(full, len(parents)):
+            if free <= 0 or free < smallest:
+                break
+            granted[i] = min(requested[i], int(free // area[i]))
+            free -= granted[i] * area[i]
+
+        self._add_plants(np.repeat(species[parents], granted))
+
+    def _grow_and_fruit(self):
+        """
+        Docstring for _grow_and_fruit
+        Grow the living plants by their growrate, then let mango trees
+        fruit and elderberries bear berries, see Flora.grow and
+        Flora.fruiting.
+
+        :return: None
+
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(MangoTree, 1)
+        >>> eco.add_species(Elderberry, 1)
+        >>> eco.flora.currentsize = 10.0
+        >>> eco._grow_and_fruit()
+        >>> eco.flora.currentsize.round(2).tolist()
+        [11.0, 11.5]
+        >>> eco.flora.fruitYield.tolist(), eco.flora.berryYield.tolist()
+        ([1, 0], [0, 10])
+        """
+        fl = self.flora
+        species = fl.species
+        grown = np.minimum(fl.currentsize * (1 + self.p_growrate[species]),
+                           self.p_maxsize[species])
+        fl.currentsize = np.where(self._living_flora(), grown,
+                                  fl.currentsize)
+        size = fl.currentsize
+        fl.fruitYield = np.minimum(
+            fl.fruitYield + (size * self.p_fruitRate[species]).astype(
+                np.int32), self.p_maxFruit[species])
+        fl.berryYield = np.minimum(
+            fl.berryYield + (size * self.p_berryRate[species]).astype(
+                np.int32), self.p_maxBerry[species])
+
+    def _pick(self, candidates, count, u, alive):
+        # Uniform living candidate among candidates[:count]. Picks are
+        # drawn from the start-of-day candidates and rejected while
+        # dead, which is uniform over the ones still alive.
+        if count == 0:
+            return -1
+        j = candidates[int(u * count)]
+        tries = 0
+        while not alive[j]:
+            tries += 1
+            if tries > 16:
+                living = candidates[:count][alive[candidates[:count]]]
+                if not len(living):
+                    return -1
+                return living[self.rng.integers(len(living))]
+            j = candidates[int(self.rng.random() * count)]
+        return j
+
+    def _feed(self):
+        """
+        Docstring for _feed
+        Let every living animal forage or hunt once, in the order of
+        the fauna table. Targets are drawn from the plants and prey
+        alive at the start of the feeding phase, see _pick.
+
+        :return: None
+
+        Test 1: A rabbit eats from a plant and is no longer hungry
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Grass, 1)
+        >>> eco.add_species(Rabbit, 1)
+        >>> eco.flora.currentsize = 1.0
+        >>> eco.fauna.hunger = 2
+        >>> eco._feed()
+        >>> eco.flora.currentsize.tolist(), eco.fauna.hunger.tolist()
+        ([0.0], [0])
+        >>> eco.census()["Grass"]
+        0
+
+        Test 2: A sure hunt kills a smaller prey
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Fox, 1)
+        >>> eco.add_species(Rabbit, 1)
+        >>> eco.a_huntSuccessRate[:] = 1.0
+        >>> eco._feed()
+        >>> eco.fauna.alive.tolist(), eco.fauna.hunger.tolist()
+        ([True, False], [0, 0])
+        """
+        fl, fa = self.flora, self.fauna
+        n = len(fa)
+        if not n:
+            return
+        rng = self.rng
+        species = fa.species
+        diet = self.a_diet[species]
+        forages = ((diet == HERBIVORE)
+                   | ((diet == OMNIVORE) & (rng.random(n) < 0.5)))
+        u_target = rng.random(n).tolist()
+        u_hit = rng.random(n).tolist()
+        u_harm = rng.random(n).tolist()
+
+        # Start-of-day candidates for foraging, per eater species
+        fl_alive = fl.alive
+        fl_alive &= self._living_flora()
+        fl_species = fl.species
+        plant_candidates = [
+            np.flatnonzero(fl_alive & self.edible[code][fl_species])
+            for code in range(len(FAUNA_SPECIES))]
+
+        # Start-of-day prey, sorted by size
+        fa_alive = fa.alive
+        fa_alive &= self._living_fauna()
+        prey = np.flatnonzero(fa_alive)
+        prey = prey[np.argsort(fa.currentsize[prey], kind="stable")]
+        smaller = np.searchsorted(fa.currentsize[prey], fa.currentsize,
+                                  side="left").tolist()
+
+        size, fruit, berry = fl.currentsize, fl.fruitYield, fl.berryYield
+        health, hunger = fa.health, fa.hunger
+        yield_rule, minsize = self.p_yield_rule, self.p_minsize
+        hunt_rate = (self.a_huntSuccessRate[species]
+                     * fa.hunt_modifier).tolist()
+        harm_rate = self.a_selfHarmRate[species].tolist()
+        harm = self.a_selfHarmEffect[species].tolist()
+        heal = self.a_healEffect[species].tolist()
+        codes = species.tolist()
+        forages = forages.tolist()
+
+        for i in range(n):
+            if not fa_alive[i]:
+                continue
+            if forages[i]:
+                candidates = plant_candidates[codes[i]]
+                j = self._pick(candidates, len(candidates), u_target[i],
+                               fl_alive)
+                if j < 0:
+                    continue
+                rule = yield_rule[fl_species[j]]
+                if rule == FRUIT and fruit[j] >= 2:
+                    eaten = min(2, fruit[j])
+                    fruit[j] -= eaten
+                elif rule == BERRY and berry[j] >= 5:
+                    eaten = min(5, berry[j])
+                    berry[j] -= eaten
+                else:
+                    eaten = min(1.0, size[j])
+                    size[j] -= eaten
+                    if size[j] < minsize[fl_species[j]]:
+                        fl_alive[j] = False
+                if eaten > 0:
+                    health[i] = min(100, health[i] + heal[i])
+                    hunger[i] = 0
+            else:
+                j = self._pick(prey, smaller[i], u_target[i], fa_alive)
+                if j < 0:
+                    continue
+                if u_hit[i] < hunt_rate[i]:
+                    health[i] = min(100, health[i] + heal[i])
+                    hunger[i] = 0
+                    fa_alive[j] = False
+                if u_harm[i] < harm_rate[i]:
+                    health[i] -= harm[i]
+                    if health[i] <= 0:
+                        fa_alive[i] = False
+
+    def _starve(self):
+        """
+        Docstring for _starve
+        Make every animal hungrier. After more than 3 days without
+        food an animal loses 10 times its starveRate of health a day
+        and dies once it has none left.
+
+        :return: None
+
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Rabbit, 3)
+        >>> eco.fauna.hunger = [0, 3, 3]
+        >>> eco.fauna.health = [80, 80, 1]
+        >>> eco._starve()
+        >>> eco.fauna.hunger.tolist(), eco.fauna.health.round(2).tolist()
+        ([1, 4, 4], [80.0, 78.5, -0.5])
+        >>> eco.fauna.alive.tolist()
+        [True, True, False]
+        """
+        fa = self.fauna
+        fa.hunger += 1
+        starving = fa.hunger > 3
+        fa.health -= np.where(starving,
+                              self.a_starveRate[fa.species] * 10, 0)
+        fa.alive &= fa.health > 0
+
+    def _reproduce(self):
+        """
+        Docstring for _reproduce
+        Healthy, grown animals get offspring at their reproducerate,
+        see Fauna.can_reproduce and Fauna.babies.
+
+        :return: None
+
+        Test 1: Grown and healthy rabbits breed
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Rabbit, 200)
+        >>> eco.fauna.currentsize = 0.5
+        >>> eco.fauna.health = 100
+        >>> eco._reproduce()
+        >>> 5 < len(eco.fauna) - 200 < 40
+        True
+        >>> babies = slice(200, len(eco.fauna))
+        >>> set(eco.fauna.health[babies].tolist())
+        {50.0}
+        >>> set(eco.fauna.age[babies].tolist())
+        {0}
+
+        Test 2: Weak animals do not
+        >>> eco = ArrayEcosystem(100, seed=1)
+        >>> eco.add_species(Rabbit, 200)
+        >>> eco.fauna.currentsize = 0.5
+        >>> eco.fauna.health = 50
+        >>> eco._reproduce()
+        >>> len(eco.fauna)
+        200
+        """
+        fa = self.fauna
+        species = fa.species
+        eligible = ((fa.health > 60)
+                    & (fa.currentsize >= self.a_maxsize[species] * 0.7))
+        exact = self.a_reproducerate[species]
+        guaranteed = exact.astype(np.int64)
+        bonus = self.rng.random(len(fa)) < exact - guaranteed
+        babies = np.repeat(species, np.where(eligible, guaranteed + bonus, 0))
+        self.fauna.append(len(babies), species=babies, age=0,
+                          currentsize=self.a_minsize[babies],
+                          health=50, hunger=0, hunt_modifier=1.0,
+                          alive=True)
+
+    def simulate_step(self):
+        """
+        Docstring for simulate_step
+        Advances the simulation by a day, in the order of
+        Ecosystem.simulate_step:
+        - Aging all organisms and resetting daily modifiers
+        - Randomizing and applying environmental conditions
+        - Expanding, growing and fruiting plants
+        - Feeding, then starvation and reproduction of animals
+        - Removing dead organisms from the ecosystem
+
+        :return: None
+
+        Test 1: Populations and area stay consistent
+        >>> def island(seed):
+        ...     eco = ArrayEcosystem(2000, seed=seed)
+        ...     for species, count in ((Grass, 300), (MangoTree, 20),
+        ...                            (Rabbit, 30), (Fox, 5)):
+        ...         eco.add_species(species, count)
+        ...     for _ in range(20):
+        ...         eco.simulate_step()
+        ...     return eco
+        >>> eco = island(4)
+        >>> census = eco.census()
+        >>> plants = sum(census[s.__name__] for s in FLORA_SPECIES)
+        >>> animals = sum(census[s.__name__] for s in FAUNA_SPECIES)
+        >>> eco.day, (plants, animals) == eco.totals()
+        (20, True)
+        >>> used = sum(census[s.__name__] * s.maxIndividualArea
+        ...            for s in FLORA_SPECIES)
+        >>> used + eco.available_area() == eco.size
+        True
+
+        Test 2: Only living organisms are left
+        >>> bool(eco.flora.alive.all() and eco.fauna.alive.all())
+        True
+
+        Test 3: The same seed gives the same island
+        >>> island(4).census() == census
+        True
+        """
+        fl, fa = self.flora, self.fauna
+        self.day += 1
+        fl.age += 1
+        fa.age += 1
+        fl.expand_modifier = 1.0
+        fa.hunt_modifier = 1.0
+
+        self.environment()
+        self.apply_environment_effects()
+
+        self._expand()
+        self._grow_and_fruit()
+
+        self._feed()
+        self._starve()
+        self._reproduce()
+
+        fl.compact(self._living_flora())
+        fa.compact(self._living_fauna())
+
+    def message(self):
+        """
+        Docstring for message
+        Print the current condition of the ecosystem in the same
+        format as Ecosystem.message.
+
+        :return: None
+        """
+        counts = self.census()
+        print(f"Day {self.day}:")
+        print(f"Weather = {self.weathercon},"
+              f" Temperature = {self.temperature}")
+        print(f"  Plants: Eucalyptus={counts['Eucalyptus']},"
+              f" Mango={counts['MangoTree']},"
+              f" Elderberry={counts['Elderberry']},"
+              f" Grass={counts['Grass']}")
+        print(f"  Animals: Rabbit={counts['Rabbit']},"
+              f" Koala={counts['Koala']},"
+              f" Fox={counts['Fox']}, Leopard={counts['Leopard']}")
+        print(f"  Total: {len(self.flora)} plants,"
+              f" {len(self.fauna)} animals\n")
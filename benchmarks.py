@@ -0,0 +1,238 @@
+"""
+Docstring for benchmarks
+This module is made for measuring how the simulation performs.
+Every benchmark prints one JSON object per line, so results can be
+collected by scripts and compared between versions.
+
+Available benchmarks:
+- memory: bytes per organism of the slotted organism classes compared
+  to the former layout with one __dict__ per organism
+- phases: seconds per day spent in every phase of simulate_step
+  (see Ecosystem.step_phases) for islands of growing size and
+  different species mixes
+
+Usage: python benchmarks.py memory [--count N]
+       python benchmarks.py phases [--sizes 1000,10000] [--scenarios
+       balanced,plant-heavy] [--days D] [--seed S]
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import argparse
+import json
+import time
+import tracemalloc
+from blatt8 import Ecosystem, Flora, STEP_PHASES
+from blatt8 import Eucalyptus, MangoTree, Elderberry, Grass
+from blatt8 import Rabbit, Koala, Fox, Leopard
+
+SPECIES = (Eucalyptus, MangoTree, Elderberry, Grass,
+           Rabbit, Koala, Fox, Leopard)
+
+# Share of every species in the organisms of a benchmark island
+SCENARIOS = {
+    "plant-heavy": {Grass: 0.80, Elderberry: 0.06, MangoTree: 0.04,
+                    Eucalyptus: 0.04, Rabbit: 0.04, Koala: 0.01,
+                    Fox: 0.007, Leopard: 0.003},
+    "predator-heavy": {Grass: 0.30, Elderberry: 0.05, MangoTree: 0.05,
+                       Eucalyptus: 0.05, Rabbit: 0.25, Koala: 0.05,
+                       Fox: 0.15, Leopard: 0.10},
+    "balanced": {Grass: 0.50, Elderberry: 0.05, MangoTree: 0.05,
+                 Eucalyptus: 0.05, Rabbit: 0.20, Koala: 0.05,
+                 Fox: 0.06, Leopard: 0.04},
+}
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+
+class _DictOrganism:
+    """
+    Docstring for _DictOrganism
+    Stand-in for the former organism layout, which kept the state
+    and every species constant in a per-instance __dict__.
+    """
+
+
+# Attributes of the organisms of the former layout, fixed so that
+# attributes added since then do not inflate the measured saving
+_LEGACY_PLANT = ("age", "alive", "berryYield", "current_expand_modifier",
+                 "currentsize", "expandRate", "fruitYield", "growrate",
+                 "isBerrying", "isFruiting", "island", "maxIndividualArea",
+                 "maxsize", "minsize")
+_LEGACY_ANIMAL = ("age", "alive", "current_hunt_modifier", "currentsize",
+                  "growrate", "healEffect", "health", "hunger", "island",
+                  "maxsize", "minsize", "selfHarmEffect", "starveRate")
+LEGACY_ATTRIBUTES = {
+    Eucalyptus: _LEGACY_PLANT,
+    MangoTree: _LEGACY_PLANT + ("fruitRate", "maxFruit"),
+    Elderberry: _LEGACY_PLANT + ("berryRate", "maxBerry"),
+    Grass: _LEGACY_PLANT,
+    Rabbit: _LEGACY_ANIMAL,
+    Koala: _LEGACY_ANIMAL,
+    Fox: _LEGACY_ANIMAL + ("huntSuccessRate", "selfHarmRate"),
+    Leopard: _LEGACY_ANIMAL + ("huntSuccessRate", "selfHarmRate"),
+}
+
+
+def _dict_organism(species):
+    organism = species()
+    legacy = _DictOrganism()
+    for name in LEGACY_ATTRIBUTES[species]:
+        setattr(legacy, name, getattr(organism, name))
+    return legacy
+
+
+def _bytes_per_organism(factory, count):
+    organisms = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        organisms[i] = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def memory_benchmark(count=10000):
+    """
+    Docstring for memory_benchmark
+    Measure the memory of count organisms per species, once with the
+    slotted classes and once with the former __dict__ layout.
+
+    :param count: Organisms created per species and layout
+    :type count: int
+    :return: One result record per species
+    :rtype: list[dict]
+
+    >>> record = memory_benchmark(count=100)[3]
+    >>> record["species"]
+    'Grass'
+    >>> record["slotted_bytes"] < record["dict_bytes"]
+    True
+    """
+    results = []
+    for species in SPECIES:
+        slotted = _bytes_per_organism(species, count)
+        legacy = _bytes_per_organism(lambda: _dict_organism(species), count)
+        results.append({
+            "benchmark": "memory",
+            "species": species.__name__,
+            "count": count,
+            "slotted_bytes": round(slotted, 1),
+            "dict_bytes": round(legacy, 1),
+            "saved_bytes": round(legacy - slotted, 1),
+            "saved_percent": round(100 * (legacy - slotted) / legacy, 1),
+        })
+    return results
+
+
+def build_scenario(scenario, organisms, seed=0):
+    """
+    Docstring for build_scenario
+    Island with about the given number of organisms mixed as in
+    SCENARIOS. The island is twice as large as the area its plants
+    take, so the plants can still expand.
+
+    :param scenario: Key of SCENARIOS
+    :type scenario: str
+    :param organisms: Total number of organisms
+    :type organisms: int
+    :param seed: Seed of the island
+    :type seed: int
+    :return: The populated island
+    :rtype: Ecosystem
+
+    >>> eco = build_scenario("balanced", 1000)
+    >>> len(eco.flora) + len(eco.fauna)
+    1000
+    >>> eco.census()["Rabbit"]
+    200
+    """
+    counts = {species: round(share * organisms) for species, share
+              in SCENARIOS[scenario].items()}
+    area = sum(count * species.maxIndividualArea
+               for species, count in counts.items()
+               if issubclass(species, Flora))
+    island = Ecosystem(2 * area, 0, 25, seed=seed)
+    for species, count in counts.items():
+        for organism in island.spawn(species, count):
+            island.add_organism(organism)
+    return island
+
+
+def phase_benchmark(scenario, organisms, days=3, seed=0):
+    """
+    Docstring for phase_benchmark
+    Run a few days on a scenario island with Ecosystem.profile on,
+    so every phase of simulate_step is timed separately.
+
+    :param scenario: Key of SCENARIOS
+    :type scenario: str
+    :param organisms: Organisms on the island at the start
+    :type organisms: int
+    :param days: Simulated days
+    :type days: int
+    :param seed: Seed of the island
+    :type seed: int
+    :return: Result record with the seconds per day of every phase
+    :rtype: dict
+
+    >>> record = phase_benchmark("plant-heavy", 1000, days=2)
+    >>> list(record["phases"]) == list(STEP_PHASES)
+    True
+    >>> record["final_organisms"] > 0
+    True
+    """
+    start = time.perf_counter()
+    island = build_scenario(scenario, organisms, seed)
+    build = time.perf_counter() - start
+
+    island.profile = True
+    for _ in range(days):
+        island.simulate_step()
+
+    stats = island.profile_stats
+    per_day = {name: round(stats["seconds"][name] / days, 6)
+               for name in STEP_PHASES}
+    return {
+        "benchmark": "phases",
+        "scenario": scenario,
+        "organisms": organisms,
+        "days": days,
+        "seed": seed,
+        "build_seconds": round(build, 6),
+        "step_seconds": round(stats["seconds"]["step"] / days, 6),
+        "phases": per_day,
+        "counters": stats["counters"],
+        "final_organisms": sum(island.totals()),
+    }
+
+
+def _parse_list(convert):
+    return lambda text: [convert(item) for item in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+    memory = commands.add_parser("memory", help="bytes per organism")
+    memory.add_argument("--count", type=int, default=10000)
+    phases = commands.add_parser("phases", help="seconds per step phase")
+    phases.add_argument("--sizes", type=_parse_list(int),
+                        default=list(SIZES))
+    phases.add_argument("--scenarios", type=_parse_list(str),
+                        default=list(SCENARIOS))
+    phases.add_argument("--days", type=int, default=3)
+    phases.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.benchmark == "memory":
+        results = memory_benchmark(args.count)
+    elif args.benchmark == "phases":
+        results = (phase_benchmark(scenario, size, args.days, args.seed)
+                   for size in args.sizes for scenario in args.scenarios)
+    for record in results:
+        print(json.dumps(record), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,56 @@ methods will be used to start a simulation.
 """
 __author__ = "8407548, Winata, 8655943, Quan"
 import random
+import time
+from bisect import bisect_left
+try:
+    import numpy
+except ImportError:  # vectorized draws are optional
+    numpy = None
+
+# Phases of a day that may draw from their own random stream
+PHASES = ("weather", "storm", "expansion", "feeding", "reproduction",
+          "movement")
+
+# Phases of Ecosystem.simulate_step in the order they run
+STEP_PHASES = ("aging", "environment", "expansion", "grow", "fruiting",
+               "movement", "feeding", "reproduction", "cleanup")
+
+# Counters collected while Ecosystem.profile is set
+PROFILE_COUNTERS = ("prey_scans", "forage_attempts", "seedlings",
+                    "removed")
+
+# Why an organism died, see Lifeforms.die
+DEATH_CAUSES = ("storm", "eaten", "hunted", "starvation", "self_harm",
+                "other")
+
+# Island of a dead organism still listed in flora or fauna, see
+# Ecosystem._remove_dead
+_TOMBSTONE = object()
+
+
+def _stream(island, phase):
+    """
+    Docstring for _stream
+    Random generator an organism uses in the given phase: the stream
+    of its ecosystem, or the global random module for organisms that
+    do not belong to an ecosystem.
+
+    :param island: Ecosystem of the organism, may be anything else
+    :param phase: One of PHASES
+    :type phase: str
+    :return: Generator with the interface of random.Random
+
+    >>> _stream(None, "feeding") is random
+    True
+    >>> eco = Ecosystem(100, 10, 25)
+    >>> _stream(eco, "feeding") is eco.rng
+    True
+    """
+    streams = getattr(island, "streams", None)
+    if streams is None:
+        return random
+    return streams[phase]
 
 # Ecosystem and its lifeforms
 
@@ -32,15 +82,356 @@ class Ecosystem():
     :vartype flora: list[Flora]
     :var fauna: List of all animal organisms
     :vartype fauna: list[Fauna]
+    :var occupied_area: Area taken by the living plants, kept up to date
+        on every add and death instead of being recounted
+    :vartype occupied_area: int
+    :var debug: Recount the occupied area on every available_area call
+        and fail if the running counter drifted
+    :vartype debug: bool
+    :var recycle: Keep swept dead plants on a free list and reuse them
+        as seedlings instead of constructing new objects
+    :vartype recycle: bool
+    :var fused: Run each day with one fused pass per population, see
+        _fused_step. Gives the same results as the multi-pass step.
+    :vartype fused: bool
+    :var seed: Seed of the random generator, None for a random seed
+    :vartype seed: int or None
+    :var rng: Random generator of this ecosystem
+    :vartype rng: random.Random
+    :var streams: Generator used by each phase of a day, all phases
+        share rng until split_streams is called
+    :vartype streams: dict[str, random.Random]
+    :var batch_draws: Draw the expansion and reproduction bonuses of
+        a whole species in one vectorized call, see
+        _batch_expansion_requests and _batch_offspring
+    :vartype batch_draws: bool
+    :var day_stats: Births, deaths per cause (deaths_<cause>) and the
+        biomass eaten from plants on the last simulated day
+    :vartype day_stats: dict[str, float]
+    :var observers: Callables invoked with the ecosystem at the end of
+        every simulate_step, e.g. a recorder.CensusRecorder
+    :vartype observers: list
+    :var profile: Time every phase of simulate_step and count prey
+        lookups, forage attempts, seedlings and removed organisms.
+        Costs nothing while off. See profile_stats and last_profile.
+    :vartype profile: bool
+    :var profile_stats: Seconds per phase and counters summed over all
+        profiled days since reset_profile
+    :vartype profile_stats: dict
+    :var last_profile: Seconds per phase and counters of the last
+        profiled day, readable by observers
+    :vartype last_profile: dict or None
+    :var grid: Cells of the spatial mode, None while the island is a
+        single well-mixed pool, see enable_grid
+    :vartype grid: SpatialGrid or None
+    :var compact_threshold: Dead organisms stay in flora and fauna as
+        tombstones until they make up this fraction of the list, then
+        the list is compacted at the end of the day. 0 compacts every
+        day. See totals for the number of listed living organisms.
+    :vartype compact_threshold: float
+    :var cohorts: Grass stored as cohorts of equal size instead of one
+        object per blade, None while every blade is an object, see
+        enable_cohorts
+    :vartype cohorts: GrassCohorts or None
+    :var lazy_growth: Plants are not grown every day but only brought
+        up to date when their size is needed, see enable_lazy_growth
+    :vartype lazy_growth: bool
+    :var growth_clock: Number of grow phases run so far
+    :vartype growth_clock: int
+    :var steady: States the island is in since the end of a day, with
+        the day they were entered: 'fauna_extinct', 'flora_extinct'
+        and 'saturated' (no seedling of any living plant species fits
+        into the free area). See skip_steady.
+    :vartype steady: dict[str, int]
+    :var weather_trace: Weather replayed instead of drawn, day d uses
+        entry d - 1, see weather.WeatherTrace. Not part of a
+        checkpoint, set it again after resuming.
+    :vartype weather_trace: weather.WeatherTrace or None
     """
 
-    def __init__(self, size: int, days: int, temperature: int):
+    # Upper bound of recycled plants kept per species
+    free_list_limit = 10000
+
+    def __init__(self, size: int, days: int, temperature: int,
+                 seed=None):
         self.size = size
         self.day = 0
         self.weathercon = None
         self.temperature = temperature
         self.flora = []
         self.fauna = []
+        self.prey_index = None
+        self.plant_pool = None
+        self.occupied_area = 0
+        self.debug = False
+        self._population = {}
+        self.recycle = True
+        self._prototypes = {}
+        self._free_plants = {}
+        self.fused = False
+        self._deaths = {Flora: 0, Fauna: 0}
+        # Deaths so far per (species name, cause), see leaping.py
+        self._species_deaths = {}
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.streams = dict.fromkeys(PHASES, self.rng)
+        self._bulk_rng = None
+        self.batch_draws = False
+        self.day_stats = self._empty_day_stats()
+        self.observers = []
+        self._newborns = []
+        self._breeders = None
+        self.profile = False
+        self.last_profile = None
+        self._lookups = (0, 0)
+        self.grid = None
+        self.compact_threshold = 0.25
+        self._tombstones = {Flora: 0, Fauna: 0}
+        self._dead_today = []
+        self.cohorts = None
+        self.lazy_growth = False
+        self.growth_clock = 0
+        self.steady = {}
+        self.weather_trace = None
+        self.reset_profile()
+
+    def enable_grid(self, width, height=None):
+        """
+        Docstring for enable_grid
+        Switch to the spatial mode: the island is split into
+        width x height cells of equal area. Animals only hunt and
+        forage in their own and the 8 neighboring cells and move to a
+        random neighboring cell every day. Plants only expand into
+        neighboring cells that have room left. Organisms without a
+        cell get a random one.
+
+        :param width: Cells per row
+        :type width: int
+        :param height: Cells per column, width if None
+        :type height: int or None
+        :return: None
+
+        Test 1: Every organism gets a cell
+        >>> eco = Ecosystem(900, 10, 25, seed=1)
+        >>> for _ in range(5):
+        ...     eco.add_organism(Grass())
+        >>> eco.enable_grid(3)
+        >>> eco.add_organism(Rabbit())
+        >>> all(0 <= o.cell < 9 for o in eco.flora + eco.fauna)
+        True
+
+        Test 2: Plants take area of their cell
+        >>> sum(eco.grid.occupied), eco.grid.capacity
+        (5, 100.0)
+        """
+        if self.cohorts is not None:
+            raise ValueError("grass cohorts need a well-mixed island")
+        self.grid = SpatialGrid(width, height or width, self.size)
+        rng = self.streams["movement"]
+        for organism in self.flora + self.fauna:
+            if organism.cell is None:
+                organism.cell = rng.randrange(self.grid.cells)
+        for plant in self.flora:
+            if plant.alive:
+                self.grid.occupied[plant.cell] += plant.maxIndividualArea
+
+    def enable_cohorts(self):
+        """
+        Docstring for enable_cohorts
+        Store the grass as cohorts: blades of equal size are only
+        counted, so memory grows with the number of sizes instead of
+        the number of blades. Growth, expansion, grazing and storm
+        losses apply to whole cohorts, see GrassCohorts. Grass added
+        later is merged into the cohorts. Grass with other constants
+        than the Grass class keeps being stored as objects.
+
+        :return: None
+
+        Test 1: Grass objects become cohorts
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> for _ in range(3):
+        ...     eco.add_organism(Grass())
+        >>> eco.add_organism(MangoTree())
+        >>> eco.enable_cohorts()
+        >>> len(eco.flora), eco.cohorts.sizes, eco.totals()
+        (1, {0.1: 3}, (4, 0))
+
+        Test 2: Added grass joins its cohort
+        >>> eco.add_organism(Grass())
+        >>> eco.cohorts.sizes, eco.census()["Grass"], eco.available_area()
+        ({0.1: 4}, 4, 91)
+
+        Test 3: The spatial mode is not supported
+        >>> eco.enable_grid(2)
+        Traceback (most recent call last):
+        ...
+        ValueError: grass cohorts need a well-mixed island
+        """
+        if self.grid is not None:
+            raise ValueError("grass cohorts need a well-mixed island")
+        self.cohorts = GrassCohorts(Grass)
+        flora = []
+        for plant in self.flora:
+            if plant.__class__ is not Grass:
+                flora.append(plant)
+                continue
+            if plant.alive and not plant.is_alive():
+                plant.die()
+            if plant.alive:
+                self.cohorts.add(plant.currentsize, 1)
+            # Keeps dead blades from becoming tombstones of the flora
+            plant.island = None
+        self.flora = flora
+        self._tombstones[Flora] = sum(1 for plant in flora
+                                      if plant.island is _TOMBSTONE)
+
+    def enable_lazy_growth(self):
+        """
+        Docstring for enable_lazy_growth
+        Stop growing every plant every day. Each plant remembers the
+        growth_clock of its last update (sized_at) and its size then;
+        its currentsize is only brought up to date, in closed form,
+        when expansion, fruiting or eating needs it. Plants that only
+        sit at their maxsize then cost nothing in the grow phase.
+
+        A stale currentsize never exceeds the true size, so is_alive
+        and other reads stay correct for living plants. Results equal
+        daily growth up to floating point rounding, call settle_growth
+        before reading the sizes of all plants.
+
+        :return: None
+
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.add_organism(Grass())
+        >>> eco.enable_lazy_growth()
+        >>> eco._phase_grow()
+        >>> eco.flora[0].currentsize
+        0.1
+        >>> eco.settle_growth()
+        >>> round(eco.flora[0].currentsize, 3)
+        0.12
+        """
+        self.lazy_growth = True
+        for plant in self.flora:
+            plant.sized_at = self.growth_clock
+
+    def settle_growth(self):
+        """
+        Docstring for settle_growth
+        Bring the currentsize of every plant up to date, see
+        enable_lazy_growth.
+
+        :return: None
+        """
+        for plant in self.flora:
+            if plant.island is self:
+                plant._settle()
+
+    def add_cohort(self, count, size=None):
+        """
+        Docstring for add_cohort
+        Add blades of grass without creating an object for each.
+
+        :param count: Number of blades
+        :type count: int
+        :param size: Size of the blades, minsize of Grass if None
+        :type size: float or None
+        :return: None
+
+        >>> eco = Ecosystem(10 ** 7, 10, 25)
+        >>> eco.enable_cohorts()
+        >>> eco.add_cohort(10 ** 6)
+        >>> eco.census(), eco.totals()
+        ({'Grass': 1000000}, (1000000, 0))
+        """
+        species = self.cohorts.species
+        self.cohorts.add(species.minsize if size is None else size, count)
+        name = species.__name__
+        self._population[name] = self._population.get(name, 0) + count
+        self.occupied_area += count * species.maxIndividualArea
+
+    def _kill_blades(self, size, count, cause):
+        # Counterpart of _on_death for blades of a cohort
+        species = self.cohorts.species
+        self.cohorts.remove(size, count)
+        self._population[species.__name__] -= count
+        key = (species.__name__, cause)
+        self._species_deaths[key] = self._species_deaths.get(key, 0) + count
+        self.day_stats["deaths_" + cause] += count
+        self._deaths[Flora] += count
+        self.occupied_area -= count * species.maxIndividualArea
+
+    @staticmethod
+    def _empty_profile():
+        return {"days": 0,
+                "seconds": dict.fromkeys(STEP_PHASES + ("step",), 0.0),
+                "counters": dict.fromkeys(PROFILE_COUNTERS, 0)}
+
+    def reset_profile(self):
+        """
+        Docstring for reset_profile
+        Start summing the profile_stats from zero.
+
+        :return: None
+        """
+        self.profile_stats = self._empty_profile()
+
+    @staticmethod
+    def _empty_day_stats():
+        """
+        Docstring for _empty_day_stats
+        Counters of a day that has not happened yet, see day_stats.
+
+        :return: Zero births, deaths per cause and eaten biomass
+        :rtype: dict[str, float]
+
+        >>> Ecosystem._empty_day_stats()["births"]
+        0
+        """
+        stats = {"births": 0}
+        for cause in DEATH_CAUSES:
+            stats["deaths_" + cause] = 0
+        stats["eaten_biomass"] = 0
+        return stats
+
+    def split_streams(self):
+        """
+        Docstring for split_streams
+        Give every phase of a day its own generator, seeded from rng.
+        Drawing more or fewer numbers in one phase then no longer
+        shifts the numbers of the other phases.
+
+        :return: None
+
+        Test 1: Every phase has its own generator
+        >>> eco = Ecosystem(100, 10, 25, seed=1)
+        >>> eco.split_streams()
+        >>> len({id(stream) for stream in eco.streams.values()})
+        6
+
+        Test 2: The streams only depend on the seed
+        >>> other = Ecosystem(100, 10, 25, seed=1)
+        >>> other.split_streams()
+        >>> a = eco.streams["storm"].random()
+        >>> a == other.streams["storm"].random()
+        True
+        """
+        for phase in PHASES:
+            self.streams[phase] = random.Random(self.rng.getrandbits(64))
+
+    @property
+    def bulk_rng(self):
+        """
+        Docstring for bulk_rng
+        NumPy generator for vectorized draws, created on first use
+        and seeded from rng. None if numpy is not installed.
+
+        :rtype: numpy.random.Generator or None
+        """
+        if self._bulk_rng is None and numpy is not None:
+            self._bulk_rng = numpy.random.default_rng(
+                self.rng.getrandbits(64))
+        return self._bulk_rng
 
     def add_organism(self, organism):
         """
@@ -74,11 +465,32 @@ class Ecosystem():
         >>> e.island is eco2
         True
         """
+        if (self.cohorts is not None
+                and organism.__class__ is self.cohorts.species):
+            # Only the size of the blade is kept
+            if organism.alive:
+                self.add_cohort(1, organism.currentsize)
+            return
         organism.island = self
+        if self.lazy_growth and isinstance(organism, Flora):
+            organism.sized_at = self.growth_clock
+        if self.grid is not None and organism.cell is None:
+            organism.cell = self.streams["movement"].randrange(
+                self.grid.cells)
         if isinstance(organism, Flora):
             self.flora.append(organism)
+            if organism.alive:
+                self.occupied_area += organism.maxIndividualArea
+                if self.grid is not None:
+                    self.grid.occupied[organism.cell] += (
+                        organism.maxIndividualArea)
         elif isinstance(organism, Fauna):
             self.fauna.append(organism)
+        else:
+            return
+        if organism.alive:
+            name = organism.__class__.__name__
+            self._population[name] = self._population.get(name, 0) + 1
 
     def available_area(self) -> int:
         """
@@ -104,231 +516,2287 @@ class Ecosystem():
         >>> eco.size = 0
         >>> eco.available_area()
         0
+
+        Test 4: Dead plants give their area back
+        >>> eco = Ecosystem(size=100, days=10, temperature=25)
+        >>> eco.debug = True
+        >>> m = MangoTree()
+        >>> eco.add_organism(m)
+        >>> eco.available_area()
+        95
+        >>> m.die()
+        >>> eco.available_area()
+        100
+        """
+        if self.debug:
+            used_area = self.recount_occupied_area()
+            if used_area != self.occupied_area:
+                raise RuntimeError(f"occupied area counter is"
+                                   f" {self.occupied_area}, recount"
+                                   f" gives {used_area}")
+        return max(0, self.size - self.occupied_area)
+
+    def recount_occupied_area(self) -> int:
+        """
+        Docstring for recount_occupied_area
+        Sum the area of all living plants with a full scan over the
+        flora. Used by the debug check of available_area.
+
+        :return: Area occupied by living plants
+        :rtype: int
+
+        Test 1: Empty ecosystem
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.recount_occupied_area()
+        0
+
+        Test 2: Matches the running counter
+        >>> eco.add_organism(Grass())
+        >>> eco.add_organism(Eucalyptus())
+        >>> eco.recount_occupied_area() == eco.occupied_area == 7
+        True
+
+        Test 3: Dead plants are not counted
+        >>> eco.flora[0].die()
+        >>> eco.recount_occupied_area()
+        6
         """
         used_area = sum(p.maxIndividualArea for p
                         in self.flora if p.is_alive())
-        return max(0, self.size - used_area)
+        if self.cohorts is not None:
+            used_area += (self.cohorts.blades
+                          * self.cohorts.species.maxIndividualArea)
+        return used_area
+
+    def spawn(self, species, count):
+        """
+        Docstring for spawn
+        Create count fresh individuals of a species for this
+        ecosystem without running the __init__ chain for each one.
+        Every individual is a copy of a per-species prototype, reusing
+        recycled dead plants from the free list first.
+        The new organisms are not added to flora or fauna.
+
+        :param species: Class of the organisms to create
+        :type species: type
+        :param count: Number of organisms to create
+        :type count: int
+        :return: The new organisms
+        :rtype: list[Lifeforms]
+
+        Test 1: Spawned organisms look like newly constructed ones
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> m = eco.spawn(MangoTree, 2)[1]
+        >>> (m.age, m.currentsize, m.fruitYield, m.is_alive())
+        (0, 5, 0, True)
+        >>> m.island is eco
+        True
+
+        Test 2: Recycled plants start over
+        >>> m.age, m.fruitYield, m.alive = 7, 12, False
+        >>> eco._free_plants[MangoTree] = [m]
+        >>> eco.spawn(MangoTree, 1)[0] is m
+        True
+        >>> (m.age, m.fruitYield, m.is_alive())
+        (0, 0, True)
+
+        Test 3: Nothing to spawn
+        >>> eco.spawn(Grass, 0)
+        []
+        """
+        prototype = self._prototypes.get(species)
+        if prototype is None:
+            prototype = self._prototypes[species] = species()
+            prototype.island = self
+        if isinstance(prototype, Flora):
+            prototype.sized_at = self.growth_clock
+        kind = prototype.__class__
+        state = [(name, getattr(prototype, name))
+                 for name in _slot_names(kind)]
+        free = self._free_plants.get(species)
+
+        organisms = []
+        while free and len(organisms) < count:
+            organism = free.pop()
+            organism.__class__ = kind
+            organisms.append(organism)
+        for _ in range(count - len(organisms)):
+            organisms.append(kind.__new__(kind))
+        for organism in organisms:
+            for name, value in state:
+                setattr(organism, name, value)
+        return organisms
+
+    def census(self):
+        """
+        Docstring for census
+        Number of living organisms per species. The counters are kept
+        up to date on every add and death, so this costs O(species)
+        instead of a scan over flora and fauna.
+
+        :return: Mapping of species class name to population
+        :rtype: dict[str, int]
+
+        Test 1: Empty ecosystem
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.census()
+        {}
+
+        Test 2: Added organisms are counted per species
+        >>> g1, g2, r = Grass(), Grass(), Rabbit()
+        >>> for organism in (g1, g2, r):
+        ...     eco.add_organism(organism)
+        >>> eco.census()
+        {'Grass': 2, 'Rabbit': 1}
+
+        Test 3: Dead organisms are no longer counted
+        >>> g1.die()
+        >>> r.die()
+        >>> eco.census()
+        {'Grass': 1, 'Rabbit': 0}
+        """
+        return dict(self._population)
+
+    def _on_death(self, organism, cause="other"):
+        """
+        Docstring for _on_death
+        Called by Lifeforms.die when an organism of this ecosystem
+        dies, so the counters and per-step indexes can forget it.
+
+        :param organism: The organism that just died
+        :type organism: Lifeforms
+        :param cause: One of DEATH_CAUSES
+        :type cause: str
+        :return: None
+
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> r = Rabbit()
+        >>> eco.add_organism(r)
+        >>> r.die("hunted")
+        >>> eco.day_stats["deaths_hunted"], eco.census()
+        (1, {'Rabbit': 0})
+        """
+        name = organism.__class__.__name__
+        self._population[name] -= 1
+        key = (name, cause)
+        self._species_deaths[key] = self._species_deaths.get(key, 0) + 1
+        self.day_stats["deaths_" + cause] += 1
+        self._dead_today.append(organism)
+        if isinstance(organism, Flora):
+            self._deaths[Flora] += 1
+            self.occupied_area -= organism.maxIndividualArea
+            if self.grid is not None:
+                self.grid.occupied[organism.cell] -= (
+                    organism.maxIndividualArea)
+            if self.plant_pool is not None:
+                self.plant_pool.discard(organism)
+        else:
+            self._deaths[Fauna] += 1
+            if self.prey_index is not None:
+                self.prey_index.discard(organism)
+
+    def environment(self):
+        """
+        Docstring for environment
+        Create the weather and temperature of the ecosystem
+        Weather(con) has 3 modes: windy, storm and normal
+        Temperature can vary between 22 to 40
+        Both weather and temperature are randomized, unless they are
+        read from the weather_trace
+
+        :return: None
+
+        Test 1: Random weather
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.environment()
+        >>> eco.weathercon in ['windy', 'storm', 'normal']
+        True
+        >>> 22 <= eco.temperature <= 40
+        True
+
+        Test 2: Replayed weather
+        >>> from weather import WeatherTrace
+        >>> eco.weather_trace = WeatherTrace.from_days(
+        ...     [(30, "storm"), (24, "windy")])
+        >>> eco.day = 2
+        >>> eco.environment()
+        >>> eco.temperature, eco.weathercon
+        (24, 'windy')
+        """
+        if self.weather_trace is not None:
+            self.temperature, self.weathercon = self.weather_trace[
+                self.day - 1]
+            return
+
+        rng = self.streams["weather"]
+        self.temperature = rng.randrange(22, 40)
+        r = rng.random()
+        if r < 0.3:
+            self.weathercon = "windy"
+        elif r < 0.4:
+            self.weathercon = "storm"
+        else:
+            self.weathercon = "normal"
+
+    def apply_environment_effects(self):
+        """
+        Docstring for apply_environment_effects
+        Applying the effects of the method environment
+        When the weather(con) is normal then no special effects happen
+        When the weather(con) is windy then the plants can
+        reproduce(expand) more than normal
+        When the weather(con) is storm then one random fauna and
+        one random flora dies
+        When the temperature is atleast 36 then huntSuccessRate for
+        carnivore and omnivore will be cut half
+
+        :return: None
+
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.flora = [Grass()]
+        >>> eco.fauna = [Rabbit()]
+        >>> eco.weathercon = 'windy'
+        >>> eco.apply_environment_effects()
+        >>> all(plant.current_expand_modifier == 1.5 for plant in eco.flora)
+        True
+        >>> eco.weathercon = 'storm'
+        >>> eco.apply_environment_effects()
+        >>> a = any(not plant.is_alive() for plant in eco.flora)
+        >>> b = any(not animal.is_alive() for animal in eco.fauna)
+        >>> a or b
+        True
+        >>> eco.temperature = 36
+        >>> leopard = Leopard()
+        >>> eco.fauna.append(leopard)
+        >>> eco.apply_environment_effects()
+        >>> leopard.current_hunt_modifier
+        0.5
+        """
+
+        # --- WINDY ---
+        if self.weathercon == "windy":
+            for plant in self.flora:
+                plant.current_expand_modifier = 1.5
+
+        # --- STORM ---
+        if self.weathercon == "storm":
+            self._storm()
+
+        # --- HIGH TEMPERATURE ---
+        if self.temperature >= 36:
+            for animal in self.fauna:
+                if hasattr(animal, "huntSuccessRate"):
+                    animal.current_hunt_modifier = 0.5
+
+    def _storm(self):
+        """
+        Docstring for _storm
+        Kill one random plant and one random animal.
+
+        :return: None
+        """
+        rng = self.streams["storm"]
+        cohorts = self.cohorts
+        if (cohorts is not None and cohorts.blades
+                and rng.randrange(self.totals()[0]) < cohorts.blades):
+            # The random plant is a blade of grass
+            self._kill_blades(cohorts.choose(rng), 1, "storm")
+            plant = None
+        else:
+            plant = self._pick_living(self.flora, Flora, rng)
+        if plant is not None:
+            plant.die("storm")
+        animal = self._pick_living(self.fauna, Fauna, rng)
+        if animal is not None:
+            animal.die("storm")
+
+    def _pick_living(self, population, kind, rng):
+        """
+        Docstring for _pick_living
+        Uniformly random organism of flora or fauna that is not a
+        tombstone. Tombstones are drawn again, which is cheap as they
+        are at most compact_threshold of the list.
+
+        :param population: flora or fauna
+        :type population: list[Lifeforms]
+        :param kind: Flora or Fauna
+        :type kind: type
+        :param rng: Random generator
+        :return: The organism, None if there is none
+        :rtype: Lifeforms or None
+
+        >>> eco = Ecosystem(100, 10, 25, seed=1)
+        >>> rabbits = [Rabbit(), Rabbit()]
+        >>> for rabbit in rabbits:
+        ...     eco.add_organism(rabbit)
+        >>> rabbits[0].die()
+        >>> eco._remove_dead()
+        >>> {eco._pick_living(eco.fauna, Fauna, eco.rng) is rabbits[1]
+        ...  for _ in range(10)}
+        {True}
+        >>> eco._pick_living(eco.flora, Flora, eco.rng) is None
+        True
+        """
+        if len(population) <= self._tombstones[kind]:
+            return None
+        organism = rng.choice(population)
+        while organism.island is _TOMBSTONE:
+            organism = rng.choice(population)
+        return organism
+
+    def totals(self):
+        """
+        Docstring for totals
+        Number of plants and animals in flora and fauna without the
+        tombstones, i.e. what len(flora) and len(fauna) would be if
+        the dead were removed every day. Blades of grass cohorts are
+        counted as plants.
+
+        :return: Plants and animals
+        :rtype: tuple[int, int]
+
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.add_organism(Grass())
+        >>> for _ in range(5):
+        ...     eco.add_organism(Fox())
+        >>> eco.fauna[0].die()
+        >>> eco._remove_dead()
+        >>> len(eco.fauna), eco.totals()
+        (5, (1, 4))
+        """
+        plants = len(self.flora) - self._tombstones[Flora]
+        if self.cohorts is not None:
+            plants += self.cohorts.blades
+        return plants, len(self.fauna) - self._tombstones[Fauna]
+
+    def simulate_step(self):
+        """
+        Docstring for simulate_step
+        Advances the simulation by a day
+
+        This method performs a full simulation step, including:
+        - Aging all organisms
+        - Resetting daily modifiers
+        - Randomizing and applying environmental conditions
+        - Growing and expanding plants based on available area
+        - Handling animal foraging, hunting, and starvation
+        - Processing reproduction for plants and animals
+        - Removing dead organisms from the ecosystem
+
+        The ecosystem state is modified in place.
+
+        :return: None
+        """
+        if self.fused:
+            if self.profile:
+                # The phases are fused, so only the whole day is timed
+                start = time.perf_counter()
+                self._fused_step()
+                self._record_profile({"step": time.perf_counter() - start},
+                                     {})
+            else:
+                self._fused_step()
+            return
+
+        self._begin_day()
+        if self.profile:
+            self._profiled_phases()
+        else:
+            for name, phase in self.step_phases():
+                phase()
+        self._end_day()
+
+    def skip_steady(self, days):
+        """
+        Docstring for skip_steady
+        Advance an island without animals by days at a cost that does
+        not grow with the number of plants. With nothing left to eat
+        them, plants only grow, fruit, die in storms and expand into
+        free area, so each day only
+        - draws the weather and lets a storm kill its plant
+        - draws the seedlings of all mature plants of a species at
+          once and grants them in random order until the free area
+          is used up, like _grant_expansion does
+        Ages, sizes and fruit or berry yields are brought up to date
+        in closed form at the end (see enable_lazy_growth), observers
+        called in between see them as they were before the skip.
+
+        :param days: Number of days
+        :type days: int
+        :return: None
+        Raises ValueError if animals live on the island or it has a
+        grid.
+
+        Test 1: A saturated island stays full
+        >>> eco = Ecosystem(100, 10, 25, seed=4)
+        >>> for _ in range(20):
+        ...     eco.add_organism(MangoTree())
+        >>> eco._update_steady()
+        >>> eco.steady
+        {'fauna_extinct': 0, 'saturated': 0}
+        >>> eco.skip_steady(30)
+        >>> eco.day, eco.steady["fauna_extinct"], eco.totals()[0] <= 20
+        (30, 0, True)
+        >>> m = max(eco.flora, key=lambda plant: plant.age)
+        >>> m.age, m.currentsize, m.fruitYield
+        (30, 40, 30)
+
+        Test 2: Seedlings fill the free area
+        >>> eco = Ecosystem(200, 10, 25, seed=4)
+        >>> for _ in range(10):
+        ...     eco.add_organism(Grass())
+        >>> eco.skip_steady(60)
+        >>> eco.recount_occupied_area() == eco.occupied_area > 150
+        True
+        >>> "saturated" in eco.steady
+        True
+
+        Test 3: Animals cannot be skipped
+        >>> eco.add_organism(Rabbit())
+        >>> eco.skip_steady(1)
+        Traceback (most recent call last):
+        ...
+        ValueError: the island still has animals
+        """
+        if self.totals()[1]:
+            raise ValueError("the island still has animals")
+        if self.grid is not None:
+            raise ValueError("skipping needs a well-mixed island")
+        was_lazy = self.lazy_growth
+        if not was_lazy:
+            self.enable_lazy_growth()
+
+        # Mature plants per class, the others under the growth_clock
+        # they mature at. Plants are not settled during the skip, so
+        # sized_at and currentsize tell where a plant was counted
+        mature = {}
+        ripening = {}
+        for plant in self.flora:
+            if plant.island is self and plant.alive:
+                plant._settle()
+                self._count_maturity(plant, mature, ripening, 1)
+
+        for day in range(1, days + 1):
+            self._begin_day()
+            self.environment()
+            if self.weathercon == "storm":
+                dead = len(self._dead_today)
+                self._storm()
+                for plant in self._dead_today[dead:]:
+                    if isinstance(plant, Flora):
+                        self._count_maturity(plant, mature, ripening, -1)
+            for kind, count in ripening.pop(self.growth_clock,
+                                            {}).items():
+                mature[kind] = mature.get(kind, 0) + count
+
+            for species, count in self._draw_seedlings(mature).items():
+                seedlings = self.spawn(species, count)
+                for seedling in seedlings:
+                    # Aged by days at the end like all plants
+                    seedling.age = -day
+                self.flora.extend(seedlings)
+                name = species.__name__
+                self._population[name] = (self._population.get(name, 0)
+                                          + count)
+                self.day_stats["births"] += count
+                self.occupied_area += count * species.maxIndividualArea
+                self._count_maturity(seedlings[0], mature, ripening,
+                                     count)
+
+            self.growth_clock += 1
+            if self.cohorts is not None:
+                self.cohorts.grow()
+            self._remove_dead()
+            self._end_day()
+
+        modifier = 1.5 if self.weathercon == "windy" else 1.0
+        for plant in self.flora:
+            if plant.island is not self or not plant.alive:
+                continue
+            plant.age += days
+            plant.current_expand_modifier = modifier
+            lived = min(days, plant.age + 1)
+            if plant.isFruiting:
+                plant.fruitYield = min(plant.fruitYield + _yield_gain(
+                    plant, plant.fruitRate, plant.maxFruit, lived),
+                                       plant.maxFruit)
+            if plant.isBerrying:
+                plant.berryYield = min(plant.berryYield + _yield_gain(
+                    plant, plant.berryRate, plant.maxBerry, lived),
+                                       plant.maxBerry)
+        if not was_lazy:
+            self.settle_growth()
+            self.lazy_growth = False
+
+    def _count_maturity(self, plant, mature, ripening, count):
+        """
+        Docstring for _count_maturity
+        Add count plants like plant to the mature plants of its class
+        or to the ones ripening until the growth_clock it matures at,
+        see skip_steady. A negative count removes them again.
+
+        :param plant: Plant that is not settled while counted
+        :type plant: Flora
+        :param mature: Class to number of mature plants
+        :type mature: dict[type, int]
+        :param ripening: growth_clock to class to number of plants
+        :type ripening: dict[int, dict[type, int]]
+        :param count: Number of plants
+        :type count: int
+        :return: None
+        """
+        kind = plant.__class__
+        days = _maturity(kind, plant.currentsize)
+        if days is None:
+            return  # never mature enough to expand
+        if plant.sized_at + days <= self.growth_clock:
+            mature[kind] = mature.get(kind, 0) + count
+        else:
+            queue = ripening.setdefault(plant.sized_at + days, {})
+            queue[kind] = queue.get(kind, 0) + count
+
+    def _draw_seedlings(self, mature):
+        """
+        Docstring for _draw_seedlings
+        Seedlings granted to the mature plants of every class today.
+        The bonus seedlings of a class are drawn in one call; if the
+        free area is too small for all, the requests are granted one
+        by one in random order like in _grant_expansion. Grass
+        cohorts get their share as in _grant_cohort_expansion.
+
+        :param mature: Class to number of mature plants
+        :type mature: dict[type, int]
+        :return: Plant class to number of granted seedlings
+        :rtype: dict[type, int]
+
+        >>> eco = Ecosystem(100, 10, 25, seed=1)
+        >>> eco.weathercon = "normal"
+        >>> eco._draw_seedlings({MangoTree: 1000})
+        {<class 'blatt8.MangoTree'>: 20}
+        """
+        modifier = 1.5 if self.weathercon == "windy" else 1.0
+        requests = []  # class, plain entries, bonus entries, seedlings
+        for species, count in mature.items():
+            exact = 1 * species.expandRate * modifier
+            guaranteed = int(exact)
+            bonus = self._binomial(exact - guaranteed, count, "expansion")
+            plain = count - bonus if guaranteed else 0
+            if plain or bonus:
+                requests.append([species, plain, bonus, guaranteed])
+
+        free = self.available_area()
+        if self.cohorts is not None:
+            free = self._grant_cohort_expansion(
+                [(species, plain * seedlings + bonus * (seedlings + 1))
+                 for species, plain, bonus, seedlings in requests], free)
+        wanted = sum((plain * seedlings + bonus * (seedlings + 1))
+                     * species.maxIndividualArea
+                     for species, plain, bonus, seedlings in requests)
+        if wanted <= free:
+            return {species: plain * seedlings + bonus * (seedlings + 1)
+                    for species, plain, bonus, seedlings in requests}
+
+        rng = self.streams["expansion"]
+        granted = {}
+        while requests and free > 0:
+            pick = rng.randrange(sum(request[1] + request[2]
+                                     for request in requests))
+            for request in requests:
+                if pick < request[1] + request[2]:
+                    break
+                pick -= request[1] + request[2]
+            species, plain, bonus, seedlings = request
+            area = species.maxIndividualArea
+            if area > free:
+                requests.remove(request)
+                continue
+            if pick < bonus:
+                request[2] -= 1
+                seedlings += 1
+            else:
+                request[1] -= 1
+            count = min(seedlings, int(free // area))
+            granted[species] = granted.get(species, 0) + count
+            free -= count * area
+            if request[1] + request[2] == 0:
+                requests.remove(request)
+        return granted
+
+    def _profiled_phases(self):
+        """
+        Docstring for _profiled_phases
+        Run the phases of a day like simulate_step, timing each of
+        them and collecting the counters of PROFILE_COUNTERS into
+        last_profile and profile_stats.
+
+        :return: None
+
+        >>> eco = Ecosystem(1000, 10, 25, seed=1)
+        >>> for species in (Grass, Rabbit, Fox):
+        ...     for _ in range(10):
+        ...         eco.add_organism(species())
+        >>> eco.profile = True
+        >>> eco.simulate_step()
+        >>> eco.simulate_step()
+        >>> eco.profile_stats["days"]
+        2
+        >>> sorted(eco.last_profile["counters"])
+        ['forage_attempts', 'prey_scans', 'removed', 'seedlings']
+        >>> eco.last_profile["counters"]["forage_attempts"] > 0
+        True
+        """
+        clock = time.perf_counter
+        seconds = {}
+        counters = {}
+        day_start = clock()
+        for name, phase in self.step_phases():
+            organisms = sum(self.totals())
+            start = clock()
+            phase()
+            seconds[name] = clock() - start
+            if name == "expansion":
+                counters["seedlings"] = sum(self.totals()) - organisms
+            elif name == "cleanup":
+                counters["removed"] = organisms - sum(self.totals())
+        seconds["step"] = clock() - day_start
+        self._record_profile(seconds, counters)
+
+    def _record_profile(self, seconds, counters):
+        # Store one profiled day in last_profile and profile_stats
+        profile = self.last_profile = self._empty_profile()
+        profile["days"] = 1
+        profile["seconds"].update(seconds)
+        prey_scans, forage_attempts = self._lookups
+        profile["counters"].update(counters, prey_scans=prey_scans,
+                                   forage_attempts=forage_attempts)
+
+        total = self.profile_stats
+        total["days"] += 1
+        for name, value in profile["seconds"].items():
+            total["seconds"][name] += value
+        for name, value in profile["counters"].items():
+            total["counters"][name] += value
+
+    def step_phases(self):
+        """
+        Docstring for step_phases
+        The phases of simulate_step in the order they run, so they can
+        be run and timed one by one (see benchmarks.py). Running them
+        between _begin_day and _end_day is the same as simulate_step.
+        Reproduction drawn at each animal's own turn is part of the
+        feeding phase, only batched draws and adding the newborns
+        belong to the reproduction phase.
+
+        :return: Pairs of phase name (see STEP_PHASES) and method
+        :rtype: list[tuple[str, callable]]
+
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> [name for name, phase in eco.step_phases()][:4]
+        ['aging', 'environment', 'expansion', 'grow']
+        """
+        return [(name, getattr(self, "_phase_" + name))
+                for name in STEP_PHASES]
+
+    def _begin_day(self):
+        self.day += 1
+        self.day_stats = self._empty_day_stats()
+        self._newborns = []
+
+    def _end_day(self):
+        self._update_steady()
+        for observer in self.observers:
+            observer(self)
+
+    def _update_steady(self):
+        """
+        Docstring for _update_steady
+        Enter the steady states the island is in now and leave the
+        ones it is no longer in, see steady.
+
+        :return: None
+
+        >>> eco = Ecosystem(2, 10, 25)
+        >>> eco.add_organism(Grass())
+        >>> eco._update_steady()
+        >>> eco.steady
+        {'fauna_extinct': 0}
+        >>> eco.day = 4
+        >>> eco.add_organism(Grass())
+        >>> eco._update_steady()
+        >>> eco.steady
+        {'fauna_extinct': 0, 'saturated': 4}
+        """
+        plants, animals = self.totals()
+        states = []
+        if not animals:
+            states.append("fauna_extinct")
+        if not plants:
+            states.append("flora_extinct")
+        else:
+            free = self.available_area()
+            if all(free < species.maxIndividualArea
+                   for species in SPECIES_BY_ID
+                   if issubclass(species, Flora)
+                   and self._population.get(species.__name__)):
+                states.append("saturated")
+        self.steady = {state: self.steady.get(state, self.day)
+                       for state in states}
+
+    def _phase_aging(self):
+        # Age all organisms and reset their daily modifiers, the
+        # tombstones are left alone like in _fused_step
+        for plant in self.flora:
+            if plant.island is not _TOMBSTONE:
+                plant.age += 1
+                plant.current_expand_modifier = 1.0
+        for animal in self.fauna:
+            if animal.island is not _TOMBSTONE:
+                animal.age += 1
+                animal.current_hunt_modifier = 1.0
+
+    def _phase_environment(self):
+        self.environment()
+
+        self.apply_environment_effects()
+
+    def _phase_expansion(self):
+        # Plants grow and reproduce
+        total_free_area = self.available_area()
+
+        # Collect requests
+        requests = []
+        if self.batch_draws:
+            mature = [plant for plant in self.flora
+                      if (plant.currentsize >= plant.maxsize * 0.5
+                          or plant._settle() >= plant.maxsize * 0.5)
+                      and plant.island is not _TOMBSTONE]
+            requests = self._batch_expansion_requests(mature)
+        else:
+            for plant in self.flora:
+                if plant.island is _TOMBSTONE:
+                    continue  # tombstone
+                requested = plant.expansion_request()
+                if requested > 0:
+                    requests.append((plant, requested))
+
+        if self.cohorts is not None:
+            total_free_area = self._grant_cohort_expansion(
+                requests, total_free_area)
+        self.flora.extend(self._grant_expansion(requests, total_free_area))
+
+    def _phase_grow(self):
+        # Lazily grown plants only need the clock to move on
+        self.growth_clock += 1
+        if not self.lazy_growth:
+            for plant in self.flora:
+                if plant.island is not _TOMBSTONE:
+                    plant.grow()
+        if self.cohorts is not None:
+            self.cohorts.grow()
+
+    def _phase_fruiting(self):
+        for plant in self.flora:
+            if plant.island is not _TOMBSTONE:
+                plant.fruiting()
+
+    def _phase_movement(self):
+        # Only animals on a grid move
+        if self.grid is None:
+            return
+        rng = self.streams["movement"]
+        neighbors = self.grid.neighbors
+        for animal in self.fauna:
+            if animal.island is not _TOMBSTONE:
+                animal.cell = rng.choice(neighbors(animal.cell))
+
+    def _phase_feeding(self):
+        # Animals eat, predators sample prey from a size-sorted index
+        # and foragers sample plants from a pool of living plants
+        self._build_indexes()
+        self._breeders = [] if self.batch_draws else None
+        for animal in self.fauna:
+            if animal.island is not _TOMBSTONE:
+                self._newborns.extend(self._feed(animal, self._breeders))
+        self._drop_indexes()
+
+    def _build_indexes(self):
+        # While profiling, the indexes count their lookups
+        rng = self.streams["feeding"]
+        if self.grid is not None:
+            self.prey_index = SpatialPreyIndex(self.fauna, self.grid, rng)
+            self.plant_pool = SpatialPlantPool(self.flora, self.grid, rng)
+        elif self.cohorts is not None:
+            index = _CountingPreyIndex if self.profile else PreyIndex
+            self.prey_index = index(self.fauna, rng)
+            self.plant_pool = CohortPlantPool(self.flora, self, rng)
+        elif self.profile:
+            self.prey_index = _CountingPreyIndex(self.fauna, rng)
+            self.plant_pool = _CountingPlantPool(self.flora, rng)
+        else:
+            self.prey_index = PreyIndex(self.fauna, rng)
+            self.plant_pool = PlantPool(self.flora, rng)
+
+    def _drop_indexes(self):
+        # The spatial indexes always count their lookups
+        if self.profile:
+            self._lookups = (self.prey_index.lookups,
+                             self.plant_pool.lookups)
+        self.prey_index = None
+        self.plant_pool = None
+
+    def _phase_reproduction(self):
+        if self._breeders:
+            self._newborns.extend(self._batch_offspring(self._breeders))
+        self._breeders = None
+        self._add_newborns()
+
+    def _phase_cleanup(self):
+        self._remove_dead()
+
+    def _add_newborns(self):
+        # Add all newborns
+        self.day_stats["births"] += len(self._newborns)
+        for organism in self._newborns:
+            self.add_organism(organism)
+        self._newborns = []
+
+    def _fused_step(self):
+        """
+        Docstring for _fused_step
+        Same day as simulate_step, but with every per-organism update
+        fused into one pass per population:
+        - plants age, get the weather modifier, request expansion,
+          grow and fruit in a single loop
+        - animals age and get their hunting modifier right before
+          they feed
+        - tombstones are skipped without touching them
+
+        Random numbers are drawn in the same order as in the
+        multi-pass step, so results are identical for a given seed.
+
+        :return: None
+
+        Test 1: Fused and multi-pass steps give the same island
+        >>> def island(fused):
+        ...     eco = Ecosystem(500, 10, 25, seed=7)
+        ...     eco.fused = fused
+        ...     for species in (Grass, MangoTree, Rabbit, Fox, Leopard):
+        ...         for _ in range(20):
+        ...             eco.add_organism(species())
+        ...     for _ in range(30):
+        ...         eco.simulate_step()
+        ...     return eco.census(), [p.currentsize for p in eco.flora]
+        >>> island(True) == island(False)
+        True
+        """
+        self._begin_day()
+        self.environment()
+        windy = self.weathercon == "windy"
+        hot = self.temperature >= 36
+        if self.weathercon == "storm":
+            self._storm()
+
+        # One pass over the plants
+        lazy = self.lazy_growth
+        total_free_area = self.available_area()
+        expand_modifier = 1.5 if windy else 1.0
+        requests = []
+        mature = []
+        for plant in self.flora:
+            if plant.island is _TOMBSTONE:
+                continue  # tombstone
+            plant.age += 1
+            plant.current_expand_modifier = expand_modifier
+            if self.batch_draws:
+                if (plant.currentsize >= plant.maxsize * 0.5
+                        or plant._settle() >= plant.maxsize * 0.5):
+                    mature.append(plant)
+            else:
+                requested = plant.expansion_request()
+                if requested > 0:
+                    requests.append((plant, requested))
+            if not lazy:
+                plant.grow()
+                plant.fruiting()
+        if self.batch_draws:
+            requests = self._batch_expansion_requests(mature)
+
+        if self.cohorts is not None:
+            total_free_area = self._grant_cohort_expansion(
+                requests, total_free_area)
+            self.cohorts.grow()
+        seedlings = self._grant_expansion(requests, total_free_area)
+        if not lazy:
+            for plant in seedlings:
+                plant.grow()
+                plant.fruiting()
+        self.flora.extend(seedlings)
+        self.growth_clock += 1
+        if lazy:
+            # Fruits need the size after today's growth
+            for plant in self.flora:
+                if ((plant.isFruiting or plant.isBerrying)
+                        and plant.island is not _TOMBSTONE):
+                    plant.fruiting()
+
+        # One pass over the animals, after all of them moved
+        self._phase_movement()
+        self._build_indexes()
+        breeders = [] if self.batch_draws else None
+        for animal in self.fauna:
+            if animal.island is _TOMBSTONE:
+                continue  # tombstone
+            animal.age += 1
+            if hot and hasattr(animal, "huntSuccessRate"):
+                animal.current_hunt_modifier = 0.5
+            else:
+                animal.current_hunt_modifier = 1.0
+            self._newborns.extend(self._feed(animal, breeders))
+        self._drop_indexes()
+        if breeders:
+            self._newborns.extend(self._batch_offspring(breeders))
+        self._add_newborns()
+        self._remove_dead()
+        self._end_day()
+
+    def _grant_expansion(self, requests, total_free_area):
+        """
+        Docstring for _grant_expansion
+        Grant the expansion requests of the plants in random order
+        (fairness) until the free area is used up. In the spatial
+        mode a seedling also needs room in a cell next to its parent.
+
+        :param requests: Pairs of plant and number of requested seedlings
+        :type requests: list[tuple[Flora, int]]
+        :param total_free_area: Area the seedlings may take
+        :type total_free_area: int
+        :return: The new seedlings, not yet added to the flora
+        :rtype: list[Flora]
+        """
+        rng = self.streams["expansion"]
+        rng.shuffle(requests)  # fairness
+
+        seedlings = []
+        for plant, requested in requests:
+            max_possible = int(total_free_area // plant.maxIndividualArea)
+            granted = min(requested, max_possible)
+            if granted and self.grid is not None:
+                cells = self.grid.claim(plant.cell, plant.maxIndividualArea,
+                                        granted, rng)
+                granted = len(cells)
+
+            if granted:
+                new_plants = self.spawn(plant.__class__, granted)
+                if self.grid is not None:
+                    for seedling, cell in zip(new_plants, cells):
+                        seedling.cell = cell
+                seedlings.extend(new_plants)
+                name = plant.__class__.__name__
+                self._population[name] += granted
+                self.day_stats["births"] += granted
+                self.occupied_area += granted * plant.maxIndividualArea
+
+            total_free_area -= granted * plant.maxIndividualArea
+            if total_free_area <= 0:
+                break
+        return seedlings
+
+    def _grant_cohort_expansion(self, requests, total_free_area):
+        """
+        Docstring for _grant_cohort_expansion
+        Draw the seedlings the mature grass cohorts request and grant
+        them as one new cohort at minsize. If the free area does not
+        cover all requests, the grass gets the share of the area it
+        requested, like the blades would get on average when asking
+        one by one in random order.
+
+        :param requests: Requests of the plant objects
+        :type requests: list[tuple[Flora, int]]
+        :param total_free_area: Area the seedlings may take
+        :type total_free_area: int
+        :return: Free area left for the plant objects
+        :rtype: int
+
+        Test 1: Enough area for all seedlings
+        >>> eco = Ecosystem(1000, 10, 25, seed=1)
+        >>> eco.enable_cohorts()
+        >>> eco.add_cohort(400, size=1)
+        >>> left = eco._grant_cohort_expansion([], eco.available_area())
+        >>> born = eco.day_stats["births"]
+        >>> 150 < born < 250, eco.cohorts.sizes[0.1] == born
+        (True, True)
+        >>> left == 600 - born
+        True
+
+        Test 2: Scarce area is shared with the plant objects
+        >>> eco = Ecosystem(500, 10, 25, seed=1)
+        >>> eco.enable_cohorts()
+        >>> eco.add_cohort(400, size=1)
+        >>> mango = MangoTree()
+        >>> left = eco._grant_cohort_expansion([(mango, 500)], 100)
+        >>> 0 < eco.day_stats["births"] < 100, left > 0
+        (True, True)
+        """
+        cohorts = self.cohorts
+        species = cohorts.species
+        exact = 1 * species.expandRate * (
+            1.5 if self.weathercon == "windy" else 1.0)
+        guaranteed = int(exact)
+        mature = cohorts.mature()
+        requested = mature * guaranteed + self._binomial(
+            exact - guaranteed, mature, "expansion")
+        if requested == 0:
+            return total_free_area
+
+        area = species.maxIndividualArea
+        wanted = requested * area + sum(
+            count * plant.maxIndividualArea for plant, count in requests)
+        if wanted > total_free_area:
+            requested = int(max(0, total_free_area) * requested / wanted)
+        if requested:
+            self.add_cohort(requested)
+            self.day_stats["births"] += requested
+        return total_free_area - requested * area
+
+    def _feed(self, animal, breeders=None):
+        """
+        Docstring for _feed
+        Let one animal forage or hunt depending on its diet, then
+        starve and try to reproduce.
+
+        :param animal: The animal whose turn it is
+        :type animal: Fauna
+        :param breeders: If given, an animal able to reproduce is
+            appended here for _batch_offspring instead of drawing its
+            offspring right away
+        :type breeders: list[Fauna] or None
+        :return: Offspring of the animal
+        :rtype: list[Fauna]
+        """
+        # Forage or hunt depending on the species, see feeders
+        feed = (_FEEDERS or feeders())[animal.species_id]
+        if feed is not None:
+            feed(self, animal)
+
+        # make the animals starve
+        animal.starvation()
+
+        # Animal reproduces
+        if breeders is None:
+            return animal.reproduce()
+        if animal.can_reproduce():
+            breeders.append(animal)
+        return []
+
+    def _forage(self, animal):
+        animal.forage(self.plant_pool)
+
+    def _hunt(self, animal):
+        animal.hunt(self.prey_index)
+
+    def _forage_or_hunt(self, animal):
+        if self.streams["feeding"].random() < 0.5:
+            animal.forage(self.plant_pool)
+        else:
+            animal.hunt(self.prey_index)
+
+    def _bernoulli(self, p, n, phase):
+        """
+        Docstring for _bernoulli
+        Draw n independent trials with success probability p in one
+        vectorized call of bulk_rng. Without numpy the trials are
+        drawn one by one from the stream of the phase.
+
+        :param p: Success probability
+        :type p: float
+        :param n: Number of trials
+        :type n: int
+        :param phase: Phase whose stream is used without numpy
+        :type phase: str
+        :return: Indices of the successful trials in ascending order
+        :rtype: list[int]
+
+        >>> eco = Ecosystem(100, 10, 25, seed=2)
+        >>> eco._bernoulli(1.0, 3, "expansion")
+        [0, 1, 2]
+        >>> eco._bernoulli(0.0, 3, "expansion")
+        []
+        """
+        if p <= 0 or n == 0:
+            return []
+        rng = self.bulk_rng
+        if rng is None:
+            draw = self.streams[phase].random
+            return [i for i in range(n) if draw() < p]
+        return numpy.flatnonzero(rng.random(n) < p).tolist()
+
+    def _binomial(self, p, n, phase):
+        """
+        Docstring for _binomial
+        Number of successes in n independent trials with success
+        probability p, drawn in one call of bulk_rng. Without numpy
+        the trials are drawn one by one like in _bernoulli.
+
+        :param p: Success probability
+        :type p: float
+        :param n: Number of trials
+        :type n: int
+        :param phase: Phase whose stream is used without numpy
+        :type phase: str
+        :return: Number of successes
+        :rtype: int
+
+        >>> eco = Ecosystem(100, 10, 25, seed=2)
+        >>> eco._binomial(1.0, 3, "expansion"), eco._binomial(0, 3, "x")
+        (3, 0)
+        """
+        if p <= 0 or n == 0:
+            return 0
+        rng = self.bulk_rng
+        if rng is None:
+            draw = self.streams[phase].random
+            return sum(1 for _ in range(n) if draw() < p)
+        return int(rng.binomial(n, p))
+
+    def _batch_expansion_requests(self, mature):
+        """
+        Docstring for _batch_expansion_requests
+        Same requests as calling expansion_request on every mature
+        plant, but the bonus seedlings of all plants of a species
+        with the same expand modifier are drawn in one call.
+
+        :param mature: Plants at least half of their maxsize
+        :type mature: list[Flora]
+        :return: Pairs of plant and number of requested seedlings,
+            plants requesting nothing are left out
+        :rtype: list[tuple[Flora, int]]
+
+        Test 1: The integer part is always requested
+        >>> eco = Ecosystem(100, 10, 25, seed=1)
+        >>> m = MangoTree()
+        >>> m.current_expand_modifier = 10
+        >>> [(plant is m, n) for plant, n
+        ...  in eco._batch_expansion_requests([m])]
+        [(True, 2)]
+
+        Test 2: On average the fractional part is requested
+        >>> plants = [Grass() for _ in range(4000)]
+        >>> requests = eco._batch_expansion_requests(plants)
+        >>> 1800 < sum(n for plant, n in requests) < 2200
+        True
+        """
+        groups = {}
+        for plant in mature:
+            key = (plant.__class__, plant.current_expand_modifier)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [plant]
+            else:
+                group.append(plant)
+
+        requests = []
+        for (species, modifier), plants in groups.items():
+            exact = 1 * species.expandRate * modifier
+            guaranteed = int(exact)
+            hits = self._bernoulli(exact - guaranteed, len(plants),
+                                   "expansion")
+            if guaranteed:
+                counts = [guaranteed] * len(plants)
+                for i in hits:
+                    counts[i] += 1
+                requests.extend(zip(plants, counts))
+            else:
+                requests.extend((plants[i], 1) for i in hits)
+        return requests
+
+    def _batch_offspring(self, breeders):
+        """
+        Docstring for _batch_offspring
+        Same offspring as calling reproduce on every breeder, but the
+        bonus babies of each species are drawn in one call.
+
+        :param breeders: Animals that passed can_reproduce
+        :type breeders: list[Fauna]
+        :return: The newborn animals
+        :rtype: list[Fauna]
+
+        >>> eco = Ecosystem(100, 10, 25, seed=1)
+        >>> rabbits = [Rabbit() for _ in range(2000)]
+        >>> 140 < len(eco._batch_offspring(rabbits)) < 260
+        True
+        """
+        groups = {}
+        for animal in breeders:
+            group = groups.get(animal.__class__)
+            if group is None:
+                groups[animal.__class__] = [animal]
+            else:
+                group.append(animal)
+
+        offspring = []
+        for species, animals in groups.items():
+            exact = 1 * species.reproducerate
+            guaranteed = int(exact)
+            counts = [guaranteed] * len(animals)
+            for i in self._bernoulli(exact - guaranteed, len(animals),
+                                     "reproduction"):
+                counts[i] += 1
+            for animal, count in zip(animals, counts):
+                if count:
+                    offspring.extend(animal.babies(count))
+        return offspring
+
+    def _remove_dead(self):
+        """
+        Docstring for _remove_dead
+        Turn the organisms that died today into tombstones: they stay
+        in flora and fauna, but their island is set to _TOMBSTONE, so
+        every loop skips them with one identity check.
+        A list is only compacted once compact_threshold of it are
+        tombstones, instead of being rebuilt every day.
+
+        :return: None
+
+        Test 1: A few dead organisms are only tombstoned
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> for _ in range(10):
+        ...     eco.add_organism(Rabbit())
+        >>> eco.fauna[0].die()
+        >>> eco._remove_dead()
+        >>> len(eco.fauna), eco.totals()[1]
+        (10, 9)
+        >>> eco.fauna[0].island is _TOMBSTONE
+        True
+
+        Test 2: Crossing the threshold compacts the list
+        >>> for animal in eco.fauna[1:3]:
+        ...     animal.die()
+        >>> eco._remove_dead()
+        >>> len(eco.fauna), eco.totals()[1]
+        (7, 7)
+
+        Test 3: Threshold 0 removes the dead every day
+        >>> eco.compact_threshold = 0
+        >>> eco.fauna[0].die()
+        >>> eco._remove_dead()
+        >>> len(eco.fauna)
+        6
+        """
+        tombstones = self._tombstones
+        for organism in self._dead_today:
+            # Organisms taken out of the island meanwhile are skipped
+            if organism.island is self:
+                organism.island = _TOMBSTONE
+                if isinstance(organism, Flora):
+                    tombstones[Flora] += 1
+                else:
+                    tombstones[Fauna] += 1
+
+        threshold = self.compact_threshold
+        if tombstones[Flora] >= threshold * len(self.flora):
+            self._remove_dead_flora()
+            tombstones[Flora] = 0
+        if tombstones[Fauna] >= threshold * len(self.fauna):
+            self._remove_dead_fauna()
+            tombstones[Fauna] = 0
+        # Compacting lets organisms die that only failed is_alive
+        self._dead_today = []
+
+    def _remove_dead_flora(self):
+        # Plants that shrank below minsize without dying still hold
+        # their area until now
+        living_flora = []
+        for plant in self.flora:
+            if plant.is_alive():
+                living_flora.append(plant)
+                continue
+            if plant.alive:
+                plant.die()
+            if self.recycle:
+                free = self._free_plants.setdefault(plant.__class__, [])
+                if len(free) < self.free_list_limit:
+                    free.append(plant)
+        self.flora = living_flora
+
+    def _remove_dead_fauna(self):
+        living_fauna = []
+        for animal in self.fauna:
+            if animal.is_alive():
+                living_fauna.append(animal)
+            elif animal.alive:
+                animal.die()
+        self.fauna = living_fauna
+
+    def message(self, timing=False):
+        """
+        Docstring for message
+        Used for printing the current condition of the
+        ecosystem such as:
+        - Number of each organisme
+        - Current day
+        - Current temperature
+        - Current weather condition
+        - Time per phase of the last day, if timing is requested
+          and the day was profiled
+
+        :param timing: Also print the timing line of the last day
+        :type timing: bool
+        :return: None
+        """
+        # Count each organism type
+        counts = self.census()
+        eucalyptus_num = counts.get("Eucalyptus", 0)
+        mango_num = counts.get("MangoTree", 0)
+        elderberry_num = counts.get("Elderberry", 0)
+        grass_num = counts.get("Grass", 0)
+        rabbit_num = counts.get("Rabbit", 0)
+        koala_num = counts.get("Koala", 0)
+        fox_num = counts.get("Fox", 0)
+        leopard_num = counts.get("Leopard", 0)
+
+        print(f"Day {self.day}:")
+        print(f"Weather = {self.weathercon},"
+              f" Temperature = {self.temperature}")
+        print(f"  Plants: Eucalyptus={eucalyptus_num},"
+              f" Mango={mango_num}, Elderberry={elderberry_num},"
+              f" Grass={grass_num}")
+        print(f"  Animals: Rabbit={rabbit_num}, Koala={koala_num},"
+              f" Fox={fox_num}, Leopard={leopard_num}")
+        plants, animals = self.totals()
+        print(f"  Total: {plants} plants, {animals} animals")
+        if timing and self.last_profile is not None:
+            seconds = self.last_profile["seconds"]
+            phases = " ".join(f"{name}={1000 * seconds[name]:.1f}"
+                              for name in STEP_PHASES)
+            print(f"  Timing [ms]: {phases}"
+                  f" total={1000 * seconds['step']:.1f}")
+        print()
+
+
+def _slot_names(cls):
+    """
+    Docstring for _slot_names
+    All instance slots of a class, including inherited ones.
+
+    :param cls: An organism class
+    :type cls: type
+    :return: Slot names, base class slots first
+    :rtype: tuple[str]
+
+    >>> _slot_names(Grass)[:5]
+    ('age', 'currentsize', 'island', 'alive', 'cell')
+    >>> _slot_names(Grass)[5:]
+    ('current_expand_modifier', 'fruitYield', 'berryYield', 'sized_at')
+    """
+    names = []
+    for klass in reversed(cls.__mro__):
+        names.extend(klass.__dict__.get("__slots__", ()))
+    return tuple(names)
+
+# Spatial mode
+
+
+class SpatialGrid():
+    """
+    Docstring for SpatialGrid
+    Cells of equal area laid over the island, numbered row by row.
+    Keeps the area taken by living plants per cell.
+
+    :var width: Cells per row
+    :vartype width: int
+    :var height: Cells per column
+    :vartype height: int
+    :var cells: Number of cells
+    :vartype cells: int
+    :var capacity: Area of one cell
+    :vartype capacity: float
+    :var occupied: Area taken by living plants per cell
+    :vartype occupied: list[float]
+    """
+
+    def __init__(self, width, height, size):
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.capacity = size / self.cells
+        self.occupied = [0] * self.cells
+        self._neighbors = {}
+
+    def neighbors(self, cell):
+        """
+        Docstring for neighbors
+        The cell itself and the up to 8 cells around it. Computed
+        once per cell on first use.
+
+        :param cell: Cell number
+        :type cell: int
+        :return: Neighboring cell numbers
+        :rtype: list[int]
+
+        >>> grid = SpatialGrid(3, 3, 90)
+        >>> grid.neighbors(0)
+        [0, 1, 3, 4]
+        >>> len(grid.neighbors(4))
+        9
+        """
+        hood = self._neighbors.get(cell)
+        if hood is None:
+            y, x = divmod(cell, self.width)
+            hood = [row * self.width + column
+                    for row in range(max(0, y - 1), min(self.height, y + 2))
+                    for column in range(max(0, x - 1),
+                                        min(self.width, x + 2))]
+            self._neighbors[cell] = hood
+        return hood
+
+    def claim(self, cell, area, count, rng=random):
+        """
+        Docstring for claim
+        Reserve room for up to count plants of the given area in
+        random cells next to cell.
+
+        :param cell: Cell of the parent plant
+        :type cell: int
+        :param area: Area of one new plant
+        :type area: int
+        :param count: Wanted number of plants
+        :type count: int
+        :param rng: Random generator
+        :return: One cell per reserved plant
+        :rtype: list[int]
+
+        >>> grid = SpatialGrid(2, 1, 20)
+        >>> sorted(grid.claim(0, 5, 5))
+        [0, 0, 1, 1]
+        >>> grid.occupied
+        [10, 10]
+        """
+        hood = self.neighbors(cell)
+        occupied = self.occupied
+        cells = []
+        for _ in range(count):
+            free = [near for near in hood
+                    if occupied[near] + area <= self.capacity]
+            if not free:
+                break
+            near = rng.choice(free)
+            occupied[near] += area
+            cells.append(near)
+        return cells
+
+    def buckets(self, organisms):
+        """
+        Docstring for buckets
+        Living organisms grouped by their cell.
+
+        :param organisms: Organisms with a cell
+        :type organisms: list[Lifeforms]
+        :return: Cell number to organisms in that cell
+        :rtype: dict[int, list[Lifeforms]]
+        """
+        buckets = {}
+        for organism in organisms:
+            if organism.is_alive():
+                bucket = buckets.get(organism.cell)
+                if bucket is None:
+                    buckets[organism.cell] = [organism]
+                else:
+                    bucket.append(organism)
+        return buckets
+
+# Per-step indexes used by the feeding phase
+
+
+class GrassCohorts():
+    """
+    Docstring for GrassCohorts
+    Blades of grass stored as cohorts: the number of blades per size.
+    All blades grow along the same curve from minsize, so there are
+    only about as many cohorts as days a blade needs to reach its
+    maxsize, however many blades there are. The ecosystem keeps its
+    counters up to date, see Ecosystem.enable_cohorts.
+
+    :var species: Class of the blades
+    :vartype species: type
+    :var sizes: Blade size to number of blades
+    :vartype sizes: dict[float, int]
+    :var blades: Number of blades of all cohorts
+    :vartype blades: int
+
+    Test 1: Cohorts grow as a whole and merge at maxsize
+    >>> cohorts = GrassCohorts(Grass)
+    >>> cohorts.add(0.9, 5)
+    >>> cohorts.add(1, 2)
+    >>> cohorts.grow()
+    >>> cohorts.sizes, cohorts.blades
+    ({1: 7}, 7)
+
+    Test 2: Only blades of at least half the maxsize are mature
+    >>> cohorts.add(0.1, 4)
+    >>> cohorts.mature()
+    7
+
+    Test 3: Empty cohorts are dropped
+    >>> cohorts.remove(0.1, 4)
+    >>> cohorts.sizes
+    {1: 7}
+    """
+
+    def __init__(self, species):
+        self.species = species
+        self.sizes = {}
+        self.blades = 0
+
+    def add(self, size, count):
+        """
+        Docstring for add
+        Add blades of the given size to their cohort.
+
+        :param size: Size of the blades
+        :type size: float
+        :param count: Number of blades
+        :type count: int
+        :return: None
+        """
+        self.sizes[size] = self.sizes.get(size, 0) + count
+        self.blades += count
+
+    def remove(self, size, count):
+        """
+        Docstring for remove
+        Take blades out of the cohort of the given size.
+
+        :param size: Size of the blades
+        :type size: float
+        :param count: Number of blades, at most the cohort size
+        :type count: int
+        :return: None
+        """
+        left = self.sizes[size] - count
+        if left:
+            self.sizes[size] = left
+        else:
+            del self.sizes[size]
+        self.blades -= count
+
+    def grow(self):
+        """
+        Docstring for grow
+        Grow every cohort like Lifeforms.grow grows one blade.
+
+        :return: None
+        """
+        species = self.species
+        factor = 1 + species.growrate
+        grown = {}
+        for size, count in self.sizes.items():
+            size = min(size * factor, species.maxsize)
+            grown[size] = grown.get(size, 0) + count
+        self.sizes = grown
+
+    def mature(self):
+        """
+        Docstring for mature
+        Number of blades big enough to expand.
+
+        :return: Blades of at least half the maxsize
+        :rtype: int
+        """
+        threshold = self.species.maxsize * 0.5
+        return sum(count for size, count in self.sizes.items()
+                   if size >= threshold)
+
+    def size_at(self, index):
+        """
+        Docstring for size_at
+        Size of the blade with the given number, counting the blades
+        cohort by cohort. A uniformly random number gives a uniformly
+        random blade.
+
+        :param index: Number between 0 and blades - 1
+        :type index: int
+        :return: Size of the blade
+        :rtype: float
+
+        >>> cohorts = GrassCohorts(Grass)
+        >>> cohorts.add(0.5, 2)
+        >>> cohorts.add(1, 1)
+        >>> [cohorts.size_at(index) for index in range(3)]
+        [0.5, 0.5, 1]
+        """
+        for size, count in self.sizes.items():
+            if index < count:
+                return size
+            index -= count
+        raise IndexError("blade index out of range")
+
+    def choose(self, rng=random):
+        """
+        Docstring for choose
+        Size of a uniformly random blade.
+
+        :param rng: Random generator
+        :return: Size of the blade
+        :rtype: float
+        """
+        return self.size_at(rng.randrange(self.blades))
+
+
+class PreyIndex():
+    """
+    Docstring for PreyIndex
+    Living fauna of one simulation step, sorted by currentsize.
+
+    Predators ask for a uniformly random living animal that is
+    strictly smaller than themselves. The animals are kept in a
+    size-sorted array with a Fenwick tree over their alive flags,
+    so both sampling and removal cost O(log n) instead of a scan
+    over the whole fauna list.
+
+    The index assumes animal sizes do not change while it is in
+    use, which holds during the feeding phase of simulate_step.
+
+    :var animals: Living animals sorted by currentsize
+    :vartype animals: list[Fauna]
+    """
+
+    def __init__(self, fauna, rng=random):
+        self._rng = rng
+        self.animals = sorted((animal for animal in fauna
+                               if animal.is_alive()),
+                              key=lambda animal: animal.currentsize)
+        self._sizes = [animal.currentsize for animal in self.animals]
+        self._slots = {id(animal): i for i, animal
+                       in enumerate(self.animals)}
+        self._count = len(self.animals)
+
+        # Fenwick tree with a 1 for every living animal
+        n = self._count
+        self._tree = [0] * (n + 1)
+        for i in range(1, n + 1):
+            self._tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << n.bit_length() >> 1 if n else 0
+
+    def __len__(self):
+        return self._count
+
+    def _prefix(self, k):
+        # Number of living animals among the k smallest
+        total = 0
+        while k > 0:
+            total += self._tree[k]
+            k -= k & -k
+        return total
+
+    def discard(self, animal):
+        """
+        Docstring for discard
+        Remove a (dead) animal from the index. Animals that are
+        not indexed are ignored.
+
+        :param animal: Animal to remove
+        :type animal: Fauna
+        :return: None
+
+        Test 1: Removed animal is no longer counted
+        >>> r1, r2 = Rabbit(), Rabbit()
+        >>> index = PreyIndex([r1, r2])
+        >>> index.discard(r1)
+        >>> len(index)
+        1
+
+        Test 2: Removing twice has no effect
+        >>> index.discard(r1)
+        >>> len(index)
+        1
+
+        Test 3: Unknown animals are ignored
+        >>> index.discard(Fox())
+        >>> len(index)
+        1
+        """
+        slot = self._slots.pop(id(animal), None)
+        if slot is None:
+            return
+        self._count -= 1
+        i = slot + 1
+        n = len(self._tree) - 1
+        while i <= n:
+            self._tree[i] -= 1
+            i += i & -i
+
+    def choose_smaller(self, predator):
+        """
+        Docstring for choose_smaller
+        Pick a uniformly random living animal whose currentsize is
+        strictly smaller than the predator's. Gives the same
+        distribution as random.choice over the filtered fauna list.
+
+        :param predator: The hunting animal
+        :type predator: Fauna
+        :return: The chosen prey or None if there is none
+        :rtype: Fauna or None
+
+        Test 1: Only smaller animals are chosen
+        >>> rabbit, fox, leopard = Rabbit(), Fox(), Leopard()
+        >>> index = PreyIndex([leopard, rabbit, fox])
+        >>> index.choose_smaller(fox) is rabbit
+        True
+
+        Test 2: Dead animals are never chosen
+        >>> index.discard(rabbit)
+        >>> index.choose_smaller(fox) is None
+        True
+        >>> index.choose_smaller(leopard) is fox
+        True
+
+        Test 3: The smallest animal finds no prey
+        >>> PreyIndex([Rabbit()]).choose_smaller(Rabbit()) is None
+        True
+        """
+        count = self._prefix(bisect_left(self._sizes, predator.currentsize))
+        if count == 0:
+            return None
+        remaining = self._rng.randrange(count)
+
+        # Descend the tree to the remaining-th living animal
+        pos = 0
+        step = self._top
+        n = len(self._tree) - 1
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return self.animals[pos]
+
+
+class _CountingPreyIndex(PreyIndex):
+    """
+    Docstring for _CountingPreyIndex
+    PreyIndex that counts its lookups, used while profiling.
+    """
+    lookups = 0
+
+    def choose_smaller(self, predator):
+        self.lookups += 1
+        return super().choose_smaller(predator)
+
+
+class SpatialPreyIndex(PreyIndex):
+    """
+    Docstring for SpatialPreyIndex
+    Living fauna of one simulation step bucketed by grid cell.
+    Predators only find prey in their own and the neighboring cells,
+    so a lookup costs O(local density) instead of depending on the
+    island population. Dead animals stay in their bucket and are
+    skipped when sampling.
+
+    :var lookups: Number of choose_smaller calls
+    :vartype lookups: int
+
+    Test 1: Only nearby smaller animals are chosen
+    >>> grid = SpatialGrid(3, 1, 300)
+    >>> fox, near, far = Fox(), Rabbit(), Rabbit()
+    >>> fox.cell, near.cell, far.cell = 0, 1, 2
+    >>> index = SpatialPreyIndex([fox, near, far], grid)
+    >>> index.choose_smaller(fox) is near
+    True
+
+    Test 2: Dead animals are skipped
+    >>> near.die()
+    >>> index.choose_smaller(fox) is None
+    True
+    >>> index.lookups
+    2
+    """
+
+    def __init__(self, fauna, grid, rng=random):
+        self._rng = rng
+        self._grid = grid
+        self._buckets = grid.buckets(fauna)
+        self.lookups = 0
+
+    def __len__(self):
+        return sum(animal.is_alive() for bucket in self._buckets.values()
+                   for animal in bucket)
+
+    def discard(self, animal):
+        # Dead animals are skipped when sampling
+        pass
+
+    def choose_smaller(self, predator):
+        self.lookups += 1
+        buckets = self._buckets
+        size = predator.currentsize
+        candidates = [animal for cell in self._grid.neighbors(predator.cell)
+                      for animal in buckets.get(cell, ())
+                      if animal.currentsize < size and animal.is_alive()]
+        if not candidates:
+            return None
+        return self._rng.choice(candidates)
+
+
+class _PoolView():
+    """
+    Docstring for _PoolView
+    Unordered list of plants with O(1) random choice and O(1)
+    swap-remove, used by PlantPool.
+    """
+
+    def __init__(self, plants):
+        self.plants = plants
+        self._slots = {id(plant): i for i, plant in enumerate(plants)}
+
+    def __len__(self):
+        return len(self.plants)
+
+    def discard(self, plant):
+        slot = self._slots.pop(id(plant), None)
+        if slot is None:
+            return
+        last = self.plants.pop()
+        if last is not plant:
+            self.plants[slot] = last
+            self._slots[id(last)] = slot
 
-    def environment(self):
-        """
-        Docstring for environment
-        Create the weather and temperature of the ecosystem
-        Weather(con) has 3 modes: windy, storm and normal
-        Temperature can vary between 22 to 40
-        Both weather and temperature are randomized
 
-        :return: None
+class PlantPool():
+    """
+    Docstring for PlantPool
+    Living plants of one simulation step, used by foragers.
+
+    Keeps one pool of all living plants plus a lazily built view
+    per eater species that only holds the plants this species can
+    eat (see Flora.edible_by). Every view supports uniform random
+    choice and swap-remove in O(1), so a plant eaten to death is
+    dropped from all views without rescanning the flora list.
+    """
 
-        >>> eco = Ecosystem(100, 10, 25)
-        >>> eco.environment()
-        >>> eco.weathercon in ['windy', 'storm', 'normal']
-        True
-        >>> 22 <= eco.temperature <= 40
-        True
-        """
+    def __init__(self, flora, rng=random):
+        self._rng = rng
+        self._all = _PoolView([plant for plant in flora
+                               if plant.is_alive()])
+        self._views = {}
 
-        self.temperature = random.randrange(22, 40)
-        r = random.random()
-        if r < 0.3:
-            self.weathercon = "windy"
-        elif r < 0.4:
-            self.weathercon = "storm"
-        else:
-            self.weathercon = "normal"
+    def __len__(self):
+        return len(self._all)
 
-    def apply_environment_effects(self):
+    def discard(self, plant):
         """
-        Docstring for apply_environment_effects
-        Applying the effects of the method environment
-        When the weather(con) is normal then no special effects happen
-        When the weather(con) is windy then the plants can
-        reproduce(expand) more than normal
-        When the weather(con) is storm then one random fauna and
-        one random flora dies
-        When the temperature is atleast 36 then huntSuccessRate for
-        carnivore and omnivore will be cut half
+        Docstring for discard
+        Remove a (dead) plant from the pool and all eater views.
 
+        :param plant: Plant to remove
+        :type plant: Flora
         :return: None
 
-        >>> eco = Ecosystem(100, 10, 25)
-        >>> eco.flora = [Grass()]
-        >>> eco.fauna = [Rabbit()]
-        >>> eco.weathercon = 'windy'
-        >>> eco.apply_environment_effects()
-        >>> all(plant.current_expand_modifier == 1.5 for plant in eco.flora)
+        Test 1: Removed plant is no longer in the pool
+        >>> g1, g2 = Grass(), Grass()
+        >>> pool = PlantPool([g1, g2])
+        >>> pool.discard(g1)
+        >>> len(pool)
+        1
+
+        Test 2: Removing twice has no effect
+        >>> pool.discard(g1)
+        >>> len(pool)
+        1
+
+        Test 3: Eater views forget the plant as well
+        >>> pool.choose(Rabbit()) is g2
         True
-        >>> eco.weathercon = 'storm'
-        >>> eco.apply_environment_effects()
-        >>> a = any(not plant.is_alive() for plant in eco.flora)
-        >>> b = any(not animal.is_alive() for animal in eco.fauna)
-        >>> a or b
+        >>> pool.discard(g2)
+        >>> pool.choose(Rabbit()) is None
         True
-        >>> eco.temperature = 36
-        >>> leopard = Leopard()
-        >>> eco.fauna.append(leopard)
-        >>> eco.apply_environment_effects()
-        >>> leopard.current_hunt_modifier
-        0.5
         """
+        self._all.discard(plant)
+        for view in self._views.values():
+            view.discard(plant)
 
-        # --- WINDY ---
-        if self.weathercon == "windy":
-            for plant in self.flora:
-                plant.current_expand_modifier = 1.5
+    def choose(self, eater):
+        """
+        Docstring for choose
+        Pick a uniformly random living plant the eater can eat.
 
-        # --- STORM ---
-        if self.weathercon == "storm":
-            if self.flora:
-                random.choice(self.flora).die()
-            if self.fauna:
-                random.choice(self.fauna).die()
+        :param eater: The foraging animal
+        :type eater: Fauna
+        :return: The chosen plant or None if there is none
+        :rtype: Flora or None
 
-        # --- HIGH TEMPERATURE ---
-        if self.temperature >= 36:
-            for animal in self.fauna:
-                if hasattr(animal, "huntSuccessRate"):
-                    animal.current_hunt_modifier = 0.5
+        Test 1: Koalas can choose eucalyptus
+        >>> e = Eucalyptus()
+        >>> pool = PlantPool([e])
+        >>> pool.choose(Koala()) is e
+        True
 
-    def simulate_step(self):
-        """
-        Docstring for simulate_step
-        Advances the simulation by a day
+        Test 2: Rabbits never choose eucalyptus
+        >>> pool.choose(Rabbit()) is None
+        True
 
-        This method performs a full simulation step, including:
-        - Aging all organisms
-        - Resetting daily modifiers
-        - Randomizing and applying environmental conditions
-        - Growing and expanding plants based on available area
-        - Handling animal foraging, hunting, and starvation
-        - Processing reproduction for plants and animals
-        - Removing dead organisms from the ecosystem
+        Test 3: Dead plants are not pooled
+        >>> g = Grass()
+        >>> g.die()
+        >>> PlantPool([g]).choose(Rabbit()) is None
+        True
+        """
+        view = self._view(eater)
+        if not view.plants:
+            return None
+        return self._rng.choice(view.plants)
+
+    def _view(self, eater):
+        # Plants the species of the eater can eat
+        view = self._views.get(eater.__class__)
+        if view is None:
+            view = _PoolView([plant for plant in self._all.plants
+                              if plant.edible_by(eater)])
+            self._views[eater.__class__] = view
+        return view
+
+
+class _CountingPlantPool(PlantPool):
+    """
+    Docstring for _CountingPlantPool
+    PlantPool that counts its lookups, used while profiling.
+    """
+    lookups = 0
 
-        The ecosystem state is modified in place.
+    def choose(self, eater):
+        self.lookups += 1
+        return super().choose(eater)
 
-        :return: None
-        """
-        self.day += 1
-        new_organisms = []
 
-        # Age all organisms
-        for plant in self.flora:
-            plant.age += 1
-        for animal in self.fauna:
-            animal.age += 1
+class SpatialPlantPool(PlantPool):
+    """
+    Docstring for SpatialPlantPool
+    Living plants of one simulation step bucketed by grid cell.
+    Foragers only find plants in their own and the neighboring
+    cells. Dead plants stay in their bucket and are skipped when
+    sampling.
+
+    :var lookups: Number of choose calls
+    :vartype lookups: int
+
+    >>> grid = SpatialGrid(3, 1, 300)
+    >>> rabbit, near, far = Rabbit(), Grass(), Grass()
+    >>> rabbit.cell, near.cell, far.cell = 0, 1, 2
+    >>> pool = SpatialPlantPool([near, far], grid)
+    >>> pool.choose(rabbit) is near
+    True
+    """
 
-        # Reset daily modifiers
-        for plant in self.flora:
-            plant.current_expand_modifier = 1.0
-        for animal in self.fauna:
-            animal.current_hunt_modifier = 1.0
+    def __init__(self, flora, grid, rng=random):
+        self._rng = rng
+        self._grid = grid
+        self._buckets = grid.buckets(flora)
+        self.lookups = 0
 
-        self.environment()
+    def __len__(self):
+        return sum(plant.is_alive() for bucket in self._buckets.values()
+                   for plant in bucket)
 
-        self.apply_environment_effects()
+    def discard(self, plant):
+        # Dead plants are skipped when sampling
+        pass
 
-        # Plants grow and reproduce
-        total_free_area = self.available_area()
+    def choose(self, eater):
+        self.lookups += 1
+        buckets = self._buckets
+        candidates = [plant for cell in self._grid.neighbors(eater.cell)
+                      for plant in buckets.get(cell, ())
+                      if plant.is_alive() and plant.edible_by(eater)]
+        if not candidates:
+            return None
+        return self._rng.choice(candidates)
 
-        # Collect requests
-        requests = []
-        for plant in self.flora:
-            requested = plant.expansion_request()
-            if requested > 0:
-                requests.append((plant, requested))
 
-        random.shuffle(requests)  # fairness
+class CohortPlantPool(PlantPool):
+    """
+    Docstring for CohortPlantPool
+    PlantPool that also holds the blades of the grass cohorts of an
+    ecosystem. A forager picks uniformly among the plant objects it
+    can eat and the blades, so grass is found as often as if every
+    blade were an object. Blades are edible for every animal.
+
+    :var lookups: Number of choose calls
+    :vartype lookups: int
+
+    >>> eco = Ecosystem(100, 10, 25, seed=1)
+    >>> eco.enable_cohorts()
+    >>> eco.add_cohort(2, size=1)
+    >>> pool = CohortPlantPool([Eucalyptus()], eco, eco.rng)
+    >>> len(pool)
+    3
+    >>> blade = pool.choose(Rabbit())
+    >>> blade.beEaten(1), eco.census(), eco.day_stats["deaths_eaten"]
+    (1, {'Grass': 1}, 1)
+    """
 
-        for plant, requested in requests:
-            max_possible = int(total_free_area // plant.maxIndividualArea)
-            granted = min(requested, max_possible)
+    def __init__(self, flora, ecosystem, rng=random):
+        super().__init__(flora, rng)
+        self._ecosystem = ecosystem
+        self.lookups = 0
+
+    def __len__(self):
+        return len(self._all) + self._ecosystem.cohorts.blades
+
+    def choose(self, eater):
+        self.lookups += 1
+        plants = self._view(eater).plants
+        blades = self._ecosystem.cohorts.blades
+        total = blades + len(plants)
+        if total == 0:
+            return None
+        index = self._rng.randrange(total)
+        if index < blades:
+            return _Blade(self._ecosystem,
+                          self._ecosystem.cohorts.size_at(index))
+        return plants[index - blades]
+
+
+class _Blade():
+    """
+    Docstring for _Blade
+    One blade of a grass cohort, handed to a forager as target. It
+    behaves like a Grass object being eaten.
+    """
+    __slots__ = ("island", "currentsize")
 
-            for _ in range(granted):
-                new_plant = plant.__class__()
-                new_plant.island = self
-                self.flora.append(new_plant)
+    def __init__(self, island, currentsize):
+        self.island = island
+        self.currentsize = currentsize
 
-            total_free_area -= granted * plant.maxIndividualArea
-            if total_free_area <= 0:
-                break
-        for plant in self.flora:
-            plant.grow()
+    def beEaten(self, amount, eater=None):
+        island = self.island
+        eaten = min(amount, self.currentsize)
+        remaining = self.currentsize - eaten
+        if remaining < island.cohorts.species.minsize:
+            island._kill_blades(self.currentsize, 1, "eaten")
+        elif eaten:
+            island.cohorts.remove(self.currentsize, 1)
+            island.cohorts.add(remaining, 1)
+        self.currentsize = remaining
+        if eaten:
+            island.day_stats["eaten_biomass"] += eaten
+        return eaten
 
-        for plant in self.flora:
-            plant.fruiting()
-        # Animals eat
-        for animal in self.fauna:
-            if isinstance(animal, Herbivore):
-                animal.forage(self.flora)
-            elif isinstance(animal, Carnivore):
-                animal.hunt(self.fauna)
-            elif isinstance(animal, Omnivore):
-                if random.random() < 0.5:
-                    animal.forage(self.flora)
-                else:
-                    animal.hunt(self.fauna)
 
-            # make the animals starve
-            animal.starvation()
+# Species registry: every Lifeforms subclass (variants excluded) in
+# the order of definition, indexed by its species_id
+SPECIES_BY_ID = []
 
-            # Animal reproduces
-            offspring = animal.reproduce()
-            new_organisms.extend(offspring)
+# Tables indexed by species_id, built from the registry on first use
+# and dropped when a species is added
+_DIET = None
+_FEEDERS = None
 
-        # Add all newborns
-        for organism in new_organisms:
-            self.add_organism(organism)
 
-        # Remove dead
-        self.flora = [p for p in self.flora if p.is_alive()]
-        self.fauna = [a for a in self.fauna if a.is_alive()]
+def _diet_rule(eater, plant):
+    """
+    Docstring for _diet_rule
+    How an animal species eats a plant species: the bite function of
+    the plant, or None if the plant is not edible for the eater.
+    Only used to build the diet matrix, see diet_matrix.
+
+    :param eater: Species of the eater, None for an unknown eater
+    :type eater: type or None
+    :param plant: Species of the plant
+    :type plant: type
+    :return: Function taking the plant and the amount, or None
+    :rtype: callable or None
+
+    >>> _diet_rule(Koala, Eucalyptus) is Flora._bite
+    True
+    >>> _diet_rule(Rabbit, Eucalyptus) is None
+    True
+    >>> _diet_rule(None, MangoTree) is MangoTree._bite
+    True
+    """
+    eaters = plant.eaten_only_by
+    if eaters is not None and (eater is None
+                               or eater._species.__name__ not in eaters):
+        return None
+    return plant._bite
 
-    def message(self):
-        """
-        Docstring for message
-        Used for printing the current condition of the
-        ecosystem such as:
-        - Number of each organisme
-        - Current day
-        - Current temperature
-        - Current weather condition
 
-        :return: None
-        """
-        # Count each organism type
-        eucalyptus_num = sum(1 for plant in self.flora
-                             if isinstance(plant, Eucalyptus))
+def diet_matrix():
+    """
+    Docstring for diet_matrix
+    Eater x plant matrix of all registered species: row species_id of
+    the eater, column species_id of the plant, entry as given by
+    _diet_rule. Rows of species that are no animals and columns of
+    species that are no plants are None.
+
+    :return: The matrix
+    :rtype: list[list]
+
+    >>> matrix = diet_matrix()
+    >>> matrix[Rabbit.species_id][Grass.species_id] is Flora._bite
+    True
+    >>> matrix[Fox.species_id][Eucalyptus.species_id] is None
+    True
+    """
+    global _DIET
+    if _DIET is None:
+        _DIET = [[_diet_rule(eater, plant)
+                  if issubclass(eater, Fauna) and issubclass(plant, Flora)
+                  else None
+                  for plant in SPECIES_BY_ID]
+                 for eater in SPECIES_BY_ID]
+    return _DIET
 
-        mango_num = sum(1 for plant in self.flora
-                        if isinstance(plant, MangoTree))
 
-        elderberry_num = sum(1 for plant in self.flora
-                             if isinstance(plant, Elderberry))
+def feeders():
+    """
+    Docstring for feeders
+    Feeding method of the Ecosystem per species_id, named by the
+    feeding attribute of the species. None for species that do not
+    feed.
+
+    :return: Unbound Ecosystem methods taking the ecosystem and the
+        animal
+    :rtype: list
+
+    >>> feeders()[Koala.species_id] is Ecosystem._forage
+    True
+    >>> feeders()[Grass.species_id] is None
+    True
+    """
+    global _FEEDERS
+    if _FEEDERS is None:
+        _FEEDERS = [getattr(Ecosystem, species.feeding)
+                    if getattr(species, "feeding", None) else None
+                    for species in SPECIES_BY_ID]
+    return _FEEDERS
 
-        grass_num = sum(1 for plant in self.flora
-                        if isinstance(plant, Grass))
 
-        rabbit_num = sum(1 for animal in self.fauna
-                         if isinstance(animal, Rabbit))
+# Growth factors per number of days, see _growth_powers
+_GROWTH_POWERS = {}
 
-        koala_num = sum(1 for animal in self.fauna
-                        if isinstance(animal, Koala))
 
-        fox_num = sum(1 for animal in self.fauna
-                      if isinstance(animal, Fox))
+def _growth_powers(species):
+    """
+    Docstring for _growth_powers
+    Factors (1 + growrate) ** days of a plant class for 0, 1, 2, ...
+    days, up to the first number of days after which even a plant
+    of minsize has reached maxsize. Longer times use the last factor.
+
+    :param species: Plant class, variants have their own table
+    :type species: type
+    :return: The factors
+    :rtype: list[float]
+
+    >>> powers = _growth_powers(Grass)
+    >>> len(powers), powers[1]
+    (14, 1.2)
+    """
+    powers = _GROWTH_POWERS.get(species)
+    if powers is None:
+        powers = [1.0]
+        factor = 1 + species.growrate
+        if factor > 1 and species.minsize > 0:
+            while species.minsize * powers[-1] < species.maxsize:
+                powers.append(powers[-1] * factor)
+        _GROWTH_POWERS[species] = powers
+    return powers
+
+
+def _maturity(species, size):
+    """
+    Docstring for _maturity
+    Number of grow phases until a plant of the given size reaches
+    half of its maxsize and may expand.
+
+    :param species: Plant class
+    :type species: type
+    :param size: Current size of the plant
+    :type size: float
+    :return: The number of days, None if the plant never gets there
+    :rtype: int or None
+
+    >>> _maturity(Grass, 0.1), _maturity(Grass, 1)
+    (9, 0)
+    """
+    half = species.maxsize * 0.5
+    for days, power in enumerate(_growth_powers(species)):
+        if size * power >= half:
+            return days
+    return None
 
-        leopard_num = sum(1 for animal in self.fauna
-                          if isinstance(animal, Leopard))
 
-        print(f"Day {self.day}:")
-        print(f"Weather = {self.weathercon},"
-              f" Temperature = {self.temperature}")
-        print(f"  Plants: Eucalyptus={eucalyptus_num},"
-              f" Mango={mango_num}, Elderberry={elderberry_num},"
-              f" Grass={grass_num}")
-        print(f"  Animals: Rabbit={rabbit_num}, Koala={koala_num},"
-              f" Fox={fox_num}, Leopard={leopard_num}")
-        print(f"  Total: {len(self.flora)} plants,"
-              f" {len(self.fauna)} animals\n")
+def _yield_gain(plant, rate, most, days):
+    """
+    Docstring for _yield_gain
+    Fruits or berries a lazily grown plant adds over days of growing
+    and fruiting, starting from its size at sized_at.
+
+    :param plant: The plant
+    :type plant: Flora
+    :param rate: fruitRate or berryRate
+    :type rate: float
+    :param most: Yield after which counting can stop
+    :type most: int
+    :param days: Number of days
+    :type days: int
+    :return: The added yield
+    :rtype: int
+
+    >>> _yield_gain(MangoTree(), 2, 100, 3)
+    36
+    """
+    powers = _growth_powers(plant.__class__)
+    last = len(powers) - 1
+    gain = 0
+    for day in range(1, days + 1):
+        size = min(plant.currentsize * powers[min(day, last)],
+                   plant.maxsize)
+        if size == plant.maxsize:
+            return gain + int(size * rate) * (days - day + 1)
+        gain += int(size * rate)
+        if gain >= most:
+            break
+    return gain
+
+
+# Species constants that differ from the class defaults are kept on
+# cached variant subclasses, see Lifeforms._configure
+_UNSET = object()
+_VARIANTS = {}
+
+
+def _variant(species, overrides):
+    """
+    Docstring for _variant
+    Return the subclass of species that carries the given constants
+    as class attributes. Variants are cached, have the same name and
+    slot layout as the species and add no slots of their own.
+
+    :param species: Species class the variant derives from
+    :type species: type
+    :param overrides: Constants that differ from the species defaults
+    :type overrides: dict
+    :return: The species itself if there are no overrides, else the
+        variant class
+    :rtype: type
+    """
+    if not overrides:
+        return species
+    key = (species, tuple(sorted(overrides.items())))
+    variant = _VARIANTS.get(key)
+    if variant is None:
+        namespace = dict(overrides, __slots__=(), __doc__=species.__doc__,
+                         __module__=species.__module__,
+                         __qualname__=species.__qualname__,
+                         _species=species, _overrides=overrides)
+        variant = type(species)(species.__name__, (species,), namespace,
+                                variant=True)
+        _VARIANTS[key] = variant
+    return variant
 
 
 class Lifeforms():
@@ -339,6 +2807,11 @@ class Lifeforms():
     Tracks the organism's size, growth,
     reproduction potential(mainly for flora), age, and alive status.
 
+    Organisms use __slots__ for their changing state. Species
+    constants (minsize, growrate, expandRate, ...) are class
+    attributes; an organism created with different constants becomes
+    an instance of a cached variant subclass of its species.
+
     Attributes:
         age (int): Current age of the organism in simulation days.
         minsize (float): Minimum size for the organism(flora)
@@ -349,16 +2822,68 @@ class Lifeforms():
         island (Ecosystem or None): Reference to the ecosystem
         the organism belongs to.
         alive (bool): Whether the organism is alive.
+        cell (int or None): Grid cell in the spatial mode of the
+        ecosystem, see Ecosystem.enable_grid.
+        species_id (int): Number of the species in SPECIES_BY_ID,
+        set for every subclass when it is defined.
     """
+    __slots__ = ("age", "currentsize", "island", "alive", "cell")
+    _overrides = {}
+
+    def __init_subclass__(cls, variant=False, **kwargs):
+        global _DIET, _FEEDERS
+        super().__init_subclass__(**kwargs)
+        if not variant:
+            cls._species = cls
+            cls._overrides = {}
+            # Variants share the id of their species
+            cls.species_id = len(SPECIES_BY_ID)
+            SPECIES_BY_ID.append(cls)
+            _DIET = _FEEDERS = None
+
     def __init__(self, minsize: int, maxsize: int, growrate: float,
                  island=None):
+        self._configure(minsize=minsize, maxsize=maxsize, growrate=growrate)
         self.age = 0
-        self.minsize = minsize
         self.currentsize = minsize
-        self.maxsize = maxsize
-        self.growrate = growrate
         self.island = island
         self.alive = True
+        self.cell = None
+
+    def _configure(self, **constants):
+        """
+        Docstring for _configure
+        Apply species constants to this organism. Constants equal to
+        the class attributes of the species cost nothing, others move
+        the organism to a variant subclass holding them.
+
+        :return: None
+
+        Test 1: Default constants keep the species class
+        >>> Grass().__class__ is Grass
+        True
+
+        Test 2: Other constants live on a shared variant class
+        >>> a, b = Leopard(minsize=1), Leopard(minsize=1)
+        >>> a.__class__ is b.__class__ is not Leopard
+        True
+        >>> isinstance(a, Leopard), a.minsize, Leopard.minsize
+        (True, 1, 2)
+
+        Test 3: Organisms have no per-instance dictionary
+        >>> hasattr(Grass(), "__dict__")
+        False
+        """
+        cls = self.__class__
+        species = cls.__dict__.get("_species", cls)
+        overrides = dict(cls._overrides)
+        for name, value in constants.items():
+            if getattr(species, name, _UNSET) == value:
+                overrides.pop(name, None)
+            else:
+                overrides[name] = value
+        if overrides != cls._overrides:
+            self.__class__ = _variant(species, overrides)
 
     def grow(self):
         """
@@ -423,11 +2948,14 @@ class Lifeforms():
         """
         return self.alive
 
-    def die(self):
+    def die(self, cause="other"):
         """
         Docstring for die
         Change the value of alive to False
 
+        :param cause: Why the organism died, one of DEATH_CAUSES.
+            Counted in the day_stats of the ecosystem.
+        :type cause: str
         :return: None
 
         Test 1:
@@ -449,6 +2977,8 @@ class Lifeforms():
         >>> lf2.is_alive()
         False
         """
+        if self.alive and isinstance(self.island, Ecosystem):
+            self.island._on_death(self, cause)
         self.alive = False
 
 # Flora base class
@@ -484,17 +3014,26 @@ class Flora(Lifeforms):
     :vartype isFruiting: bool
     :var isBerrying: Whether the plant can produce berries
     :vartype isBerrying: bool
+    :var sized_at: growth_clock of the ecosystem when currentsize was
+        last brought up to date, see Ecosystem.enable_lazy_growth
+    :vartype sized_at: int
     """
+    __slots__ = ("current_expand_modifier", "fruitYield", "berryYield",
+                 "sized_at")
+    isFruiting = False
+    isBerrying = False
+    # Names of the only species that may eat this plant, None for all
+    eaten_only_by = None
+
     def __init__(self, minsize, maxsize, growrate,
                  expandRate: float, maxIndividualArea: int):
         super().__init__(minsize, maxsize, growrate)
-        self.expandRate = expandRate
-        self.maxIndividualArea = maxIndividualArea
+        self._configure(expandRate=expandRate,
+                        maxIndividualArea=maxIndividualArea)
         self.current_expand_modifier = 1.0
         self.fruitYield = 0
         self.berryYield = 0
-        self.isFruiting = False
-        self.isBerrying = False
+        self.sized_at = 0
 
     def expansion_request(self):
         """
@@ -525,14 +3064,20 @@ class Flora(Lifeforms):
         True
 
         Test 3: Cannot expand when expandRate is 0:
-        >>> f.expandRate = 0
+        >>> f = Flora(minsize=1, maxsize=10, growrate=0.1,
+        ... expandRate=0, maxIndividualArea=2)
+        >>> f.currentsize = 6
         >>> f.expansion_request()
         0
         """
-        # Only expand if mature enough
+        # Only expand if mature enough. A lazily grown plant is only
+        # brought up to date while it may still be too small
+        size = self.currentsize
+        if size < self.maxsize * 0.5:
+            size = self._settle()
 
         total_new_plants = 0
-        if self.currentsize >= self.maxsize * 0.5:
+        if size >= self.maxsize * 0.5:
             # Calculate exact number (can be fractional)
             exact_new_plants = (1 * self.expandRate *
                                 self.current_expand_modifier)
@@ -545,7 +3090,8 @@ class Flora(Lifeforms):
             fractional_part = exact_new_plants - guaranteed_plants
 
             # Probabilistically add one more based on fraction
-            bonus_plant = 1 if random.random() < fractional_part else 0
+            rng = _stream(self.island, "expansion")
+            bonus_plant = 1 if rng.random() < fractional_part else 0
 
             total_new_plants = guaranteed_plants + bonus_plant
 
@@ -583,6 +3129,35 @@ class Flora(Lifeforms):
         """
         return self.alive and self.currentsize >= self.minsize
 
+    def edible_by(self, eater):
+        """
+        Docstring for edible_by
+        Whether the given animal can eat this plant at all.
+        Plants are edible for every animal unless a species
+        overrides this rule.
+
+        :param eater: The animal that wants to eat
+        :type eater: Fauna or None
+        :return: True if the plant can be eaten by the eater
+        :rtype: bool
+
+        Test 1: Grass is edible for a rabbit
+        >>> Grass().edible_by(Rabbit())
+        True
+
+        Test 2: Mango trees are edible for a fox
+        >>> MangoTree().edible_by(Fox())
+        True
+
+        Test 3: Eucalyptus is only edible for koalas
+        >>> Eucalyptus().edible_by(Rabbit())
+        False
+        """
+        if eater is None:
+            return _diet_rule(None, self.__class__) is not None
+        diet = _DIET or diet_matrix()
+        return diet[eater.species_id][self.species_id] is not None
+
     def fruiting(self):
         """
         Docstring for fruiting
@@ -628,25 +3203,70 @@ class Flora(Lifeforms):
         >>> f2.beEaten(0)
         0
         """
-        eaten = 0
+        # The diet matrix tells whether and how the eater eats this
+        # species, see _diet_rule
+        if eater is None:
+            bite = _diet_rule(None, self.__class__)
+        else:
+            bite = (_DIET or diet_matrix())[eater.species_id][
+                self.species_id]
+        if bite is None:
+            return 0
+        eaten = bite(self, amount)
+
+        if eaten and isinstance(self.island, Ecosystem):
+            self.island.day_stats["eaten_biomass"] += eaten
+        return eaten
 
-        # Check type of plant to decide what to reduce
-        if self.__class__.__name__ == "MangoTree" and self.fruitYield >= 2:
-            eaten = min(amount*2, self.fruitYield)
-            self.fruitYield -= eaten
+    def _bite(self, amount):
+        """
+        Docstring for _bite
+        Yield rule of the species: eat from the plant itself, which
+        kills it once it is smaller than minsize. Species with fruits
+        or berries override this.
+
+        :param amount: How many units to eat
+        :type amount: float
+        :return: Amount eaten
+        :rtype: float
+        """
+        eaten = min(amount, self._settle())
+        self.currentsize -= eaten
+        if self.currentsize < self.minsize:
+            self.die("eaten")
+        return eaten
 
-        elif self.__class__.__name__ == "Elderberry" and self.berryYield >= 5:
-            eaten = min(amount*5, self.berryYield)
-            self.berryYield -= eaten
+    def _settle(self):
+        """
+        Docstring for _settle
+        Bring currentsize up to date if the ecosystem grows its plants
+        lazily: apply all growth since sized_at at once, using the
+        power table of the species (see _growth_powers).
 
-        else:
-            # Default: reduce plant size if edible
-            eaten = min(amount, self.currentsize)
-            self.currentsize -= eaten
-            if self.currentsize < self.minsize:
-                self.die()
+        :return: The current size
+        :rtype: float
 
-        return eaten
+        >>> eco = Ecosystem(100, 10, 25)
+        >>> eco.enable_lazy_growth()
+        >>> m = MangoTree()
+        >>> eco.add_organism(m)
+        >>> for _ in range(3):
+        ...     eco._phase_grow()
+        >>> m.currentsize, round(m._settle(), 3), m.sized_at
+        (5, 6.655, 3)
+        """
+        island = self.island
+        if getattr(island, "lazy_growth", False):
+            days = island.growth_clock - self.sized_at
+            if days:
+                self.sized_at = island.growth_clock
+                if self.currentsize < self.maxsize and self.is_alive():
+                    powers = _growth_powers(self.__class__)
+                    self.currentsize = min(
+                        self.currentsize
+                        * powers[min(days, len(powers) - 1)],
+                        self.maxsize)
+        return self.currentsize
 
 # Species of flora
 
@@ -660,40 +3280,48 @@ class Eucalyptus(Flora):
     cannot consume this plant. It grows relatively tall and
     expands slowly.
 
-    Inherits all growth and expansion behavior from Flora
-    but overrides the eating behavior.
-
+    Inherits all growth and expansion behavior from Flora,
+    the diet matrix keeps everyone but Koalas from eating it.
+
+    Test 1: Only Koalas can eat Eucalyptus
+    >>> Eucalyptus().edible_by(Koala())
+    True
+    >>> Eucalyptus().edible_by(Fox())
+    False
+    >>> Eucalyptus().edible_by(None)
+    False
+
+    Test 2: Non‑koala cannot eat:
+    >>> e = Eucalyptus()
+    >>> e.currentsize = 5
+    >>> e.beEaten(2)
+    0
+
+    Test 3: only Koala can eat:
+    >>> k = Koala()
+    >>> eaten = e.beEaten(1, eater=k)
+    >>> eaten in (0, 1)
+    True
+
+    Test 4: Eating cannot kill eucalyptus unless size < minsize:
+    >>> e.currentsize = 2
+    >>> e.beEaten(1, eater=k) in (0, 1)
+    True
     """
-    def __init__(self, minsize=2, maxsize=15, growrate=0.2,
-                 expandRate=0.4, maxIndividualArea=6):
+    __slots__ = ()
+    minsize = 2
+    maxsize = 15
+    growrate = 0.2
+    expandRate = 0.4
+    maxIndividualArea = 6
+    eaten_only_by = ("Koala",)
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 expandRate=expandRate,
+                 maxIndividualArea=maxIndividualArea):
         super().__init__(minsize, maxsize, growrate,
                          expandRate, maxIndividualArea)
 
-    def beEaten(self, amount, eater=None):
-        """
-        Override: Only Koalas can eat Eucalyptus.
-
-        Test 1: Non‑koala cannot eat:
-        >>> e = Eucalyptus()
-        >>> e.currentsize = 5
-        >>> e.beEaten(2)
-        0
-
-        Test 2: only Koala can eat:
-        >>> k = Koala()
-        >>> eaten = e.beEaten(1, eater=k)
-        >>> eaten in (0, 1)
-        True
-
-        Test 3: Eating cannot kill eucalyptus unless size < minsize:
-        >>> e.currentsize = 2
-        >>> e.beEaten(1, eater=k) in (0, 1)
-        True
-        """
-        if eater is None or eater.__class__.__name__ != "Koala":
-            return 0  # Not edible for other species
-        return super().beEaten(amount, eater)
-
 
 class MangoTree(Flora):
     """
@@ -708,16 +3336,24 @@ class MangoTree(Flora):
     that can eat fruits.
 
     """
-
-    def __init__(self, minsize=5, maxsize=40, growrate=0.1,
-                 expandRate=0.2, maxIndividualArea=5, isFruiting: bool = True,
-                 fruitRate: float = 0.15, maxFruit: int = 30):
+    __slots__ = ()
+    minsize = 5
+    maxsize = 40
+    growrate = 0.1
+    expandRate = 0.2
+    maxIndividualArea = 5
+    isFruiting = True
+    fruitRate = 0.15
+    maxFruit = 30
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 expandRate=expandRate, maxIndividualArea=maxIndividualArea,
+                 isFruiting: bool = isFruiting, fruitRate: float = fruitRate,
+                 maxFruit: int = maxFruit):
         super().__init__(minsize, maxsize, growrate,
                          expandRate, maxIndividualArea)
-        self.isFruiting = isFruiting
-        self.fruitRate = fruitRate
-        self.fruitYield = 0
-        self.maxFruit = maxFruit
+        self._configure(isFruiting=isFruiting, fruitRate=fruitRate,
+                        maxFruit=maxFruit)
 
     def fruiting(self):
         """
@@ -749,10 +3385,28 @@ class MangoTree(Flora):
         0
         """
         if self.isFruiting:
+            self._settle()
             # make fruits propotional to it's size
             self.fruitYield = min(self.fruitYield + int(
                 self.currentsize * self.fruitRate), self.maxFruit)
 
+    def _bite(self, amount):
+        """
+        Docstring for _bite
+        Yield rule of mango trees: eat 2 fruits per unit while there
+        are at least 2, the tree itself only when there are none.
+
+        >>> m = MangoTree()
+        >>> m.fruitYield = 5
+        >>> m.beEaten(1), m.fruitYield, m.currentsize
+        (2, 3, 5)
+        """
+        if self.fruitYield >= 2:
+            eaten = min(amount*2, self.fruitYield)
+            self.fruitYield -= eaten
+            return eaten
+        return super()._bite(amount)
+
 
 class Elderberry(Flora):
     """
@@ -767,15 +3421,24 @@ class Elderberry(Flora):
     and omnivores.
 
     """
-    def __init__(self, minsize=3, maxsize=12, growrate=0.15,
-                 expandRate=0.3, maxIndividualArea=4, isBerrying: bool = True,
-                 berryRate: float = 0.9, maxBerry: int = 75):
+    __slots__ = ()
+    minsize = 3
+    maxsize = 12
+    growrate = 0.15
+    expandRate = 0.3
+    maxIndividualArea = 4
+    isBerrying = True
+    berryRate = 0.9
+    maxBerry = 75
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 expandRate=expandRate, maxIndividualArea=maxIndividualArea,
+                 isBerrying: bool = isBerrying, berryRate: float = berryRate,
+                 maxBerry: int = maxBerry):
         super().__init__(minsize, maxsize, growrate,
                          expandRate, maxIndividualArea)
-        self.isBerrying = isBerrying
-        self.berryRate = berryRate
-        self.berryYield = 0
-        self.maxBerry = maxBerry
+        self._configure(isBerrying=isBerrying, berryRate=berryRate,
+                        maxBerry=maxBerry)
 
     def fruiting(self):
         """
@@ -807,10 +3470,28 @@ class Elderberry(Flora):
         0
         """
         if self.isBerrying:
+            self._settle()
             # make berries propotional to it's size
             self.berryYield = min(self.berryYield + int(
                 self.currentsize * self.berryRate), self.maxBerry)
 
+    def _bite(self, amount):
+        """
+        Docstring for _bite
+        Yield rule of elderberries: eat 5 berries per unit while there
+        are at least 5, the bush itself only when there are fewer.
+
+        >>> e = Elderberry()
+        >>> e.berryYield = 7
+        >>> e.beEaten(1), e.berryYield
+        (5, 2)
+        """
+        if self.berryYield >= 5:
+            eaten = min(amount*5, self.berryYield)
+            self.berryYield -= eaten
+            return eaten
+        return super()._bite(amount)
+
 
 class Grass(Flora):
     """
@@ -823,8 +3504,16 @@ class Grass(Flora):
     the plant's size and may kill it if overgrazed.
 
     """
-    def __init__(self, minsize=0.1, maxsize=1, growrate=0.2,
-                 expandRate=0.5, maxIndividualArea=1):
+    __slots__ = ()
+    minsize = 0.1
+    maxsize = 1
+    growrate = 0.2
+    expandRate = 0.5
+    maxIndividualArea = 1
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 expandRate=expandRate,
+                 maxIndividualArea=maxIndividualArea):
         super().__init__(minsize, maxsize, growrate,
                          expandRate, maxIndividualArea)
 
@@ -846,15 +3535,18 @@ class Fauna(Lifeforms):
     reproduction logic.
 
     """
+    __slots__ = ("hunger", "health", "current_hunt_modifier")
+    # Name of the Ecosystem method feeding this species, see feeders
+    feeding = None
+
     def __init__(self, minsize, maxsize, growrate, reproducerate,
                  starveRate: float, health: float, selfHarmEffect: float,
                  healEffect: float):
-        super().__init__(minsize, maxsize, growrate, reproducerate)
-        self.starveRate = starveRate
+        super().__init__(minsize, maxsize, growrate)
+        self._configure(reproducerate=reproducerate, starveRate=starveRate,
+                        selfHarmEffect=selfHarmEffect, healEffect=healEffect)
         self.hunger = 0
         self.health = health
-        self.selfHarmEffect = selfHarmEffect
-        self.healEffect = healEffect
         self.current_hunt_modifier = 1.0
 
     def is_alive(self):
@@ -914,7 +3606,7 @@ class Fauna(Lifeforms):
         if self.hunger > 3:  # Hasn't eaten in 3 days
             self.health -= self.starveRate * 10
             if self.health <= 0:
-                self.die()
+                self.die("starvation")
 
     def reproduce(self):
         """
@@ -956,7 +3648,7 @@ class Fauna(Lifeforms):
         offspring = []
 
         # Only reproduce if healthy and mature
-        if self.health > 60 and self.currentsize >= self.maxsize * 0.7:
+        if self.can_reproduce():
             # Calculate exact number (can be fractional)
             exact_new_animals = 1 * self.reproducerate
 
@@ -967,17 +3659,54 @@ class Fauna(Lifeforms):
             fractional_part = exact_new_animals - guaranteed_animals
 
             # Probabilistically add one more
-            bonus_animal = 1 if random.random() < fractional_part else 0
+            rng = _stream(self.island, "reproduction")
+            bonus_animal = 1 if rng.random() < fractional_part else 0
 
             total_new_animals = guaranteed_animals + bonus_animal
 
             # Create the new animals
-            for _ in range(total_new_animals):
-                baby = self.__class__()
-                baby.currentsize = self.minsize
-                baby.health = 50  # Babies start with lower health
-                offspring.append(baby)
+            offspring = self.babies(total_new_animals)
+
+        return offspring
+
+    def can_reproduce(self):
+        """
+        Docstring for can_reproduce
+        Whether the animal is healthy and mature enough to reproduce.
+
+        :return: True if reproduce may create offspring
+        :rtype: bool
+
+        >>> r = Rabbit()
+        >>> r.can_reproduce()
+        False
+        >>> r.currentsize = r.maxsize
+        >>> r.can_reproduce()
+        True
+        """
+        return self.health > 60 and self.currentsize >= self.maxsize * 0.7
+
+    def babies(self, count):
+        """
+        Docstring for babies
+        Create newborn animals of the same species.
+        Newborn animals start at minimum size with reduced health.
 
+        :param count: Number of newborns
+        :type count: int
+        :return: The newborns
+        :rtype: list[Fauna]
+
+        >>> [baby.health for baby in Fox().babies(2)]
+        [50, 50]
+        """
+        offspring = []
+        for _ in range(count):
+            baby = self.__class__()
+            baby.currentsize = self.minsize
+            baby.health = 50  # Babies start with lower health
+            baby.cell = self.cell
+            offspring.append(baby)
         return offspring
 
 # Classes of fauna
@@ -996,13 +3725,16 @@ class Carnivore(Fauna):
     successful hunts to survive.
 
     """
+    __slots__ = ()
+    feeding = "_hunt"
+
     def __init__(self, minsize, maxsize, growrate, reproducerate,
                  starveRate, health, selfHarmEffect, healEffect,
                  huntSuccessRate: float, selfHarmRate: float):
         super().__init__(minsize, maxsize, growrate, reproducerate,
                          starveRate, health, selfHarmEffect, healEffect)
-        self.huntSuccessRate = huntSuccessRate
-        self.selfHarmRate = selfHarmRate
+        self._configure(huntSuccessRate=huntSuccessRate,
+                        selfHarmRate=selfHarmRate)
 
     def hunt(self, fauna_list):
         """
@@ -1016,8 +3748,9 @@ class Carnivore(Fauna):
 
         Hunting success can be affected by environmental modifiers.
 
-        :param fauna_list: List of animals in the ecosystem
-        :type fauna_list: list[Fauna]
+        :param fauna_list: List of animals in the ecosystem, or the
+            per-step PreyIndex built by the ecosystem
+        :type fauna_list: list[Fauna] or PreyIndex
         :return: None
 
         Test 1: Successful hunt
@@ -1045,25 +3778,31 @@ class Carnivore(Fauna):
         """
         if not self.is_alive():
             return
+        rng = _stream(self.island, "feeding")
 
         # Find potential prey (smaller animals)
-        prey_list = [animal for animal in fauna_list
-                     if animal.is_alive()
-                     and animal != self
-                     and animal.currentsize < self.currentsize]
-
-        if prey_list:
-            target = random.choice(prey_list)
-            if random.random() < (self.huntSuccessRate *
-                                  self.current_hunt_modifier):
+        if isinstance(fauna_list, PreyIndex):
+            target = fauna_list.choose_smaller(self)
+        else:
+            prey_list = [animal for animal in fauna_list
+                         if animal.is_alive()
+                         and animal != self
+                         and animal.currentsize < self.currentsize]
+            target = rng.choice(prey_list) if prey_list else None
+
+        if target is not None:
+            if rng.random() < (self.huntSuccessRate *
+                               self.current_hunt_modifier):
                 # Successful hunt else failed hunt
                 self.health = min(100, self.health + self.healEffect)
                 self.hunger = 0
-                target.die()
+                target.die("hunted")
 
             # Self harm
-            if random.random() < self.selfHarmRate:
+            if rng.random() < self.selfHarmRate:
                 self.health -= self.selfHarmEffect
+                if self.health <= 0:
+                    self.die("self_harm")
 
 
 class Herbivore(Fauna):
@@ -1078,6 +3817,9 @@ class Herbivore(Fauna):
     Successful foraging restores health and resets hunger.
 
     """
+    __slots__ = ()
+    feeding = "_forage"
+
     def __init__(self, minsize, maxsize, growrate, reproducerate, starveRate,
                  health, selfHarmEffect, healEffect):
         super().__init__(minsize, maxsize, growrate, reproducerate,
@@ -1088,14 +3830,16 @@ class Herbivore(Fauna):
         Docstring for forage
         Attempt to consume edible plant material.
 
-        The animal selects a living plant from the given flora list
+        The animal selects a living plant it can eat from the given
+        flora list
         and eats an available edible part such as fruits, berries,
         or plant mass depending on plant rules.
 
         Foraging(always successful) restores health and resets hunger.
 
-        :param flora_list: List of plants in the ecosystem
-        :type flora_list: list[Flora]
+        :param flora_list: List of plants in the ecosystem, or the
+            per-step PlantPool built by the ecosystem
+        :type flora_list: list[Flora] or PlantPool
         :return: None
 
         Test 1: Plant reduces currentsize (e.g., Grass)
@@ -1139,12 +3883,17 @@ class Herbivore(Fauna):
         """
         if not self.is_alive():
             return
+        rng = _stream(self.island, "feeding")
 
         # Find edible plants
-        edible_plants = [plant for plant in flora_list if plant.is_alive()]
+        if isinstance(flora_list, PlantPool):
+            target = flora_list.choose(self)
+        else:
+            edible_plants = [plant for plant in flora_list
+                             if plant.is_alive() and plant.edible_by(self)]
+            target = rng.choice(edible_plants) if edible_plants else None
 
-        if edible_plants:
-            target = random.choice(edible_plants)
+        if target is not None:
             amount_eaten = target.beEaten(1, eater=self)
             if amount_eaten > 0:
                 self.health = min(100, self.health + self.healEffect)
@@ -1164,13 +3913,16 @@ class Omnivore(Fauna):
     and Herbivore.
 
     """
+    __slots__ = ()
+    feeding = "_forage_or_hunt"
+
     def __init__(self, minsize, maxsize, growrate, reproducerate, starveRate,
                  health, selfHarmEffect, healEffect,
                  huntSuccessRate: float, selfHarmRate: float):
         super().__init__(minsize, maxsize, growrate, reproducerate,
                          starveRate, health, selfHarmEffect, healEffect)
-        self.huntSuccessRate = huntSuccessRate
-        self.selfHarmRate = selfHarmRate
+        self._configure(huntSuccessRate=huntSuccessRate,
+                        selfHarmRate=selfHarmRate)
 
     def hunt(self, fauna_list):
         """
@@ -1184,8 +3936,9 @@ class Omnivore(Fauna):
 
         Hunting success can be affected by environmental modifiers.
 
-        :param fauna_list: List of animals in the ecosystem
-        :type fauna_list: list[Fauna]
+        :param fauna_list: List of animals in the ecosystem, or the
+            per-step PreyIndex built by the ecosystem
+        :type fauna_list: list[Fauna] or PreyIndex
         :return: None
 
         Test 1: Successful hunt
@@ -1223,36 +3976,44 @@ class Omnivore(Fauna):
         """
         if not self.is_alive():
             return
+        rng = _stream(self.island, "feeding")
 
-        prey_list = [animal for animal in fauna_list
-                     if animal.is_alive()
-                     and animal != self
-                     and animal.currentsize < self.currentsize]
-
-        if prey_list:
-            target = random.choice(prey_list)
-            if random.random() < (self.huntSuccessRate *
-                                  self.current_hunt_modifier):
+        if isinstance(fauna_list, PreyIndex):
+            target = fauna_list.choose_smaller(self)
+        else:
+            prey_list = [animal for animal in fauna_list
+                         if animal.is_alive()
+                         and animal != self
+                         and animal.currentsize < self.currentsize]
+            target = rng.choice(prey_list) if prey_list else None
+
+        if target is not None:
+            if rng.random() < (self.huntSuccessRate *
+                               self.current_hunt_modifier):
                 # Successful hunt - prey dies immediately
                 self.health = min(100, self.health + self.healEffect)
                 self.hunger = 0
-                target.die()
-            if random.random() < self.selfHarmRate:
+                target.die("hunted")
+            if rng.random() < self.selfHarmRate:
                 self.health -= self.selfHarmEffect
+                if self.health <= 0:
+                    self.die("self_harm")
 
     def forage(self, flora_list):
         """
         Docstring for forage
         Attempt to consume edible plant material.
 
-        The animal selects a living plant from the given flora list
+        The animal selects a living plant it can eat from the given
+        flora list
         and eats an available edible part such as fruits, berries,
         or plant mass depending on plant rules.
 
         Foraging(always successful) restores health and resets hunger.
 
-        :param flora_list: List of plants in the ecosystem
-        :type flora_list: list[Flora]
+        :param flora_list: List of plants in the ecosystem, or the
+            per-step PlantPool built by the ecosystem
+        :type flora_list: list[Flora] or PlantPool
         :return: None
 
         Test 1: Plant reduces currentsize (e.g., Grass)
@@ -1296,11 +4057,16 @@ class Omnivore(Fauna):
         """
         if not self.is_alive():
             return
+        rng = _stream(self.island, "feeding")
 
-        edible_plants = [plant for plant in flora_list if plant.is_alive()]
+        if isinstance(flora_list, PlantPool):
+            target = flora_list.choose(self)
+        else:
+            edible_plants = [plant for plant in flora_list
+                             if plant.is_alive() and plant.edible_by(self)]
+            target = rng.choice(edible_plants) if edible_plants else None
 
-        if edible_plants:
-            target = random.choice(edible_plants)
+        if target is not None:
             amount_eaten = target.beEaten(1, eater=self)
             if amount_eaten > 0:
                 self.health = min(100, self.health + self.healEffect)
@@ -1319,9 +4085,22 @@ class Leopard(Carnivore):
     animals for survival.
 
     """
-    def __init__(self, minsize=2, maxsize=5, growrate=0.1, reproducerate=0.03,
-                 starveRate=0.1, health=100, selfHarmEffect=5, healEffect=10,
-                 huntSuccessRate=0.6, selfHarmRate=0.05):
+    __slots__ = ()
+    minsize = 2
+    maxsize = 5
+    growrate = 0.1
+    reproducerate = 0.03
+    starveRate = 0.1
+    selfHarmEffect = 5
+    healEffect = 10
+    huntSuccessRate = 0.6
+    selfHarmRate = 0.05
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 reproducerate=reproducerate, starveRate=starveRate,
+                 health=100, selfHarmEffect=selfHarmEffect,
+                 healEffect=healEffect, huntSuccessRate=huntSuccessRate,
+                 selfHarmRate=selfHarmRate):
         super().__init__(minsize, maxsize, growrate, reproducerate,
                          starveRate, health, selfHarmEffect, healEffect,
                          huntSuccessRate, selfHarmRate)
@@ -1337,9 +4116,19 @@ class Rabbit(Herbivore):
     to predators due to their small size.
 
     """
-    def __init__(self, minsize=0.2, maxsize=0.5, growrate=0.2,
-                 reproducerate=0.1, starveRate=0.15, health=80,
-                 selfHarmEffect=3, healEffect=8):
+    __slots__ = ()
+    minsize = 0.2
+    maxsize = 0.5
+    growrate = 0.2
+    reproducerate = 0.1
+    starveRate = 0.15
+    selfHarmEffect = 3
+    healEffect = 8
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 reproducerate=reproducerate, starveRate=starveRate,
+                 health=80, selfHarmEffect=selfHarmEffect,
+                 healEffect=healEffect):
         super().__init__(minsize, maxsize, growrate, reproducerate, starveRate,
                          health, selfHarmEffect, healEffect)
 
@@ -1356,9 +4145,19 @@ class Koala(Herbivore):
     Koalas have moderate growth and reproduction rates.
 
     """
-    def __init__(self, minsize=0.3, maxsize=1.2, growrate=0.15,
-                 reproducerate=0.09, starveRate=0.12, health=70,
-                 selfHarmEffect=4, healEffect=9):
+    __slots__ = ()
+    minsize = 0.3
+    maxsize = 1.2
+    growrate = 0.15
+    reproducerate = 0.09
+    starveRate = 0.12
+    selfHarmEffect = 4
+    healEffect = 9
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 reproducerate=reproducerate, starveRate=starveRate,
+                 health=70, selfHarmEffect=selfHarmEffect,
+                 healEffect=healEffect):
         super().__init__(minsize, maxsize, growrate, reproducerate, starveRate,
                          health, selfHarmEffect, healEffect)
 
@@ -1373,10 +4172,22 @@ class Fox(Omnivore):
     can survive on varied food sources.
 
     """
-    def __init__(self, minsize=0.5, maxsize=3, growrate=0.15,
-                 reproducerate=0.05, starveRate=0.12, health=90,
-                 selfHarmEffect=4, healEffect=9, huntSuccessRate=0.5,
-                 selfHarmRate=0.04):
+    __slots__ = ()
+    minsize = 0.5
+    maxsize = 3
+    growrate = 0.15
+    reproducerate = 0.05
+    starveRate = 0.12
+    selfHarmEffect = 4
+    healEffect = 9
+    huntSuccessRate = 0.5
+    selfHarmRate = 0.04
+
+    def __init__(self, minsize=minsize, maxsize=maxsize, growrate=growrate,
+                 reproducerate=reproducerate, starveRate=starveRate,
+                 health=90, selfHarmEffect=selfHarmEffect,
+                 healEffect=healEffect, huntSuccessRate=huntSuccessRate,
+                 selfHarmRate=selfHarmRate):
         super().__init__(minsize, maxsize, growrate, reproducerate, starveRate,
                          health, selfHarmEffect, healEffect, huntSuccessRate,
                          selfHarmRate)
@@ -0,0 +1,414 @@
+"""
+Docstring for checkpoint
+This module is made for saving a running Ecosystem to disk and for
+loading it again, so long simulations can be interrupted and resumed.
+
+A checkpoint is columnar instead of a pickle of the organism objects:
+the organisms of every class are stored as one typed array per slot
+(age, currentsize, ...), columns holding a single value are stored
+only once, and the order of flora and fauna is kept as an array of
+class numbers. A JSON header describes the columns and holds the
+ecosystem state, the counters and the state of all random generators,
+so a resumed run continues exactly like the uninterrupted one.
+
+File layout:
+- MAGIC
+- length of the header as unsigned 64 bit little endian integer
+- header (JSON, UTF-8)
+- the column data, one block per stored column
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import gc
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from functools import partial
+from itertools import compress, repeat
+from operator import attrgetter, is_
+from blatt8 import Ecosystem, Flora, Fauna, PHASES, _TOMBSTONE
+from blatt8 import _slot_names, _variant
+from blatt8 import Eucalyptus, MangoTree, Elderberry, Grass
+from blatt8 import Rabbit, Koala, Fox, Leopard
+
+MAGIC = b"BLT8CKP\x01"
+
+SPECIES = {species.__name__: species for species in
+           (Eucalyptus, MangoTree, Elderberry, Grass,
+            Rabbit, Koala, Fox, Leopard)}
+
+# Smallest array type code for integer columns, tried in this order
+_INT_TYPECODES = ("b", "h", "i", "q")
+
+# Ecosystem attributes stored as they are
+_SETTINGS = ("size", "day", "weathercon", "temperature", "occupied_area",
+             "debug", "recycle", "fused", "batch_draws", "seed",
+             "compact_threshold", "lazy_growth", "growth_clock", "steady")
+
+
+def _typecode(values, types):
+    """
+    Docstring for _typecode
+    Array type code able to hold all values of a column exactly.
+
+    :param values: Values of one column
+    :type values: list
+    :param types: Types of the values
+    :type types: set[type]
+    :return: Type code for array.array
+    :rtype: str
+
+    >>> _typecode([True, False], {bool}), _typecode([1, 300], {int})
+    ('b', 'h')
+    >>> _typecode([1, 0.5], {int, float})
+    'd'
+    """
+    if types <= {bool}:
+        return "b"
+    if types <= {int}:
+        low, high = min(values), max(values)
+        for code in _INT_TYPECODES:
+            bits = 8 * array(code).itemsize - 1
+            if -(1 << bits) <= low and high < (1 << bits):
+                return code
+    if types <= {int, float}:
+        return "d"
+    raise TypeError(f"cannot store values of type {types}")
+
+
+def _encode_columns(organisms, names, blocks, offset):
+    # One entry per slot, the data goes to blocks
+    columns = []
+    for name in names:
+        values = list(map(attrgetter(name), organisms))
+        first = values[0]
+        types = set(map(type, values))
+        if len(types) == 1 and values.count(first) == len(values):
+            columns.append({"name": name, "const": first})
+            continue
+        code = _typecode(values, types)
+        data = array(code, values).tobytes()
+        columns.append({"name": name, "type": code,
+                        "bool": type(first) is bool,
+                        "offset": offset, "length": len(data)})
+        blocks.append(data)
+        offset += len(data)
+    return columns, offset
+
+
+def _encode_population(population, blocks, offset):
+    # Group the organisms by class, keeping the order as class numbers
+    kinds = list(map(type, population))
+    numbers = {kind: number for number, kind
+               in enumerate(dict.fromkeys(kinds))}
+    if len(numbers) > 0xFFFF:
+        raise ValueError("too many organism classes")
+    order = array("H", map(numbers.__getitem__, kinds))
+
+    entries = []
+    for kind in numbers:
+        if len(numbers) == 1:
+            organisms = population
+        else:
+            organisms = list(compress(population,
+                                      map(partial(is_, kind), kinds)))
+        species = kind._species
+        if SPECIES.get(species.__name__) is not species:
+            raise TypeError(f"unknown species {species.__name__}")
+        names = tuple(name for name in _slot_names(kind)
+                      if name != "island")
+        columns, offset = _encode_columns(organisms, names, blocks, offset)
+        entries.append({"species": species.__name__,
+                        "overrides": kind._overrides,
+                        "count": len(organisms), "columns": columns})
+
+    data = order.tobytes()
+    blocks.append(data)
+    header = {"groups": entries, "order": {"offset": offset,
+                                           "length": len(data)}}
+    return header, offset + len(data)
+
+
+def _rng_state(rng):
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+
+def save_checkpoint(ecosystem, path):
+    """
+    Docstring for save_checkpoint
+    Write the complete state of an ecosystem to a file. The file is
+    written next to path first and then moved into place, so an
+    interrupted save never destroys the previous checkpoint.
+
+    :param ecosystem: Ecosystem between two simulation steps
+    :type ecosystem: Ecosystem
+    :param path: File to write
+    :type path: str
+    :return: Number of bytes written
+    :rtype: int
+    """
+    if not isinstance(ecosystem, Ecosystem):
+        raise TypeError("only blatt8.Ecosystem can be checkpointed")
+    blocks = []
+    flora, offset = _encode_population(ecosystem.flora, blocks, 0)
+    fauna, offset = _encode_population(ecosystem.fauna, blocks, offset)
+
+    rng = ecosystem.rng
+    header = {
+        "byteorder": sys.byteorder,
+        "settings": {name: getattr(ecosystem, name) for name in _SETTINGS},
+        "population": ecosystem._population,
+        "deaths": [ecosystem._deaths[Flora], ecosystem._deaths[Fauna]],
+        "rng": _rng_state(rng),
+        # Phases sharing the main generator are stored as None
+        "streams": {phase: None if stream is rng else _rng_state(stream)
+                    for phase, stream in ecosystem.streams.items()},
+        "bulk_rng": (ecosystem._bulk_rng.bit_generator.state
+                     if ecosystem._bulk_rng is not None else None),
+        "grid": ([ecosystem.grid.width, ecosystem.grid.height]
+                 if ecosystem.grid is not None else None),
+        # Pairs of size and count in cohort order
+        "cohorts": (list(ecosystem.cohorts.sizes.items())
+                    if ecosystem.cohorts is not None else None),
+        "flora": flora,
+        "fauna": fauna,
+    }
+    encoded = json.dumps(header).encode("utf-8")
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(encoded)))
+        file.write(encoded)
+        for block in blocks:
+            file.write(block)
+    os.replace(temporary, path)
+    return len(MAGIC) + 8 + len(encoded) + offset
+
+
+def _decode_column(column, payload, swap):
+    values = array(column["type"])
+    start = column["offset"]
+    values.frombytes(payload[start:start + column["length"]])
+    if swap:
+        values.byteswap()
+    if column["bool"]:
+        return list(map(bool, values))
+    return values.tolist()
+
+
+def _set_column(organisms, name, values):
+    # setattr for every organism without a Python level loop
+    deque(map(setattr, organisms, repeat(name), values), maxlen=0)
+
+
+def _decode_population(header, payload, swap, ecosystem):
+    groups = []
+    for entry in header["groups"]:
+        kind = _variant(SPECIES[entry["species"]], entry["overrides"])
+        count = entry["count"]
+        organisms = list(map(kind.__new__, repeat(kind, count)))
+        _set_column(organisms, "island", repeat(ecosystem))
+        for column in entry["columns"]:
+            if "const" in column:
+                values = repeat(column["const"])
+            else:
+                values = _decode_column(column, payload, swap)
+            _set_column(organisms, column["name"], values)
+        groups.append(organisms)
+    if len(groups) == 1:
+        return groups[0]
+    groups = list(map(iter, groups))
+
+    order = _decode_column(dict(header["order"], type="H", bool=False),
+                           payload, swap)
+    return [next(groups[number]) for number in order]
+
+
+def encode_organisms(organisms):
+    """
+    Docstring for encode_organisms
+    Columnar bytes of a list of organisms in the checkpoint format,
+    e.g. to send them to another process.
+
+    :param organisms: Plants or animals
+    :type organisms: list[Lifeforms]
+    :return: The encoded organisms
+    :rtype: bytes
+
+    >>> from blatt8 import Ecosystem
+    >>> rabbit = Rabbit()
+    >>> rabbit.health = 42
+    >>> data = encode_organisms([Grass(), rabbit])
+    >>> decoded = decode_organisms(data, Ecosystem(100, 10, 25))
+    >>> [type(o).__name__ for o in decoded], decoded[1].health
+    (['Grass', 'Rabbit'], 42)
+    """
+    blocks = []
+    header, length = _encode_population(organisms, blocks, 0)
+    header["byteorder"] = sys.byteorder
+    encoded = json.dumps(header).encode("utf-8")
+    return b"".join([struct.pack("<Q", len(encoded)), encoded] + blocks)
+
+
+def decode_organisms(data, ecosystem):
+    """
+    Docstring for decode_organisms
+    Rebuild organisms written by encode_organisms. They refer to the
+    given ecosystem but are not added to it.
+
+    :param data: The encoded organisms
+    :type data: bytes
+    :param ecosystem: Ecosystem the organisms will belong to
+    :type ecosystem: Ecosystem
+    :return: The organisms in their original order
+    :rtype: list[Lifeforms]
+    """
+    length, = struct.unpack_from("<Q", data)
+    header = json.loads(bytes(data[8:8 + length]).decode("utf-8"))
+    payload = memoryview(data)[8 + length:]
+    return _decode_population(header, payload,
+                              header["byteorder"] != sys.byteorder,
+                              ecosystem)
+
+
+def _set_rng_state(rng, state):
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
+
+def load_checkpoint(path):
+    """
+    Docstring for load_checkpoint
+    Rebuild an ecosystem from a file written by save_checkpoint.
+
+    :param path: Checkpoint file
+    :type path: str
+    :return: The ecosystem, ready for the next simulate_step
+    :rtype: Ecosystem
+
+    Test 1: A resumed run continues like the uninterrupted one
+    >>> import os, tempfile
+    >>> def island():
+    ...     eco = Ecosystem(2000, 10, 25, seed=4)
+    ...     for species in (Grass, MangoTree, Elderberry, Rabbit, Fox):
+    ...         for _ in range(30):
+    ...             eco.add_organism(species())
+    ...     eco.add_organism(Leopard(huntSuccessRate=0.9))
+    ...     for _ in range(10):
+    ...         eco.simulate_step()
+    ...     return eco
+    >>> def finish(eco):
+    ...     for _ in range(20):
+    ...         eco.simulate_step()
+    ...     return eco.census(), [p.currentsize for p in eco.flora]
+    >>> path = os.path.join(tempfile.mkdtemp(), "island.ckpt")
+    >>> size = save_checkpoint(island(), path)
+    >>> finish(load_checkpoint(path)) == finish(island())
+    True
+
+    Test 2: Split random streams and settings are restored
+    >>> eco = island()
+    >>> eco.split_streams()
+    >>> eco.fused = True
+    >>> size = save_checkpoint(eco, path)
+    >>> resumed = load_checkpoint(path)
+    >>> resumed.fused, resumed.day
+    (True, 10)
+    >>> finish(resumed) == finish(eco)
+    True
+
+    Test 3: Spatial islands keep their cells
+    >>> eco = island()
+    >>> eco.enable_grid(4)
+    >>> size = save_checkpoint(eco, path)
+    >>> resumed = load_checkpoint(path)
+    >>> resumed.grid.occupied == eco.grid.occupied
+    True
+    >>> finish(resumed) == finish(eco)
+    True
+
+    Test 4: Grass cohorts are restored
+    >>> eco = Ecosystem(2000, 10, 25, seed=4)
+    >>> eco.enable_cohorts()
+    >>> eco.add_cohort(300)
+    >>> for _ in range(20):
+    ...     eco.add_organism(Rabbit())
+    >>> for _ in range(10):
+    ...     eco.simulate_step()
+    >>> size = save_checkpoint(eco, path)
+    >>> resumed = load_checkpoint(path)
+    >>> resumed.cohorts.sizes == eco.cohorts.sizes
+    True
+    >>> finish(resumed) == finish(eco)
+    True
+
+    Test 5: Variant constants survive the round trip
+    >>> eco = Ecosystem(100, 10, 25)
+    >>> eco.add_organism(Leopard(huntSuccessRate=0.9))
+    >>> size = save_checkpoint(eco, path)
+    >>> leopard = load_checkpoint(path).fauna[0]
+    >>> isinstance(leopard, Leopard), leopard.huntSuccessRate
+    (True, 0.9)
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an ecosystem checkpoint")
+        length, = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(length).decode("utf-8"))
+        payload = memoryview(file.read())
+    swap = header["byteorder"] != sys.byteorder
+
+    settings = header["settings"]
+    ecosystem = Ecosystem(settings["size"], 0, settings["temperature"],
+                          seed=settings["seed"])
+    for name, value in settings.items():
+        setattr(ecosystem, name, value)
+    ecosystem._population = header["population"]
+    ecosystem._deaths = {Flora: header["deaths"][0],
+                         Fauna: header["deaths"][1]}
+
+    # Creating the bulk generator draws from rng, so restore it first
+    if header["bulk_rng"] is not None:
+        ecosystem.bulk_rng.bit_generator.state = header["bulk_rng"]
+    _set_rng_state(ecosystem.rng, header["rng"])
+    for phase in PHASES:
+        state = header["streams"].get(phase)
+        if state is not None:
+            stream = ecosystem.streams[phase] = ecosystem.rng.__class__()
+            _set_rng_state(stream, state)
+
+    # None of the millions of new objects is garbage, so keep the
+    # collector from rescanning the heap again and again meanwhile
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        ecosystem.flora = _decode_population(header["flora"], payload,
+                                             swap, ecosystem)
+        ecosystem.fauna = _decode_population(header["fauna"], payload,
+                                             swap, ecosystem)
+    finally:
+        if collecting:
+            gc.enable()
+    # The counters already include the blades
+    if header.get("cohorts") is not None:
+        ecosystem.enable_cohorts()
+        for size, count in header["cohorts"]:
+            ecosystem.cohorts.add(size, count)
+    # Dead organisms still listed are tombstones, see
+    # Ecosystem._remove_dead
+    for population, kind in ((ecosystem.flora, Flora),
+                             (ecosystem.fauna, Fauna)):
+        for organism in population:
+            if not organism.alive:
+                organism.island = _TOMBSTONE
+                ecosystem._tombstones[kind] += 1
+    # Every organism has its cell already, this only recounts the area
+    # taken per cell
+    if header["grid"] is not None:
+        ecosystem.enable_grid(*header["grid"])
+    return ecosystem
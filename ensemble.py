@@ -0,0 +1,255 @@
+"""
+Docstring for ensemble
+This module is made for Monte Carlo ensembles: the same island
+configuration is simulated once per seed, the runs are spread over
+several worker processes, and the final populations are summarized
+per species (mean, percentiles and extinction probability).
+
+Usage example:
+python ensemble.py --counts Grass=50,Rabbit=10,Fox=2 --size 10000
+--rounds 200 --seeds 0-99 --workers 8
+
+With --weather FILE all runs replay the same weather trace (see
+weather.py); every worker maps the file instead of receiving a copy.
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from UI import ORGANISM_CLASSES, SimulationRunner
+from weather import check_length, load_trace
+
+SPECIES_NAMES = [species.__name__ for species in ORGANISM_CLASSES.values()]
+
+
+def run_once(organism_counts, size, rounds, seed, engine="object",
+             weather=None):
+    """
+    Docstring for run_once
+    Simulate one island without any output or delay.
+
+    :param organism_counts: Organism name (key of UI.ORGANISM_CLASSES)
+        to initial count
+    :type organism_counts: dict[str, int]
+    :param size: Size of the island
+    :type size: int
+    :param rounds: Number of simulated days
+    :type rounds: int
+    :param seed: Seed of the run
+    :type seed: int
+    :param engine: 'object' or 'numpy'
+    :type engine: str
+    :param weather: Weather replayed instead of drawn
+    :type weather: weather.WeatherTrace or None
+    :return: Seed and final population per species class name
+    :rtype: dict
+
+    Test 1: The same seed gives the same result
+    >>> a = run_once({"Grass": 20, "Rabbit": 5}, 1000, 10, seed=3)
+    >>> a == run_once({"Grass": 20, "Rabbit": 5}, 1000, 10, seed=3)
+    True
+
+    Test 2: Every species is reported
+    >>> sorted(a["census"]) == sorted(SPECIES_NAMES)
+    True
+
+    Test 3: Species that were never added stay at zero
+    >>> a["census"]["Leopard"]
+    0
+    """
+    result = SimulationRunner().simulate(rounds, None, "headless",
+                                         organism_counts, size, engine,
+                                         seed, weather=weather)
+    census = dict.fromkeys(SPECIES_NAMES, 0)
+    census.update(result.census)
+    return {"seed": seed, "census": census}
+
+
+def _run_job(job):
+    return run_once(*job)
+
+
+def percentile(values, q):
+    """
+    Docstring for percentile
+    q-th percentile of the values with linear interpolation between
+    the closest ranks.
+
+    :param values: Sample values
+    :type values: list[float]
+    :param q: Percentile between 0 and 100
+    :type q: float
+    :return: The percentile
+    :rtype: float
+
+    >>> percentile([1, 2, 3, 4], 50)
+    2.5
+    >>> percentile([5], 95)
+    5.0
+    >>> percentile([0, 10], 90)
+    9.0
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return float(ordered[lower]
+                 + (ordered[upper] - ordered[lower]) * (position - lower))
+
+
+def summarize(runs, percentiles=(5, 50, 95)):
+    """
+    Docstring for summarize
+    Aggregate the final populations of several runs per species.
+
+    :param runs: Results of run_once
+    :type runs: list[dict]
+    :param percentiles: Percentiles to report
+    :type percentiles: tuple[float]
+    :return: Per species mean, percentiles and the probability that
+        the species died out
+    :rtype: dict[str, dict]
+
+    >>> runs = [{"seed": 0, "census": {"Fox": 0}},
+    ...         {"seed": 1, "census": {"Fox": 4}}]
+    >>> summarize(runs, percentiles=(50,))["Fox"]
+    {'mean': 2.0, 'p50': 2.0, 'extinction_probability': 0.5}
+    """
+    summary = {}
+    for name in runs[0]["census"]:
+        values = [run["census"][name] for run in runs]
+        stats = {"mean": sum(values) / len(values)}
+        for q in percentiles:
+            stats[f"p{q:g}"] = percentile(values, q)
+        stats["extinction_probability"] = (
+            sum(1 for value in values if value == 0) / len(values))
+        summary[name] = stats
+    return summary
+
+
+def run_ensemble(organism_counts, size, rounds, seeds, workers=None,
+                 engine="object", weather=None):
+    """
+    Docstring for run_ensemble
+    Run one simulation per seed in a process pool and aggregate them.
+
+    :param organism_counts: Organism name to initial count
+    :type organism_counts: dict[str, int]
+    :param size: Size of the island
+    :type size: int
+    :param rounds: Number of simulated days per run
+    :type rounds: int
+    :param seeds: One seed per run
+    :type seeds: list[int]
+    :param workers: Number of worker processes, all cores if None
+    :type workers: int or None
+    :param engine: 'object' or 'numpy'
+    :type engine: str
+    :param weather: Weather all runs replay, a trace from load_trace
+        is mapped by the workers instead of copied to them
+    :type weather: weather.WeatherTrace or None
+    :return: Per-seed results under 'runs' and the per-species
+        aggregate under 'summary'
+    :rtype: dict
+
+    >>> result = run_ensemble({"Grass": 10}, 100, 5, [1, 2], workers=1)
+    >>> [run["seed"] for run in result["runs"]]
+    [1, 2]
+    >>> result["summary"]["Leopard"]["extinction_probability"]
+    1.0
+    >>> run_ensemble({"Grass": 10}, 100, 5, [])
+    Traceback (most recent call last):
+    ...
+    ValueError: an ensemble needs at least one seed
+    >>> from weather import generate_trace
+    >>> run_ensemble({"Grass": 10}, 100, 5, [1],
+    ...              weather=generate_trace(3, seed=1))
+    Traceback (most recent call last):
+    ...
+    ValueError: the weather trace ends on day 3, the run on day 5
+    """
+    if not seeds:
+        raise ValueError("an ensemble needs at least one seed")
+    if weather is not None:
+        check_length(weather, 0, rounds)
+    jobs = [(organism_counts, size, rounds, seed, engine, weather)
+            for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per worker keeps the pool busy without much IPC
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(_run_job, jobs, chunksize=chunksize))
+    return {"runs": runs, "summary": summarize(runs)}
+
+
+def parse_counts(text):
+    """
+    Docstring for parse_counts
+    Parse 'Name=count' pairs separated by commas.
+
+    >>> parse_counts("Grass=50,Mango Tree=3")
+    {'Grass': 50, 'Mango Tree': 3}
+    """
+    counts = {}
+    for pair in text.split(","):
+        name, count = pair.split("=")
+        if name.strip() not in ORGANISM_CLASSES:
+            raise ValueError(f"unknown organism {name.strip()!r}")
+        counts[name.strip()] = int(count)
+    return counts
+
+
+def parse_seeds(text):
+    """
+    Docstring for parse_seeds
+    Parse seeds given as a comma separated list and/or ranges.
+
+    >>> parse_seeds("0-3,10")
+    [0, 1, 2, 3, 10]
+    >>> parse_seeds("5-3")
+    Traceback (most recent call last):
+    ...
+    ValueError: empty seed range '5-3'
+    """
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            if int(last) < int(first):
+                raise ValueError(f"empty seed range {part!r}")
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo ensemble of"
+                                                 " island simulations")
+    parser.add_argument("--counts", type=parse_counts, required=True,
+                        help="initial organisms, e.g. Grass=50,Rabbit=10")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--rounds", type=int, required=True)
+    parser.add_argument("--seeds", type=parse_seeds, required=True,
+                        help="e.g. 0-99 or 1,5,9")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--engine", choices=("object", "numpy"),
+                        default="object")
+    parser.add_argument("--weather", type=load_trace, metavar="FILE",
+                        help="replay this weather trace in every run")
+    parser.add_argument("--runs", action="store_true",
+                        help="also print the per-seed census")
+    args = parser.parse_args(argv)
+
+    result = run_ensemble(args.counts, args.size, args.rounds, args.seeds,
+                          args.workers, args.engine, args.weather)
+    if not args.runs:
+        del result["runs"]
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
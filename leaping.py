@@ -0,0 +1,589 @@
+"""
+Docstring for leaping
+This module is made for fast-forwarding an island over long horizons
+with tau-leaping: instead of stepping every day, the island jumps
+several days at once and draws the births and deaths of the whole
+jump per species in aggregate.
+
+The per-day rates are the ones of the exact simulation: every few
+days one exact simulate_step is run and its births and deaths per
+species and cause are recorded. Over a sliding window of these days
+the rates per individual are
+- births: seedlings granted to a plant species or babies born to an
+  animal species, per individual and day
+- deaths: individuals of the species that died of each cause (storm,
+  eaten, hunted, starvation, ...) per individual and day
+- fed: the chance of an animal of the species to eat on a day
+
+A leap of tau days then draws per species
+- Binomial(population, 1 - exp(-tau * death rate)) deaths, split over
+  the causes, applied to uniformly random individuals
+- Poisson(tau * birth rate * population) births. Plant seedlings
+  still need free area (see Ecosystem._grant_expansion), deaths are
+  applied first to free it.
+Starvation is the exception: hunger and health build up over days,
+so every surviving animal eats on each day of the leap with the fed
+chance of its species and starves like in Fauna.starvation.
+The survivors age and grow by tau days in closed form, seedlings and
+babies get a random age within the leap. The fruit and berry yields
+stay as they are: the leap assumes the island is in a quasi-steady
+regime where their distribution does not drift.
+
+The leap size tau is chosen adaptively like in the tau-selection of
+Cao, Gillespie and Petzold: the expected change and the standard
+deviation of every population over the leap must stay below
+epsilon times the population (at least one individual). Islands with
+a population below exact_below, leaps shorter than two days and the
+days right after a leap are stepped exactly. When a species dies out,
+the rates are measured anew before the next leap.
+
+Observers are called once per leap, with day_stats summing the
+whole leap.
+
+Usage example:
+python leaping.py --counts Grass=20000,Rabbit=500,Leopard=50
+--size 40000 --rounds 100000 --seed 1
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import argparse
+import json
+import math
+from collections import deque
+from itertools import chain
+from blatt8 import Ecosystem, Flora, _growth_powers
+from ensemble import parse_counts
+from UI import ORGANISM_CLASSES
+
+# Phase whose stream the leaps draw from, see Ecosystem.streams
+PHASE = "reproduction"
+
+
+def _poisson(ecosystem, mean):
+    """
+    Docstring for _poisson
+    Poisson distributed number with the given mean, drawn from
+    bulk_rng. Without numpy it is drawn from the stream of PHASE by
+    Knuth's method, or from the normal approximation for large means.
+
+    :param ecosystem: Ecosystem whose generators are used
+    :type ecosystem: Ecosystem
+    :param mean: Expected value
+    :type mean: float
+    :return: The drawn number
+    :rtype: int
+
+    >>> eco = Ecosystem(100, 10, 25, seed=1)
+    >>> _poisson(eco, 0)
+    0
+    >>> 9000 < _poisson(eco, 10000) < 11000
+    True
+    """
+    if mean <= 0:
+        return 0
+    rng = ecosystem.bulk_rng
+    if rng is not None:
+        return int(rng.poisson(mean))
+    stream = ecosystem.streams[PHASE]
+    if mean > 50:
+        return max(0, round(stream.gauss(mean, math.sqrt(mean))))
+    limit = math.exp(-mean)
+    count = 0
+    product = stream.random()
+    while product > limit:
+        count += 1
+        product *= stream.random()
+    return count
+
+
+def _exact_day(ecosystem):
+    """
+    Docstring for _exact_day
+    Run one simulate_step and record what happened per species.
+
+    :param ecosystem: The island
+    :type ecosystem: Ecosystem
+    :return: Population per species before the day, births per
+        species, deaths per (species, cause), the eaten biomass and
+        per animal species the number of animals that ate today and
+        of all animals older than a day
+    :rtype: dict
+
+    >>> from blatt8 import Grass, Rabbit
+    >>> eco = Ecosystem(100, 10, 25, seed=1)
+    >>> for _ in range(5):
+    ...     eco.add_organism(Grass())
+    >>> day = _exact_day(eco)
+    >>> day["population"], day["births"], eco.day
+    ({'Grass': 5}, {'Grass': 0}, 1)
+    >>> eco.add_organism(Rabbit())
+    >>> _exact_day(eco)["fed"]
+    {'Rabbit': [1, 1]}
+    """
+    before = dict(ecosystem._population)
+    deaths_before = dict(ecosystem._species_deaths)
+    ecosystem.simulate_step()
+
+    deaths = {}
+    births = {name: count - before.get(name, 0)
+              for name, count in ecosystem._population.items()}
+    for key, count in ecosystem._species_deaths.items():
+        count -= deaths_before.get(key, 0)
+        if count:
+            deaths[key] = count
+            births[key[0]] += count
+    # Feeding resets the hunger to 0 before starvation counts the day,
+    # today's newborns have not lived a day yet
+    fed = {}
+    for animal in ecosystem.fauna:
+        if (animal.island is ecosystem and animal.alive
+                and animal.hunger):
+            counts = fed.setdefault(animal.__class__.__name__, [0, 0])
+            counts[0] += animal.hunger == 1
+            counts[1] += 1
+    return {"population": before, "births": births, "deaths": deaths,
+            "eaten": ecosystem.day_stats["eaten_biomass"], "fed": fed}
+
+
+def daily_rates(history):
+    """
+    Docstring for daily_rates
+    Births and deaths per individual and day of every species, and
+    the chance of an animal to eat on a day, measured over the
+    recorded exact days.
+
+    :param history: Days recorded by _exact_day
+    :type history: list[dict]
+    :return: Species name to 'births', 'deaths' (rate per cause),
+        'fed' (None for plants) and 'exposure' (individuals times days
+        measured), and the biomass eaten per day
+    :rtype: tuple[dict[str, dict], float]
+
+    >>> day = {"population": {"Grass": 100, "Fox": 10},
+    ...        "births": {"Grass": 30, "Fox": 0},
+    ...        "deaths": {("Grass", "eaten"): 10}, "eaten": 9.5,
+    ...        "fed": {"Fox": [4, 8]}}
+    >>> rates, eaten = daily_rates([day, day])
+    >>> rates["Grass"]["births"], rates["Grass"]["deaths"]
+    (0.3, {'eaten': 0.1})
+    >>> rates["Grass"]["fed"], rates["Fox"]["fed"], eaten
+    (None, 0.5, 9.5)
+    """
+    exposure = {}
+    births = {}
+    deaths = {}
+    fed = {}
+    eaten = 0
+    for day in history:
+        for name, (ate, animals) in day["fed"].items():
+            counts = fed.setdefault(name, [0, 0])
+            counts[0] += ate
+            counts[1] += animals
+        for name, count in day["population"].items():
+            exposure[name] = exposure.get(name, 0) + count
+        for name, count in day["births"].items():
+            births[name] = births.get(name, 0) + count
+        for key, count in day["deaths"].items():
+            deaths[key] = deaths.get(key, 0) + count
+        eaten += day["eaten"]
+
+    rates = {}
+    for name, total in exposure.items():
+        if total:
+            ate, animals = fed.get(name, (0, 0))
+            rates[name] = {
+                "births": births.get(name, 0) / total,
+                "deaths": {cause: count / total
+                           for (species, cause), count in deaths.items()
+                           if species == name},
+                "fed": ate / animals if animals else None,
+                "exposure": total}
+    return rates, eaten / len(history)
+
+
+def leap_size(population, rates, epsilon, exact_below, limit):
+    """
+    Docstring for leap_size
+    Longest leap over which every population is expected to change
+    by at most epsilon of its size, in mean and in standard
+    deviation. Rates measured on few individuals are uncertain, so the
+    spread counts one event more than measured: a species whose
+    deaths were never seen does not allow arbitrarily long leaps.
+
+    :param population: Species name to current population
+    :type population: dict[str, int]
+    :param rates: Rates per species, see daily_rates
+    :type rates: dict
+    :param epsilon: Allowed relative change per leap
+    :type epsilon: float
+    :param exact_below: Populations this small are stepped exactly
+    :type exact_below: int
+    :param limit: Longest allowed leap
+    :type limit: int
+    :return: Days of the leap, 0 if the island must be stepped
+        exactly
+    :rtype: int
+
+    Test 1: Balanced births and deaths only limit the spread
+    >>> rates = {"Grass": {"births": 0.1, "deaths": {"eaten": 0.1},
+    ...                    "exposure": 10 ** 6}}
+    >>> leap_size({"Grass": 1000}, rates, 0.03, 20, 100)
+    4
+    >>> leap_size({"Grass": 10 ** 5}, rates, 0.03, 20, 100)
+    100
+
+    Test 2: A drifting population limits the mean change
+    >>> drift = {"Grass": {"births": 0, "deaths": {"eaten": 0.001},
+    ...                    "exposure": 10 ** 6}}
+    >>> leap_size({"Grass": 10 ** 5}, drift, 0.03, 20, 100)
+    30
+
+    Test 3: Small populations are stepped exactly, extinct ones not
+    >>> rates["Fox"] = {"births": 0, "deaths": {}, "exposure": 100}
+    >>> leap_size({"Grass": 10 ** 5, "Fox": 5}, rates, 0.03, 20, 100)
+    0
+    >>> leap_size({"Grass": 10 ** 5, "Fox": 50}, rates, 0.03, 20, 100)
+    4
+    >>> leap_size({"Grass": 10 ** 5, "Fox": 0}, rates, 0.03, 20, 100)
+    100
+    """
+    days = limit
+    for name, count in population.items():
+        if count == 0:
+            continue
+        if count < exact_below:
+            return 0
+        species = rates.get(name)
+        if species is None:
+            continue
+        gain = species["births"] * count
+        loss = sum(species["deaths"].values()) * count
+        bound = max(epsilon * count, 1)
+        if gain != loss:
+            days = min(days, bound / abs(gain - loss))
+        spread = gain + loss + count / species["exposure"]
+        days = min(days, bound ** 2 / spread)
+    return int(days)
+
+
+def _split(ecosystem, count, weights):
+    # Multinomial split of count by the weights, drawn as binomials
+    parts = []
+    left = sum(weights)
+    for i, weight in enumerate(weights):
+        if i == len(weights) - 1:
+            part = count
+        else:
+            part = ecosystem._binomial(min(1, weight / left), count, PHASE)
+        parts.append(part)
+        count -= part
+        left -= weight
+    return parts
+
+
+def _go_hungry(animal, fed, days, rng):
+    """
+    Docstring for _go_hungry
+    Let an animal live through the days of a leap, eating on each day
+    with the given chance, and starve like in Fauna.starvation.
+
+    :param animal: A living animal
+    :type animal: Fauna
+    :param fed: Chance to eat on a day
+    :type fed: float
+    :param days: Length of the leap
+    :type days: int
+    :param rng: Random generator
+    :return: None
+
+    Test 1: An animal that always eats heals
+    >>> from blatt8 import Fox
+    >>> fox = Fox(health=50)
+    >>> _go_hungry(fox, 1.0, 3, None)
+    >>> fox.hunger, fox.health
+    (1, 77)
+
+    Test 2: An animal that never eats starves after three days
+    >>> _go_hungry(fox, 0.0, 5, None)
+    >>> fox.hunger, round(fox.health, 1)
+    (6, 73.4)
+    >>> _go_hungry(fox, 0.0, 100, None)
+    >>> fox.alive
+    False
+    """
+    if fed >= 1:
+        animal.hunger = 1
+        animal.health = min(100, animal.health + days * animal.healEffect)
+        return
+    if fed <= 0:
+        # Every day after the third without food costs health
+        starving = max(0, min(days, animal.hunger + days - 3))
+        animal.hunger += days
+        animal.health -= animal.starveRate * 10 * starving
+    else:
+        for _ in range(days):
+            if rng.random() < fed:
+                animal.hunger = 0
+                animal.health = min(100, animal.health + animal.healEffect)
+            animal.hunger += 1
+            if animal.hunger > 3:
+                animal.health -= animal.starveRate * 10
+                if animal.health <= 0:
+                    break
+    if animal.health <= 0:
+        animal.die("starvation")
+
+
+def leap(ecosystem, rates, days, eaten=0.0):
+    """
+    Docstring for leap
+    Advance the island by several days at once: draw the births and
+    deaths of every species from its rates and let the survivors age
+    and grow. The counters, day_stats and observers are updated like
+    after a simulate_step.
+
+    :param ecosystem: The island
+    :type ecosystem: Ecosystem
+    :param rates: Rates per species, see daily_rates
+    :type rates: dict
+    :param days: Length of the leap
+    :type days: int
+    :param eaten: Biomass eaten per day
+    :type eaten: float
+    :return: None
+
+    >>> from blatt8 import Grass, Rabbit
+    >>> eco = Ecosystem(3000, 10, 25, seed=2)
+    >>> eco.debug = True
+    >>> for _ in range(1000):
+    ...     eco.add_organism(Grass())
+    >>> for _ in range(100):
+    ...     eco.add_organism(Rabbit())
+    >>> leap(eco, {"Grass": {"births": 0.2, "deaths": {"eaten": 0.1},
+    ...                      "fed": None},
+    ...            "Rabbit": {"births": 0, "deaths": {"hunted": 0.01},
+    ...                       "fed": 1.0}}, 10)
+    >>> eco.day, eco.census()["Grass"] > 1500, eco.census()["Rabbit"] < 100
+    (10, True, True)
+    >>> eco.recount_occupied_area() == eco.occupied_area
+    True
+    >>> sizes = [plant.currentsize for plant in eco.flora]
+    >>> max(plant.age for plant in eco.flora), round(max(sizes), 3)
+    (10, 0.619)
+    """
+    rng = ecosystem.streams[PHASE]
+    population = ecosystem._population
+    cohorts = ecosystem.cohorts
+    blade_name = cohorts.species.__name__ if cohorts is not None else None
+    ecosystem.day += days
+    ecosystem.day_stats = ecosystem._empty_day_stats()
+
+    living = {}
+    for organism in chain(ecosystem.flora, ecosystem.fauna):
+        if organism.island is ecosystem and organism.alive:
+            group = living.get(organism.__class__.__name__)
+            if group is None:
+                living[organism.__class__.__name__] = [organism]
+            else:
+                group.append(organism)
+
+    # Deaths first, they free the area the seedlings need
+    births = {}
+    for name, species in rates.items():
+        count = population.get(name, 0)
+        if count == 0:
+            continue
+        births[name] = _poisson(ecosystem,
+                                species["births"] * count * days)
+        # Starvation follows from the hunger of every animal below
+        deaths = {cause: rate for cause, rate in species["deaths"].items()
+                  if cause != "starvation"}
+        if not deaths:
+            continue
+        organisms = living.get(name, [])
+        blades = cohorts.blades if name == blade_name else 0
+        dying = ecosystem._binomial(
+            1 - math.exp(-sum(deaths.values()) * days),
+            min(count, len(organisms) + blades), PHASE)
+        causes = []
+        for cause, part in zip(deaths, _split(ecosystem, dying,
+                                              list(deaths.values()))):
+            causes.extend([cause] * part)
+        victims = rng.sample(range(len(organisms) + blades), dying)
+        for index, cause in zip(victims, causes):
+            if index < blades:
+                ecosystem._kill_blades(cohorts.choose(rng), 1, cause)
+            else:
+                organisms[index - blades].die(cause)
+
+    # The survivors age and grow, lazily grown plants only need the
+    # clock to move on
+    ecosystem.growth_clock += days
+    lazy = ecosystem.lazy_growth
+    for plant in ecosystem.flora:
+        if plant.island is ecosystem and plant.alive:
+            plant.age += days
+            if not lazy and plant.currentsize < plant.maxsize:
+                powers = _growth_powers(plant.__class__)
+                plant.currentsize = min(
+                    plant.currentsize * powers[min(days, len(powers) - 1)],
+                    plant.maxsize)
+    for animal in ecosystem.fauna:
+        if animal.island is ecosystem and animal.alive:
+            animal.age += days
+            species = rates.get(animal.__class__.__name__)
+            if species is not None and species["fed"] is not None:
+                _go_hungry(animal, species["fed"], days, rng)
+
+    # Births, born on a random day of the leap
+    requests = []
+    newborns = []
+    blades = 0
+    for name, count in births.items():
+        parents = living.get(name)
+        if name == blade_name and cohorts.blades:
+            blades = count
+        elif parents and isinstance(parents[0], Flora):
+            requests.extend((rng.choice(parents), 1) for _ in range(count))
+        elif parents:
+            for _ in range(count):
+                baby = rng.choice(parents).babies(1)[0]
+                baby.age = rng.randrange(days)
+                newborns.append(baby)
+
+    free = ecosystem.available_area()
+    if blades:
+        area = cohorts.species.maxIndividualArea
+        wanted = blades * area + sum(plant.maxIndividualArea
+                                     for plant, count in requests)
+        if wanted > free:
+            blades = int(free * blades / wanted)
+        free -= blades * area
+    seedlings = ecosystem._grant_expansion(requests, free)
+    for plant in seedlings:
+        plant.age = rng.randrange(days)
+        powers = _growth_powers(plant.__class__)
+        plant.currentsize = min(
+            plant.currentsize * powers[min(plant.age + 1, len(powers) - 1)],
+            plant.maxsize)
+    ecosystem.flora.extend(seedlings)
+    if cohorts is not None:
+        # Blades grow day by day, the new ones from their birthday on
+        for day in range(days):
+            born = blades * (day + 1) // days - blades * day // days
+            if born:
+                ecosystem.add_cohort(born)
+            cohorts.grow()
+        ecosystem.day_stats["births"] += blades
+    ecosystem.day_stats["births"] += len(newborns)
+    for baby in newborns:
+        ecosystem.add_organism(baby)
+
+    ecosystem.day_stats["eaten_biomass"] = eaten * days
+    ecosystem._remove_dead()
+    ecosystem._end_day()
+
+
+def fast_forward(ecosystem, days, epsilon=0.03, exact_below=20,
+                 max_leap=100, window=5):
+    """
+    Docstring for fast_forward
+    Advance the island by the given number of days, leaping over
+    several days at once wherever the error control allows it and
+    stepping exactly elsewhere. The result is an approximation: it
+    follows the exact simulation in distribution only as far as the
+    rates of the last exact days hold over a leap.
+
+    :param ecosystem: The island
+    :type ecosystem: Ecosystem
+    :param days: Number of days to advance
+    :type days: int
+    :param epsilon: Allowed relative change of a population per leap
+    :type epsilon: float
+    :param exact_below: Step exactly while a species that is not
+        extinct has fewer individuals
+    :type exact_below: int
+    :param max_leap: Longest leap
+    :type max_leap: int
+    :param window: Exact days the rates are measured over. The first
+        leap follows this many exact days, and so does the first leap
+        after a species died out.
+    :type window: int
+    :return: Number of exact days, leaps and leaped days
+    :rtype: dict[str, int]
+
+    Test 1: Large populations are leaped over
+    >>> from blatt8 import Grass, Rabbit
+    >>> eco = Ecosystem(6000, 10, 25, seed=3)
+    >>> for _ in range(5000):
+    ...     eco.add_organism(Grass())
+    >>> for _ in range(300):
+    ...     eco.add_organism(Rabbit())
+    >>> summary = fast_forward(eco, 200)
+    >>> eco.day, summary["leaps"] > 0, summary["exact_days"] < 100
+    (200, True, True)
+    >>> 4000 < eco.census()["Grass"] <= 6000
+    True
+
+    Test 2: Small populations are only stepped exactly
+    >>> eco = Ecosystem(100, 10, 25, seed=3)
+    >>> for _ in range(10):
+    ...     eco.add_organism(Grass())
+    >>> fast_forward(eco, 20)
+    {'exact_days': 20, 'leaps': 0, 'leaped_days': 0}
+    """
+    summary = {"exact_days": 0, "leaps": 0, "leaped_days": 0}
+    history = deque(maxlen=window)
+    end = ecosystem.day + days
+    leaped = False
+    species = None
+    while ecosystem.day < end:
+        # Rates measured before a species died out do not hold after
+        present = {name for name, count in ecosystem._population.items()
+                   if count}
+        if present != species:
+            history.clear()
+            species = present
+        size = 0
+        # Every leap is followed by an exact day to refresh the rates
+        if len(history) == window and not leaped:
+            rates, eaten = daily_rates(history)
+            size = leap_size(ecosystem._population, rates, epsilon,
+                             exact_below, min(max_leap, end - ecosystem.day))
+        if size >= 2:
+            leap(ecosystem, rates, size, eaten)
+            summary["leaps"] += 1
+            summary["leaped_days"] += size
+            leaped = True
+        else:
+            history.append(_exact_day(ecosystem))
+            summary["exact_days"] += 1
+            leaped = False
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fast-forward an island"
+                                                 " with tau-leaping")
+    parser.add_argument("--counts", type=parse_counts, required=True,
+                        help="initial organisms, e.g. Grass=50,Rabbit=10")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--rounds", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--epsilon", type=float, default=0.03)
+    parser.add_argument("--exact-below", type=int, default=20)
+    parser.add_argument("--max-leap", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    ecosystem = Ecosystem(args.size, args.rounds, 25, seed=args.seed)
+    for name, count in args.counts.items():
+        for _ in range(count):
+            ecosystem.add_organism(ORGANISM_CLASSES[name]())
+    summary = fast_forward(ecosystem, args.rounds, args.epsilon,
+                           args.exact_below, args.max_leap)
+    print(json.dumps(dict(summary, day=ecosystem.day,
+                          census=ecosystem.census())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Docstring for recorder
+This module is made for recording the population trajectory of a
+simulation. A CensusRecorder is added to Ecosystem.observers and
+appends one row per simulated day: the day, weather, temperature,
+population per species, births, deaths per cause and eaten biomass.
+
+Rows are buffered in typed column arrays and written in batches, so
+memory stays constant however long the run is. Two formats exist:
+- csv: one text line per day with a header line
+- binary: a columnar file. After MAGIC and a JSON schema, each batch
+  is stored as its row count followed by the raw data of every
+  column. read_binary loads it back.
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import csv
+import json
+import struct
+import sys
+from array import array
+from blatt8 import DEATH_CAUSES
+
+MAGIC = b"BLT8REC\x01"
+
+SPECIES_NAMES = ("Eucalyptus", "MangoTree", "Elderberry", "Grass",
+                 "Rabbit", "Koala", "Fox", "Leopard")
+
+WEATHERS = (None, "normal", "windy", "storm")
+
+
+def columns(species=SPECIES_NAMES):
+    """
+    Docstring for columns
+    Column names and array type codes of a recording.
+
+    :param species: Species class names with one column each
+    :type species: tuple[str]
+    :return: Pairs of column name and type code
+    :rtype: list[tuple[str, str]]
+
+    >>> [name for name, code in columns(("Grass",))][:5]
+    ['day', 'weather', 'temperature', 'Grass', 'births']
+    """
+    layout = [("day", "q"), ("weather", "b"), ("temperature", "q")]
+    layout.extend((name, "q") for name in species)
+    layout.append(("births", "q"))
+    layout.extend(("deaths_" + cause, "q") for cause in DEATH_CAUSES)
+    layout.append(("eaten_biomass", "d"))
+    return layout
+
+
+class CensusRecorder():
+    """
+    Docstring for CensusRecorder
+    Observer that streams one row per simulated day to a file.
+
+    :var path: File the rows are written to
+    :vartype path: str
+    :var file_format: 'csv' or 'binary'
+    :vartype file_format: str
+    :var buffer_days: Rows collected before they are written
+    :vartype buffer_days: int
+    :var species: Species class names recorded, one column each
+    :vartype species: tuple[str]
+
+    Test 1: One CSV row per day
+    >>> import os, tempfile
+    >>> from blatt8 import Ecosystem, Grass, Rabbit
+    >>> folder = tempfile.mkdtemp()
+    >>> eco = Ecosystem(500, 10, 25, seed=3)
+    >>> for _ in range(20):
+    ...     eco.add_organism(Grass())
+    ...     eco.add_organism(Rabbit())
+    >>> path = os.path.join(folder, "run.csv")
+    >>> with CensusRecorder(path, buffer_days=4) as recorder:
+    ...     eco.observers.append(recorder)
+    ...     for _ in range(10):
+    ...         eco.simulate_step()
+    >>> rows = list(csv.DictReader(open(path)))
+    >>> len(rows), rows[-1]["day"], rows[-1]["Grass"] == str(
+    ...     eco.census()["Grass"])
+    (10, '10', True)
+
+    Test 2: The binary format holds the same data
+    >>> path = os.path.join(folder, "run.bin")
+    >>> eco.observers = []
+    >>> with CensusRecorder(path, "binary", buffer_days=4) as recorder:
+    ...     eco.observers.append(recorder)
+    ...     for _ in range(10):
+    ...         eco.simulate_step()
+    >>> data = read_binary(path)
+    >>> data["day"][:3], len(data["Rabbit"])
+    ([11, 12, 13], 10)
+    >>> data["weather"][0] in ("normal", "windy", "storm")
+    True
+
+    Test 3: Unknown formats are rejected
+    >>> CensusRecorder(path, "xml")
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown format 'xml'
+    """
+
+    def __init__(self, path, file_format="csv", buffer_days=1024,
+                 species=SPECIES_NAMES):
+        if file_format not in ("csv", "binary"):
+            raise ValueError(f"unknown format {file_format!r}")
+        self.path = path
+        self.file_format = file_format
+        self.buffer_days = buffer_days
+        self.species = tuple(species)
+        self._layout = columns(self.species)
+        self._buffers = [array(code) for name, code in self._layout]
+        self._weather_codes = {weather: code for code, weather
+                               in enumerate(WEATHERS)}
+        self._stats = [name for name, code
+                       in self._layout[3 + len(self.species):]]
+
+        if file_format == "csv":
+            self._file = open(path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow([name for name, code in self._layout])
+        else:
+            self._file = open(path, "wb")
+            schema = {"byteorder": sys.byteorder, "weathers": WEATHERS,
+                      "columns": self._layout}
+            encoded = json.dumps(schema).encode("utf-8")
+            self._file.write(MAGIC)
+            self._file.write(struct.pack("<Q", len(encoded)))
+            self._file.write(encoded)
+
+    def __call__(self, ecosystem):
+        """
+        Docstring for __call__
+        Append the current day of the ecosystem to the buffers and
+        write them once buffer_days rows are collected.
+
+        :param ecosystem: Ecosystem right after a simulate_step
+        :type ecosystem: Ecosystem
+        :return: None
+        """
+        population = ecosystem._population
+        stats = ecosystem.day_stats
+        row = [ecosystem.day, self._weather_codes[ecosystem.weathercon],
+               ecosystem.temperature]
+        row.extend(population.get(name, 0) for name in self.species)
+        row.extend(stats[name] for name in self._stats)
+        for buffer, value in zip(self._buffers, row):
+            buffer.append(value)
+        if len(self._buffers[0]) >= self.buffer_days:
+            self.flush()
+
+    def flush(self):
+        """
+        Docstring for flush
+        Write all buffered rows to the file.
+
+        :return: None
+        """
+        rows = len(self._buffers[0])
+        if rows == 0:
+            return
+        if self.file_format == "csv":
+            weather = [WEATHERS[code] for code in self._buffers[1]]
+            self._writer.writerows(zip(self._buffers[0], weather,
+                                       *self._buffers[2:]))
+        else:
+            self._file.write(struct.pack("<Q", rows))
+            for buffer in self._buffers:
+                buffer.tofile(self._file)
+        for buffer in self._buffers:
+            del buffer[:]
+        self._file.flush()
+
+    def close(self):
+        """
+        Docstring for close
+        Write the remaining rows and close the file.
+
+        :return: None
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_binary(path):
+    """
+    Docstring for read_binary
+    Load a recording written in the binary format.
+
+    :param path: Recording file
+    :type path: str
+    :return: Column name to list of values, weather as strings
+    :rtype: dict[str, list]
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a census recording")
+        length, = struct.unpack("<Q", file.read(8))
+        schema = json.loads(file.read(length).decode("utf-8"))
+        data = {name: array(code) for name, code in schema["columns"]}
+        while True:
+            head = file.read(8)
+            if not head:
+                break
+            rows, = struct.unpack("<Q", head)
+            for name, code in schema["columns"]:
+                data[name].fromfile(file, rows)
+
+    swap = schema["byteorder"] != sys.byteorder
+    result = {}
+    for name, values in data.items():
+        if swap:
+            values.byteswap()
+        result[name] = values.tolist()
+    result["weather"] = [schema["weathers"][code]
+                         for code in result["weather"]]
+    return result
@@ -0,0 +1,567 @@
+"""
+Docstring for tiles
+This module is made for stepping one large island on several CPU
+cores. The island is cut into strips (tiles) of equal area, and every
+tile is an Ecosystem of its own that lives in a worker process.
+
+Every day:
+- the coordinator draws the weather of the whole island once and
+  broadcasts it to all tiles, together with the tile that loses a
+  plant and the tile that loses an animal if there is a storm (chosen
+  in proportion to the tile populations, like one random plant and one
+  random animal of the whole island)
+- all tiles step in parallel
+- animals migrate to a neighboring tile with probability
+  migration_rate, and the same share of the new seedlings lands in a
+  neighboring tile, where it dies if there is no room. Migrants travel
+  as columnar bytes (see checkpoint.encode_organisms).
+- every tile writes its census into a shared memory table, which the
+  coordinator merges without any copying through the pipes
+
+Feeding and expansion stay local to a tile, so the merged census
+equals a single-process run in distribution as long as the organisms
+are spread evenly over the tiles.
+
+Only the census table lives in shared memory. The organisms are the
+objects of each tile's Ecosystem and stay private to its worker, so
+the object engine with all its modes runs unchanged on every tile.
+The price is paid at the boundary: every migrant is encoded, sent
+through the worker's pipe to the coordinator and on to its new tile,
+and decoded there, which costs time and two copies in proportion to
+migration_rate times the population. A tile can not look into its
+neighbors, so nothing is eaten across a boundary.
+
+If a worker stops unexpectedly, the coordinator terminates all other
+workers and raises a RuntimeError instead of waiting for the tile.
+
+Usage example:
+python tiles.py --counts Grass=500000,Rabbit=20000,Fox=2000
+--size 2000000 --rounds 50 --tiles 8
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import argparse
+import json
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+from blatt8 import _TOMBSTONE, Ecosystem, Fauna, Flora
+from checkpoint import SPECIES, encode_organisms, decode_organisms
+from ensemble import parse_counts
+from weather import check_length
+from UI import ORGANISM_CLASSES
+
+SPECIES_NAMES = tuple(SPECIES)
+
+# Columns of the shared census table, one row per tile
+CENSUS_COLUMNS = SPECIES_NAMES + ("plants", "animals")
+
+# Errors of a pipe whose worker is gone
+_BROKEN = (EOFError, BrokenPipeError, ConnectionResetError)
+
+
+class Tile(Ecosystem):
+    """
+    Docstring for Tile
+    One strip of a tiled island. The weather and the storm losses are
+    decided by the coordinator for the whole island and set in
+    broadcast before every simulate_step.
+
+    :var broadcast: Temperature, weather, whether this tile loses a
+        plant and whether it loses an animal to a storm
+    :vartype broadcast: tuple
+    :var arrivals: Encoded organisms from other tiles, admitted at
+        the start of the next day
+    :vartype arrivals: list[bytes]
+    :var seedlings: Seedlings granted today, see emigrants
+    :vartype seedlings: list[Flora]
+
+    Test 1: The tile takes the broadcast weather
+    >>> tile = Tile(100, seed=1)
+    >>> tile.broadcast = (38, "windy", False, False)
+    >>> tile.environment()
+    >>> tile.temperature, tile.weathercon
+    (38, 'windy')
+
+    Test 2: Only the chosen tile loses a plant in a storm
+    >>> from blatt8 import Eucalyptus
+    >>> tile.add_organism(Eucalyptus())
+    >>> tile._storm()
+    >>> tile.census()
+    {'Eucalyptus': 1}
+    >>> tile.broadcast = (30, "storm", True, False)
+    >>> tile._storm()
+    >>> tile.census()
+    {'Eucalyptus': 0}
+    """
+
+    def __init__(self, size, seed=None):
+        super().__init__(size, 0, 25, seed=seed)
+        self.broadcast = (25, "normal", False, False)
+        self.arrivals = []
+        self.seedlings = []
+
+    def _begin_day(self):
+        # Arrivals settle within the day, so the seedlings without room
+        # are counted in its deaths
+        super()._begin_day()
+        self.seedlings = []
+        for data in self.arrivals:
+            self.admit(decode_organisms(data, self))
+        self.arrivals = []
+
+    def _grant_expansion(self, requests, total_free_area):
+        seedlings = super()._grant_expansion(requests, total_free_area)
+        self.seedlings.extend(seedlings)
+        return seedlings
+
+    def environment(self):
+        self.temperature, self.weathercon = self.broadcast[:2]
+
+    def _storm(self):
+        rng = self.streams["storm"]
+        if self.broadcast[2]:
+            plant = self._pick_living(self.flora, Flora, rng)
+            if plant is not None:
+                plant.die("storm")
+        if self.broadcast[3]:
+            animal = self._pick_living(self.fauna, Fauna, rng)
+            if animal is not None:
+                animal.die("storm")
+
+    def take_out(self, organisms):
+        """
+        Docstring for take_out
+        Remove living organisms from this tile without counting a
+        death, e.g. because they migrate. They become tombstones (see
+        Ecosystem._remove_dead) and are no longer alive on this tile,
+        so they have to be encoded before.
+
+        :param organisms: Organisms of this tile
+        :type organisms: list[Lifeforms]
+        :return: None
+
+        >>> from blatt8 import Rabbit
+        >>> tile = Tile(100, seed=1)
+        >>> rabbits = tile.spawn(Rabbit, 3)
+        >>> for rabbit in rabbits:
+        ...     tile.add_organism(rabbit)
+        >>> tile.take_out(rabbits[:1])
+        >>> len(tile.fauna), tile.totals(), tile.census()
+        (3, (0, 2), {'Rabbit': 2})
+        >>> tile.day_stats["deaths_other"]
+        0
+        """
+        tombstones = self._tombstones
+        for organism in organisms:
+            self._population[organism.__class__.__name__] -= 1
+            if isinstance(organism, Flora):
+                self.occupied_area -= organism.maxIndividualArea
+                tombstones[Flora] += 1
+            else:
+                tombstones[Fauna] += 1
+            organism.island = _TOMBSTONE
+            # Not die(): the organism lives on in its new tile
+            organism.alive = False
+
+    def admit(self, organisms):
+        """
+        Docstring for admit
+        Add organisms arriving from another tile. Plants only settle
+        if there is room left, the others die on arrival, so the
+        census of the whole island loses no organism unaccounted.
+
+        :param organisms: The arriving organisms
+        :type organisms: list[Lifeforms]
+        :return: None
+
+        >>> from blatt8 import Eucalyptus
+        >>> tile = Tile(10, seed=1)
+        >>> tile.admit([Eucalyptus(), Eucalyptus()])
+        >>> tile.census(), tile.day_stats["deaths_other"]
+        ({'Eucalyptus': 1}, 1)
+        >>> tile.available_area()
+        4
+        """
+        for organism in organisms:
+            crowded = (isinstance(organism, Flora)
+                       and self.available_area()
+                       < organism.maxIndividualArea)
+            self.add_organism(organism)
+            if crowded:
+                organism.die("other")
+
+    def emigrants(self, destinations, rate):
+        """
+        Docstring for emigrants
+        Pick the living animals and today's seedlings that leave this
+        tile and take them out.
+
+        :param destinations: Neighboring tile numbers
+        :type destinations: list[int]
+        :param rate: Probability that one organism leaves
+        :type rate: float
+        :return: Tile number to the encoded leaving organisms
+        :rtype: dict[int, bytes]
+
+        >>> from blatt8 import Grass
+        >>> tile = Tile(100, seed=1)
+        >>> for grass in tile.spawn(Grass, 20):
+        ...     grass.currentsize = 1
+        ...     tile.add_organism(grass)
+        >>> tile.simulate_step()
+        >>> born, plants = tile.day_stats["births"], tile.totals()[0]
+        >>> born > 0, len(tile.seedlings) == born
+        (True, True)
+        >>> leaving = tile.emigrants([1], 1.0)
+        >>> len(decode_organisms(leaving[1], tile)) == born
+        True
+        >>> tile.totals()[0] == plants - born
+        True
+        """
+        if not destinations or rate <= 0:
+            return {}
+        rng = self.streams["movement"]
+        movers = [animal for animal in self.fauna if animal.is_alive()]
+        movers.extend(plant for plant in self.seedlings
+                      if plant.is_alive())
+        leaving = {}
+        for organism in movers:
+            if rng.random() < rate:
+                leaving.setdefault(rng.choice(destinations),
+                                   []).append(organism)
+        encoded = {near: encode_organisms(organisms)
+                   for near, organisms in leaving.items()}
+        for organisms in leaving.values():
+            self.take_out(organisms)
+        return encoded
+
+    def write_census(self, row):
+        """
+        Docstring for write_census
+        Write the census of this tile into its row of the shared
+        census table (see CENSUS_COLUMNS).
+
+        :param row: Row of the table
+        :type row: memoryview
+        :return: None
+        """
+        population = self._population
+        for column, name in enumerate(SPECIES_NAMES):
+            row[column] = population.get(name, 0)
+        row[len(SPECIES_NAMES)], row[len(SPECIES_NAMES) + 1] = (
+            self.totals())
+
+
+def _tile_worker(connection, index, tiles, size, counts, seed, table,
+                 migration_rate):
+    # Runs in a worker process and owns one tile until told to stop
+    memory = shared_memory.SharedMemory(name=table)
+    cells = memory.buf.cast("q")
+    width = len(CENSUS_COLUMNS)
+    row = cells[index * width:(index + 1) * width]
+    neighbors = [near for near in (index - 1, index + 1)
+                 if 0 <= near < tiles]
+    try:
+        tile = Tile(size, seed)
+        for name, count in counts.items():
+            for organism in tile.spawn(SPECIES[name], count):
+                tile.add_organism(organism)
+        tile.write_census(row)
+        connection.send(True)
+
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            tile.broadcast, tile.arrivals = message
+            tile.simulate_step()
+            leaving = tile.emigrants(neighbors, migration_rate)
+            tile.write_census(row)
+            connection.send(leaving)
+    finally:
+        del row
+        cells.release()
+        memory.close()
+
+
+def split_counts(organism_counts, tiles, rng=random):
+    """
+    Docstring for split_counts
+    Spread the initial organisms evenly over the tiles, the remainder
+    goes to random tiles.
+
+    :param organism_counts: Species class name to count
+    :type organism_counts: dict[str, int]
+    :param tiles: Number of tiles
+    :type tiles: int
+    :param rng: Random generator
+    :return: Counts per tile
+    :rtype: list[dict[str, int]]
+
+    >>> shares = split_counts({"Grass": 10, "Fox": 1}, 4)
+    >>> sorted(share["Grass"] for share in shares), sum(
+    ...     share["Fox"] for share in shares)
+    ([2, 2, 3, 3], 1)
+    """
+    shares = [dict.fromkeys(organism_counts, 0) for _ in range(tiles)]
+    for name, count in organism_counts.items():
+        base, remainder = divmod(count, tiles)
+        for share in shares:
+            share[name] = base
+        for index in rng.sample(range(tiles), remainder):
+            shares[index][name] += 1
+    return shares
+
+
+class TiledIsland():
+    """
+    Docstring for TiledIsland
+    An island stepped as tiles in parallel worker processes.
+
+    :var tiles: Number of tiles (and worker processes)
+    :vartype tiles: int
+    :var day: Current simulation day
+    :vartype day: int
+    :var weathercon: Weather of the current day
+    :vartype weathercon: str
+    :var temperature: Temperature of the current day
+    :vartype temperature: int
+
+    A weather_trace passed to the constructor replays the island-wide
+    weather instead of drawing it, see Ecosystem.weather_trace.
+
+    Test 1: The merged census covers all tiles
+    >>> counts = {"Grass": 400, "Rabbit": 4}
+    >>> with TiledIsland(2000, counts, tiles=2, seed=1) as island:
+    ...     start = island.census()
+    ...     island.run(5)
+    ...     island.day, sorted(island.census())
+    (5, ['Grass', 'Rabbit'])
+    >>> start
+    {'Grass': 400, 'Rabbit': 4}
+
+    Test 2: The same seed gives the same run
+    >>> def run():
+    ...     with TiledIsland(2000, counts, tiles=2, seed=3) as island:
+    ...         island.run(10)
+    ...         return island.census()
+    >>> run() == run()
+    True
+
+    Test 3: A crashed worker stops the island
+    >>> island = TiledIsland(2000, counts, tiles=2, seed=1)
+    >>> island._workers[0].terminate()
+    >>> island.run(2)
+    Traceback (most recent call last):
+    ...
+    RuntimeError: a tile worker stopped unexpectedly
+    >>> island._workers, island.close()
+    ([], None)
+
+    Test 4: The weather trace must cover the run
+    >>> from weather import generate_trace
+    >>> with TiledIsland(2000, counts, tiles=2, seed=1,
+    ...                  weather_trace=generate_trace(3)) as island:
+    ...     island.run(5)
+    Traceback (most recent call last):
+    ...
+    ValueError: the weather trace ends on day 3, the run on day 5
+    """
+
+    def __init__(self, size, organism_counts, tiles=None, seed=None,
+                 migration_rate=0.05, weather_trace=None):
+        self.tiles = tiles or os.cpu_count() or 1
+        self.day = 0
+        self.weathercon = None
+        self.temperature = 25
+        # Draws the island-wide weather with the rules of Ecosystem
+        self._weather = Ecosystem(size, 0, 25, seed=seed)
+        self._weather.weather_trace = weather_trace
+        rng = self._weather.rng
+
+        width = len(CENSUS_COLUMNS)
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=8 * width * self.tiles)
+        self._table = self._memory.buf.cast("q")
+
+        context = multiprocessing.get_context()
+        self._connections = []
+        self._workers = []
+        shares = split_counts(organism_counts, self.tiles, rng)
+        for index in range(self.tiles):
+            parent, child = context.Pipe()
+            worker = context.Process(
+                target=_tile_worker, daemon=True,
+                args=(child, index, self.tiles, size / self.tiles,
+                      shares[index], rng.getrandbits(64), self._memory.name,
+                      migration_rate))
+            worker.start()
+            # Only the worker holds this end, so its exit ends the pipe
+            child.close()
+            self._connections.append(parent)
+            self._workers.append(worker)
+        for connection in self._connections:
+            self._receive(connection)
+        self._arrivals = [[] for _ in range(self.tiles)]
+
+    def _send(self, connection, message):
+        try:
+            connection.send(message)
+        except _BROKEN as error:
+            self._stop_workers()
+            raise RuntimeError(
+                "a tile worker stopped unexpectedly") from error
+
+    def _receive(self, connection):
+        try:
+            return connection.recv()
+        except _BROKEN as error:
+            self._stop_workers()
+            raise RuntimeError(
+                "a tile worker stopped unexpectedly") from error
+
+    def _stop_workers(self):
+        # Terminate the workers that are still running, close the
+        # pipes and free the shared memory
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        self._workers = []
+        for connection in self._connections:
+            connection.close()
+        self._table.release()
+        self._memory.close()
+        self._memory.unlink()
+
+    def _column(self, name):
+        width = len(CENSUS_COLUMNS)
+        column = CENSUS_COLUMNS.index(name)
+        return [self._table[index * width + column]
+                for index in range(self.tiles)]
+
+    def _storm_tile(self, sizes):
+        # Tile of a uniformly random organism of the whole island
+        total = sum(sizes)
+        if total == 0:
+            return None
+        pick = self._weather.streams["storm"].randrange(total)
+        for index, size in enumerate(sizes):
+            if pick < size:
+                return index
+            pick -= size
+
+    def simulate_step(self):
+        """
+        Docstring for simulate_step
+        Advance all tiles by one day and exchange the migrants.
+
+        :return: None
+        """
+        trace = self._weather.weather_trace
+        if trace is not None:
+            check_length(trace, self.day, 1)
+        self.day += 1
+        self._weather.day = self.day
+        self._weather.environment()
+        self.weathercon = self._weather.weathercon
+        self.temperature = self._weather.temperature
+        plant_tile = animal_tile = None
+        if self.weathercon == "storm":
+            plant_tile = self._storm_tile(self._column("plants"))
+            animal_tile = self._storm_tile(self._column("animals"))
+
+        for index, connection in enumerate(self._connections):
+            broadcast = (self.temperature, self.weathercon,
+                         index == plant_tile, index == animal_tile)
+            self._send(connection, (broadcast, self._arrivals[index]))
+        self._arrivals = [[] for _ in range(self.tiles)]
+        for connection in self._connections:
+            for near, data in self._receive(connection).items():
+                self._arrivals[near].append(data)
+
+    def run(self, days):
+        """
+        Docstring for run
+        Simulate the given number of days.
+
+        :param days: Number of days
+        :type days: int
+        :return: None
+        Raises ValueError if the weather trace ends before.
+        """
+        trace = self._weather.weather_trace
+        if trace is not None:
+            check_length(trace, self.day, days)
+        for _ in range(days):
+            self.simulate_step()
+
+    def census(self):
+        """
+        Docstring for census
+        Merged population per species of all tiles, read from the
+        shared census table. Migrants on their way between two tiles
+        are not counted.
+
+        :return: Species class name to population
+        :rtype: dict[str, int]
+        """
+        census = {}
+        for name in SPECIES_NAMES:
+            total = sum(self._column(name))
+            if total:
+                census[name] = total
+        return census
+
+    def close(self):
+        """
+        Docstring for close
+        Stop the worker processes and free the shared memory. Workers
+        that do not stop within a few seconds are terminated.
+
+        :return: None
+        """
+        if not self._workers:
+            return
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except _BROKEN:
+                pass  # the worker is gone already
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._stop_workers()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Island simulation"
+                                                 " stepped as parallel"
+                                                 " tiles")
+    parser.add_argument("--counts", type=parse_counts, required=True,
+                        help="initial organisms, e.g. Grass=50,Rabbit=10")
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--rounds", type=int, required=True)
+    parser.add_argument("--tiles", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--migration-rate", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    counts = {ORGANISM_CLASSES[name].__name__: count
+              for name, count in args.counts.items()}
+    with TiledIsland(args.size, counts, args.tiles, args.seed,
+                     args.migration_rate) as island:
+        island.run(args.rounds)
+        print(json.dumps({"day": island.day, "tiles": island.tiles,
+                          "census": island.census()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Docstring for weather
+This module is made for weather traces: the temperature and weather
+of many days, generated in bulk, saved to a compact file and
+replayed. An ecosystem with a weather_trace takes day d from entry
+d - 1 of the trace instead of drawing it, so all runs of an ensemble
+or a parameter sweep see the same weather.
+
+A trace stores one byte per day: (temperature - COLDEST) * 3 plus the
+index of the weather in WEATHERS. A file holds MAGIC, the number of
+days and these bytes. load_trace maps the file read-only, so worker
+processes loading the same file share one copy of it in memory; for
+the same reason a loaded trace is pickled as its path.
+
+Usage example:
+python weather.py --days 100000 --seed 1 --out sweep.trace
+"""
+
+__author__ = "8407548, Winata, 8655943, Quan"
+import argparse
+import mmap
+import os
+import random
+import struct
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"BLT8WTH\x01"
+
+WEATHERS = ("normal", "windy", "storm")
+
+# Temperatures are drawn like in Ecosystem.environment
+COLDEST = 22
+HOTTEST = 39
+
+
+def _encode(temperature, weather):
+    if not COLDEST <= temperature <= HOTTEST:
+        raise ValueError(f"temperature {temperature} out of range")
+    return (temperature - COLDEST) * 3 + WEATHERS.index(weather)
+
+
+class WeatherTrace():
+    """
+    Docstring for WeatherTrace
+    Read-only sequence of (temperature, weather) pairs, one per day.
+
+    :var codes: One byte per day, see the module docstring
+    :vartype codes: bytes or memoryview
+    :var path: File the trace was loaded from, None if it was not
+    :vartype path: str or None
+
+    Test 1: Days are decoded from one byte each
+    >>> trace = WeatherTrace.from_days([(22, "normal"), (39, "storm")])
+    >>> len(trace), trace[1], bytes(trace.codes)
+    (2, (39, 'storm'), b'\\x005')
+
+    Test 2: Weather that Ecosystem.environment never draws is rejected
+    >>> WeatherTrace.from_days([(50, "normal")])
+    Traceback (most recent call last):
+    ...
+    ValueError: temperature 50 out of range
+    """
+
+    def __init__(self, codes, path=None):
+        self.codes = codes
+        self.path = path
+
+    @classmethod
+    def from_days(cls, days):
+        """
+        Docstring for from_days
+        Trace of the given days, e.g. the weather column of a
+        recording.
+
+        :param days: Pairs of temperature and weather
+        :type days: iterable[tuple[int, str]]
+        :return: The trace
+        :rtype: WeatherTrace
+        """
+        return cls(bytes(_encode(temperature, weather)
+                         for temperature, weather in days))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return COLDEST + code // 3, WEATHERS[code % 3]
+
+    def __reduce__(self):
+        # Workers map a saved trace themselves instead of copying it
+        if self.path is not None:
+            return load_trace, (self.path,)
+        return WeatherTrace, (bytes(self.codes),)
+
+    def save(self, path):
+        """
+        Docstring for save
+        Write the trace to a file that load_trace can map.
+
+        :param path: Target file
+        :type path: str
+        :return: Number of bytes written
+        :rtype: int
+        """
+        with open(path, "wb") as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<Q", len(self.codes)))
+            file.write(self.codes)
+        return len(MAGIC) + 8 + len(self.codes)
+
+
+def generate_trace(days, seed=None):
+    """
+    Docstring for generate_trace
+    Draw the weather of days days at once, with the probabilities of
+    Ecosystem.environment: 30 % windy, 10 % storm, 60 % normal and a
+    uniform temperature from COLDEST to HOTTEST. Without numpy the
+    days are drawn one by one.
+
+    :param days: Number of days
+    :type days: int
+    :param seed: Seed of the trace
+    :type seed: int or None
+    :return: The trace
+    :rtype: WeatherTrace
+
+    >>> trace = generate_trace(1000, seed=1)
+    >>> len(trace), trace.codes == generate_trace(1000, seed=1).codes
+    (1000, True)
+    >>> storms = sum(1 for day in trace if day[1] == "storm")
+    >>> 50 < storms < 150
+    True
+    """
+    if numpy is not None:
+        rng = numpy.random.default_rng(seed)
+        temperatures = rng.integers(0, HOTTEST - COLDEST + 1, days)
+        draws = rng.random(days)
+        weathers = numpy.where(draws < 0.3, 1, numpy.where(draws < 0.4, 2, 0))
+        return WeatherTrace((temperatures * 3 + weathers)
+                            .astype(numpy.uint8).tobytes())
+
+    rng = random.Random(seed)
+    codes = array("B")
+    for _ in range(days):
+        temperature = rng.randrange(COLDEST, HOTTEST + 1)
+        draw = rng.random()
+        codes.append(_encode(temperature, "windy" if draw < 0.3 else
+                             "storm" if draw < 0.4 else "normal"))
+    return WeatherTrace(codes.tobytes())
+
+
+def check_length(trace, day, days):
+    """
+    Docstring for check_length
+    Make sure a trace covers days more days of an island that is on
+    the given day, so a run does not stop halfway through.
+
+    :param trace: The trace
+    :type trace: WeatherTrace
+    :param day: Current day of the island
+    :type day: int
+    :param days: Days that will be simulated
+    :type days: int
+    :return: None
+    Raises ValueError if the trace is too short.
+
+    >>> trace = generate_trace(5, seed=1)
+    >>> check_length(trace, 0, 5)
+    >>> check_length(trace, 3, 5)
+    Traceback (most recent call last):
+    ...
+    ValueError: the weather trace ends on day 5, the run on day 8
+    """
+    if len(trace) < day + days:
+        raise ValueError(f"the weather trace ends on day {len(trace)},"
+                         f" the run on day {day + days}")
+
+
+def load_trace(path):
+    """
+    Docstring for load_trace
+    Map a trace written by WeatherTrace.save read-only into memory.
+
+    :param path: Trace file
+    :type path: str
+    :return: The trace
+    :rtype: WeatherTrace
+
+    >>> import os, pickle, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "w.trace")
+    >>> generate_trace(500, seed=2).save(path)
+    516
+    >>> trace = load_trace(path)
+    >>> len(trace), trace[0] == generate_trace(1, seed=2)[0]
+    (500, True)
+    >>> copy = pickle.loads(pickle.dumps(trace))
+    >>> copy.path == trace.path, copy.codes == trace.codes
+    (True, True)
+    """
+    path = os.path.abspath(path)
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a weather trace")
+    days, = struct.unpack_from("<Q", mapped, len(MAGIC))
+    start = len(MAGIC) + 8
+    return WeatherTrace(memoryview(mapped)[start:start + days], path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a weather"
+                                                 " trace")
+    parser.add_argument("--days", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", required=True, metavar="FILE")
+    args = parser.parse_args(argv)
+    written = generate_trace(args.days, args.seed).save(args.out)
+    print(f"Wrote {args.days} days ({written} bytes) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()